@@ -0,0 +1,3 @@
+"""
+Benchmarks for site-doc-gen (run with ``python -m benchmarks.<name>``)
+"""
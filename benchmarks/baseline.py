@@ -0,0 +1,87 @@
+"""
+Statistics and JSON baselines shared by the benchmark runners
+"""
+
+import json
+import math
+import platform
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Linearly interpolated percentile (q in 0..1) of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q
+    lower = math.floor(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MiB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def save_baseline(path: Path, results: Dict[str, Dict[str, Any]]) -> None:
+    """Write benchmark results, with the machine they ran on, as a JSON baseline"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    baseline = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    path.write_text(json.dumps(baseline, indent=2) + "\n", encoding="utf-8")
+
+def load_baseline(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Read the results of a JSON baseline"""
+    return json.loads(path.read_text(encoding="utf-8"))["results"]
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    metrics: Dict[str, bool],
+    threshold: float
+) -> List[str]:
+    """Compare results against a baseline and print a table of the changes.
+
+    Args:
+        results: Current results by benchmark name
+        baseline: Baseline results by benchmark name
+        metrics: Metric name to whether higher values are better
+        threshold: Relative change beyond which a worse value is a regression
+
+    Returns:
+        Descriptions of the regressions found
+    """
+    regressions = []
+    print(f"{'Benchmark':<28} {'Metric':<16} {'Baseline':>12} {'Current':>12} {'Change':>8}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            print(f"{name:<28} (not in baseline)")
+            continue
+        for metric, higher_is_better in metrics.items():
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > threshold:
+                flag = "  REGRESSION"
+                regressions.append(f"{name} {metric}: {old} -> {new} ({change:+.1%})")
+            elif worse < -threshold:
+                flag = "  improved"
+            print(f"{name:<28} {metric:<16} {old:>12} {new:>12} {change:>+8.1%}{flag}")
+    return regressions
@@ -0,0 +1,171 @@
+"""
+End-to-end crawl benchmark against a local synthetic documentation site.
+
+Each scenario serves a generated site (see site.SiteSpec) from this
+process and runs DocGen.process_site against it in a fresh child process,
+so peak RSS is measured for the crawl alone. Reports pages/sec, p50/p99
+page latency (fetch plus extraction) and peak RSS.
+
+    python -m benchmarks.crawl                     # All scenarios
+    python -m benchmarks.crawl default slow --repeat 3
+    python -m benchmarks.crawl --save              # Write benchmarks/baselines/crawl.json
+    python -m benchmarks.crawl --compare           # Compare against it, exit 1 on regressions
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import multiprocessing
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .baseline import BASELINE_DIR, compare, load_baseline, peak_rss_mb, percentile, save_baseline
+from .site import SiteSpec, serve_in_thread
+
+SCENARIOS = {
+    "small": SiteSpec(pages=50),
+    "default": SiteSpec(pages=300),
+    "wide": SiteSpec(pages=300, fanout=25),
+    "heavy": SiteSpec(pages=150, page_kb=64, code_blocks=12),
+    "slow": SiteSpec(pages=100, latency_ms=20, jitter_ms=30),
+    "flaky": SiteSpec(pages=200, error_rate=0.1),
+}
+
+# Reported metric to whether higher values are better
+METRICS = {
+    "pages_per_sec": True,
+    "p50_ms": False,
+    "p99_ms": False,
+    "peak_rss_mb": False,
+}
+
+DEFAULT_BASELINE = BASELINE_DIR / "crawl.json"
+
+def _crawl(url: str, config_options: Dict[str, Any]) -> Dict[str, Any]:
+    """Crawl a site with DocGen and time every page (runs in a child process)"""
+    from site_doc_gen import Config, DocGen
+
+    # Injected errors would otherwise be logged for every failing page
+    logging.getLogger("site_doc_gen").setLevel(logging.CRITICAL)
+    latencies: List[float] = []
+
+    class TimedDocGen(DocGen):
+        async def _process_page(self, page_url):
+            start = time.perf_counter()
+            try:
+                return await super()._process_page(page_url)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+    async def run():
+        with tempfile.TemporaryDirectory() as output_dir:
+            config = Config(output_dir=Path(output_dir), quiet=True, **config_options)
+            async with TimedDocGen(config) as doc_gen:
+                start = time.perf_counter()
+                # process_site reports each page on stdout
+                with contextlib.redirect_stdout(io.StringIO()):
+                    docs = await doc_gen.process_site(url)
+                return docs, time.perf_counter() - start
+
+    docs, elapsed = asyncio.run(run())
+    return {
+        "pages": len(docs.pages),
+        "elapsed": elapsed,
+        "latencies": latencies,
+        "stages": {
+            stage: stats["total_seconds"]
+            for stage, stats in docs.metadata["metrics"]["stages"].items()
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def run_scenario(spec: SiteSpec, repeat: int = 1, config_options: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Serve a site and crawl it repeat times, reporting the median run"""
+    context = multiprocessing.get_context("spawn")
+    runs = []
+    with serve_in_thread(spec) as site:
+        for _ in range(repeat):
+            with context.Pool(1) as pool:
+                runs.append(pool.apply(_crawl, (site.url, config_options or {})))
+        requests, errors = site.requests, site.errors
+    runs.sort(key=lambda run: run["elapsed"])
+    run = runs[len(runs) // 2]
+    latencies = run["latencies"]
+    return {
+        "spec": spec.to_dict(),
+        "runs": repeat,
+        "pages": run["pages"],
+        "requests": requests // repeat,
+        "errors": errors // repeat,
+        "elapsed_s": round(run["elapsed"], 3),
+        "pages_per_sec": round(run["pages"] / run["elapsed"], 2) if run["elapsed"] else 0.0,
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2) if latencies else 0.0,
+        "peak_rss_mb": run["peak_rss_mb"],
+        "stages_s": run["stages"],
+    }
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("scenarios", nargs="*", help=f"Scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--pages", type=int, help="Override the number of pages")
+    parser.add_argument("--fanout", type=int, help="Override the links per page")
+    parser.add_argument("--page-kb", type=float, help="Override the page size in KB")
+    parser.add_argument("--code-blocks", type=int, help="Override the code blocks per page")
+    parser.add_argument("--latency-ms", type=float, help="Override the response latency")
+    parser.add_argument("--error-rate", type=float, help="Override the fraction of failing pages")
+    parser.add_argument("--concurrency", type=int, help="DocGen concurrency setting")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scenario; the median is reported")
+    parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, type=Path, metavar="PATH",
+                        help="Save results as a baseline (default: benchmarks/baselines/crawl.json)")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, type=Path, metavar="PATH",
+                        help="Compare results against a baseline")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative change counted as a regression (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    overrides = {
+        field: value for field, value in (
+            ("pages", args.pages), ("fanout", args.fanout), ("page_kb", args.page_kb),
+            ("code_blocks", args.code_blocks), ("latency_ms", args.latency_ms),
+            ("error_rate", args.error_rate),
+        )
+        if value is not None
+    }
+    config_options = {"concurrency": args.concurrency} if args.concurrency else {}
+
+    results = {}
+    print(f"{'Scenario':<10} {'Pages':>6} {'Errors':>6} {'Pages/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'RSS MiB':>8}")
+    for name in names:
+        result = run_scenario(replace(SCENARIOS[name], **overrides), args.repeat, config_options)
+        results[name] = result
+        print(
+            f"{name:<10} {result['pages']:>6} {result['errors']:>6} {result['pages_per_sec']:>9.2f} "
+            f"{result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['peak_rss_mb'] or 0:>8.1f}"
+        )
+
+    if args.save:
+        save_baseline(args.save, results)
+        print(f"\nSaved baseline to {args.save}")
+    if args.compare:
+        print()
+        regressions = compare(results, load_baseline(args.compare), METRICS, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
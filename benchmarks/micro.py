@@ -0,0 +1,297 @@
+"""
+Micro-benchmarks for the extraction and rendering hot paths.
+
+Each benchmark runs one function over every page in a fixed fixture corpus
+(benchmarks/fixtures, saved pages from common documentation generators).
+Timing follows timeit: the loop count is calibrated so a sample lasts at
+least --min-time, warm-up samples are discarded, the garbage collector is
+paused while sampling and per-call statistics are taken over --repeat
+samples.
+
+    python -m benchmarks.micro                     # All benchmarks
+    python -m benchmarks.micro -k extract --repeat 30
+    python -m benchmarks.micro --fixtures ~/saved-pages
+    python -m benchmarks.micro --save              # Write benchmarks/baselines/micro.json
+    python -m benchmarks.micro --compare           # Compare against it, exit 1 on regressions
+"""
+
+import argparse
+import gc
+import hashlib
+import statistics
+import sys
+import tempfile
+import time
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from bs4 import BeautifulSoup
+
+from .baseline import BASELINE_DIR, compare, load_baseline, percentile, save_baseline
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+
+DEFAULT_BASELINE = BASELINE_DIR / "micro.json"
+
+# Reported metric to whether higher values are better
+METRICS = {
+    "median_us": False,
+    "min_us": False,
+}
+
+# Paths and patterns for match_path, shaped like real --match/--exclude use
+MATCH_PATTERNS = ["docs/*", "api/**/*.html", "guides", "blog/*/2024/*", "*.md", "reference/v2"]
+MATCH_PATHS = [
+    f"/{section}/{name}{suffix}"
+    for section in ("docs", "api/v1/models", "guides", "blog/posts/2024", "reference/v2", "changelog")
+    for name in ("index", "getting-started", "agent", "tools", "results", "messages", "testing")
+    for suffix in ("", "/", ".html", ".md")
+]
+
+class Fixtures:
+    """Fixture pages and the objects derived from them, built once per run"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.html: Dict[str, str] = {
+            path.name: path.read_text(encoding="utf-8")
+            for path in sorted(directory.glob("*.html"))
+        }
+        if not self.html:
+            raise SystemExit(f"No .html fixtures in {directory}")
+        self._output = tempfile.TemporaryDirectory()
+
+    @cached_property
+    def fingerprint(self) -> str:
+        """Short hash of the corpus, so baselines from different corpora aren't compared blindly"""
+        digest = hashlib.sha256()
+        for name, html in self.html.items():
+            digest.update(name.encode() + b"\0" + html.encode() + b"\0")
+        return digest.hexdigest()[:12]
+
+    def url(self, name: str) -> str:
+        return f"https://docs.example.org/{Path(name).stem}/"
+
+    def doc_gen(self, **options):
+        """A DocGen writing to a scratch directory, set up for the fixture site"""
+        from site_doc_gen import Config, DocGen
+
+        options.setdefault("output_dir", Path(self._output.name))
+        config = Config(quiet=True, search_index=False, snippet_index=False, precompress=False, **options)
+        doc_gen = DocGen(config)
+        doc_gen.base_url = self.url("")
+        doc_gen.base_domain = "docs.example.org"
+        return doc_gen
+
+    @cached_property
+    def pages(self) -> List:
+        """Pages extracted from the fixtures as a crawl would, plus a markdown and a source page"""
+        from site_doc_gen.types import CodeSnippet, Page
+
+        doc_gen = self.doc_gen()
+        pages = [doc_gen._extract_page(self.url(name), html) for name, html in self.html.items()]
+        markdown = "\n\n".join(
+            f"## Section {i}\n\nSome *text* with `code`.\n\n```python\nprint({i})\n```" for i in range(20)
+        )
+        pages.append(Page(url=self.url("guide.md"), title="guide.md", content=markdown, content_format="markdown"))
+        source = "\n".join(f"def function_{i}(value):\n    return value * {i}\n" for i in range(100))
+        pages.append(Page(
+            url=self.url("module.py"), title="module.py", content="", content_format="text",
+            code_snippets=[CodeSnippet(language="python", code=source)]
+        ))
+        return pages
+
+    @cached_property
+    def content_soups(self) -> List[Tuple[str, BeautifulSoup]]:
+        """Parsed main content of each HTML page, the input of the extract functions"""
+        return [
+            (page.url, BeautifulSoup(page.content, "html.parser"))
+            for page in self.pages if page.content_format == "html"
+        ]
+
+    def documentation(self):
+        from site_doc_gen.types import Documentation
+
+        return Documentation(pages=list(self.pages), base_url=self.url(""))
+
+    def close(self) -> None:
+        self._output.cleanup()
+
+# Benchmark name to a factory that prepares inputs and returns the timed callable
+BENCHMARKS: Dict[str, Callable[[Fixtures], Callable[[], Any]]] = {}
+
+def benchmark(name: str):
+    def register(factory: Callable[[Fixtures], Callable[[], Any]]):
+        BENCHMARKS[name] = factory
+        return factory
+    return register
+
+@benchmark("extract.page")
+def _extract_page(fixtures: Fixtures):
+    doc_gen = fixtures.doc_gen()
+    items = [(fixtures.url(name), html) for name, html in fixtures.html.items()]
+    return lambda: [doc_gen._extract_page(url, html) for url, html in items]
+
+@benchmark("extract.code_snippets")
+def _extract_code_snippets(fixtures: Fixtures):
+    doc_gen = fixtures.doc_gen()
+    soups = [soup for _, soup in fixtures.content_soups]
+    return lambda: [doc_gen._extract_code_snippets(soup) for soup in soups]
+
+@benchmark("extract.headings")
+def _extract_headings(fixtures: Fixtures):
+    doc_gen = fixtures.doc_gen()
+    soups = [soup for _, soup in fixtures.content_soups]
+    return lambda: [doc_gen._extract_headings(soup) for soup in soups]
+
+@benchmark("extract.links")
+def _extract_links(fixtures: Fixtures):
+    doc_gen = fixtures.doc_gen()
+    soups = fixtures.content_soups
+    return lambda: [doc_gen._extract_links(soup, url) for url, soup in soups]
+
+@benchmark("utils.match_path")
+def _match_path(fixtures: Fixtures):
+    from site_doc_gen.utils import match_path
+
+    return lambda: [match_path(path, MATCH_PATTERNS) for path in MATCH_PATHS]
+
+@benchmark("utils.suggest_content_selector")
+def _suggest_content_selector(fixtures: Fixtures):
+    from site_doc_gen.utils import suggest_content_selector
+
+    documents = list(fixtures.html.values())
+    return lambda: [suggest_content_selector(html) for html in documents]
+
+@benchmark("markdown.convert")
+def _markdown_convert(fixtures: Fixtures):
+    from site_doc_gen.markdown import MarkdownConverter
+
+    docs = fixtures.documentation()
+    # A fresh converter each call, so its in-memory results aren't reused
+    return lambda: MarkdownConverter(docs).convert()
+
+@benchmark("render.page_body_lines")
+def _page_body_lines(fixtures: Fixtures):
+    doc_gen = fixtures.doc_gen()
+    pages = fixtures.pages
+    return lambda: [doc_gen._page_body_lines(page) for page in pages]
+
+@benchmark("render.save_single")
+def _save_single(fixtures: Fixtures):
+    doc_gen = fixtures.doc_gen()
+    docs = fixtures.documentation()
+    return lambda: doc_gen._save_documentation(docs)
+
+@benchmark("render.save_split")
+def _save_split(fixtures: Fixtures):
+    doc_gen = fixtures.doc_gen(split_pages=True, create_index=True)
+    docs = fixtures.documentation()
+    return lambda: doc_gen._save_documentation(docs)
+
+@benchmark("render.html")
+def _render_html(fixtures: Fixtures):
+    from site_doc_gen.markdown import MarkdownConverter
+    from site_doc_gen.render import HTMLRenderer
+
+    text = MarkdownConverter(fixtures.documentation()).convert()
+    renderer = HTMLRenderer(Path(fixtures._output.name))
+    renderer._stylesheet()
+    return lambda: renderer.to_html(text, "Documentation")
+
+def _sample(func: Callable[[], Any], loops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(loops):
+        func()
+    return time.perf_counter() - start
+
+def measure(func: Callable[[], Any], repeat: int, warmup: int, min_time: float) -> Dict[str, Any]:
+    """Time func, returning per-call statistics in microseconds"""
+    # Calibrate the loop count so one sample lasts at least min_time
+    loops = 1
+    while _sample(func, loops) < min_time:
+        loops *= 2
+    for _ in range(warmup):
+        _sample(func, loops)
+
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        samples = [_sample(func, loops) / loops * 1e6 for _ in range(repeat)]
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    q1, q3 = percentile(samples, 0.25), percentile(samples, 0.75)
+    iqr = q3 - q1
+    return {
+        "median_us": round(statistics.median(samples), 2),
+        "min_us": round(min(samples), 2),
+        "mean_us": round(statistics.mean(samples), 2),
+        "stdev_us": round(statistics.stdev(samples), 2) if len(samples) > 1 else 0.0,
+        "iqr_us": round(iqr, 2),
+        "outliers": sum(1 for s in samples if s < q1 - 1.5 * iqr or s > q3 + 1.5 * iqr),
+        "loops": loops,
+        "samples": repeat,
+    }
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-k", dest="keyword", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--list", action="store_true", help="List the benchmarks and exit")
+    parser.add_argument("--fixtures", type=Path, default=FIXTURE_DIR, help="Directory of saved .html pages")
+    parser.add_argument("--repeat", type=int, default=15, help="Timed samples per benchmark (default: 15)")
+    parser.add_argument("--warmup", type=int, default=2, help="Discarded samples per benchmark (default: 2)")
+    parser.add_argument("--min-time", type=float, default=0.05,
+                        help="Minimum seconds per sample (default: 0.05)")
+    parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, type=Path, metavar="PATH",
+                        help="Save results as a baseline (default: benchmarks/baselines/micro.json)")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, type=Path, metavar="PATH",
+                        help="Compare results against a baseline")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative change counted as a regression (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if not args.keyword or args.keyword in name]
+    if args.list:
+        print("\n".join(names))
+        return 0
+    if not names:
+        parser.error(f"no benchmark matches {args.keyword!r}")
+
+    fixtures = Fixtures(args.fixtures.expanduser())
+    results = {}
+    print(f"Fixtures: {len(fixtures.html)} pages from {fixtures.directory} ({fixtures.fingerprint})\n")
+    print(f"{'Benchmark':<34} {'Median us':>11} {'Min us':>11} {'Stdev us':>10} {'IQR us':>10} {'Loops':>7}")
+    try:
+        for name in names:
+            func = BENCHMARKS[name](fixtures)
+            result = measure(func, args.repeat, args.warmup, args.min_time)
+            result["fixtures"] = fixtures.fingerprint
+            results[name] = result
+            print(
+                f"{name:<34} {result['median_us']:>11.1f} {result['min_us']:>11.1f} "
+                f"{result['stdev_us']:>10.1f} {result['iqr_us']:>10.1f} {result['loops']:>7}"
+            )
+    finally:
+        fixtures.close()
+
+    if args.save:
+        save_baseline(args.save, results)
+        print(f"\nSaved baseline to {args.save}")
+    if args.compare:
+        baseline = load_baseline(args.compare)
+        mismatched = [name for name in results if name in baseline and baseline[name].get("fixtures") != fixtures.fingerprint]
+        if mismatched:
+            print(f"\nWarning: baseline was recorded with different fixtures for {', '.join(mismatched)}")
+        print()
+        regressions = compare(results, baseline, METRICS, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
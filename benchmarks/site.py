@@ -0,0 +1,151 @@
+"""
+Synthetic documentation site served locally with aiohttp
+"""
+
+import asyncio
+import contextlib
+import random
+import threading
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, List
+
+from aiohttp import web
+
+WORDS = (
+    "client request response session config page handler model schema field "
+    "validate parse render stream token cache index query result error value "
+    "async await return default option argument module package install run"
+).split()
+
+@dataclass
+class SiteSpec:
+    """Shape of a generated documentation site"""
+    pages: int = 200
+    fanout: int = 5  # Links to other pages on each page
+    page_kb: float = 8.0  # Approximate size of each page's HTML
+    code_blocks: int = 2  # Code blocks on each page
+    latency_ms: float = 0.0  # Delay before each response
+    jitter_ms: float = 0.0  # Random extra delay, up to this much
+    error_rate: float = 0.0  # Fraction of pages answered with HTTP 500
+    seed: int = 0
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+def _paragraph(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+def _code_block(rng: random.Random, index: int) -> str:
+    lines = [f"def {rng.choice(WORDS)}_{index}({rng.choice(WORDS)}, {rng.choice(WORDS)}=None):"]
+    for _ in range(rng.randint(3, 12)):
+        lines.append(f"    {rng.choice(WORDS)} = {rng.choice(WORDS)}.{rng.choice(WORDS)}({rng.choice(WORDS)})")
+    lines.append(f"    return {rng.choice(WORDS)}")
+    code = "\n".join(lines).replace("<", "&lt;").replace(">", "&gt;")
+    return f'<div class="highlight"><pre><code class="language-python">{code}</code></pre></div>'
+
+def page_links(spec: SiteSpec, index: int) -> List[int]:
+    """Pages linked from a page: its children in a spanning tree, then random pages"""
+    links = [child for child in range(index * spec.fanout + 1, index * spec.fanout + spec.fanout + 1)
+             if child < spec.pages]
+    rng = random.Random(f"{spec.seed}:links:{index}")
+    while len(links) < min(spec.fanout, spec.pages - 1):
+        target = rng.randrange(spec.pages)
+        if target != index and target not in links:
+            links.append(target)
+    return links
+
+def page_url(index: int) -> str:
+    return "/docs/" if index == 0 else f"/docs/page-{index}/"
+
+def render_page(spec: SiteSpec, index: int) -> str:
+    """Generate the HTML of one page, the same for a given spec and index"""
+    rng = random.Random(f"{spec.seed}:page:{index}")
+    links = page_links(spec, index)
+    nav = "".join(f'<li><a href="{page_url(i)}">Page {i}</a></li>' for i in links)
+    # Crawlers follow links in the extracted content, not the sidebar, so
+    # every link also appears in the prose
+    related = ", ".join(f'<a href="{page_url(i)}">page {i}</a>' for i in links)
+    sections = [f"<p>{_paragraph(rng, 40)} See also {related}.</p>"] if links else []
+    budget = int(spec.page_kb * 1024)
+    size = 0
+    section = 0
+    while size < budget or section < max(1, spec.code_blocks):
+        parts = [f'<h2 id="section-{section}">Section {section}</h2>']
+        parts += [f"<p>{_paragraph(rng, rng.randint(20, 60))}</p>" for _ in range(rng.randint(1, 3))]
+        if section < spec.code_blocks:
+            parts.append(_code_block(rng, section))
+        text = "\n".join(parts)
+        sections.append(text)
+        size += len(text)
+        section += 1
+    return (
+        f"<!DOCTYPE html><html><head><title>Page {index} - Synthetic Docs</title>"
+        f'<link rel="stylesheet" href="/static/site.css"><script src="/static/site.js"></script></head>'
+        f'<body><nav class="sidebar"><ul>{nav}</ul></nav>'
+        f'<main><article class="md-content"><h1>Page {index}</h1>\n'
+        + "\n".join(sections)
+        + "</article></main><footer>Generated for benchmarking</footer></body></html>"
+    )
+
+class SyntheticSite:
+    """Serve a generated site on 127.0.0.1 for the duration of an async with block.
+
+    Pages are rendered once up front so generation does not count against
+    the crawler. Pages chosen for errors (error_rate, picked by seed)
+    always answer HTTP 500.
+    """
+
+    def __init__(self, spec: SiteSpec):
+        self.spec = spec
+        self.pages = {page_url(i): render_page(spec, i) for i in range(spec.pages)}
+        rng = random.Random(f"{spec.seed}:errors")
+        # The root page never fails, or there would be nothing to crawl
+        self.failing = {url for url in list(self.pages)[1:] if rng.random() < spec.error_rate}
+        self.requests = 0
+        self.errors = 0
+        self._rng = random.Random(f"{spec.seed}:latency")
+        self._runner = None
+        self.url = ""
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        delay = self.spec.latency_ms + self._rng.uniform(0, self.spec.jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if request.path in self.failing:
+            self.errors += 1
+            return web.Response(status=500, text="Injected error")
+        html = self.pages.get(request.path)
+        if html is None:
+            return web.Response(status=404, text="Not found")
+        return web.Response(text=html, content_type="text/html")
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/{path:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}/docs/"
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._runner.cleanup()
+
+@contextlib.contextmanager
+def serve_in_thread(spec: SiteSpec) -> Iterator[SyntheticSite]:
+    """Serve a site from a background event loop, so it can be crawled from other processes"""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    site = SyntheticSite(spec)
+    asyncio.run_coroutine_threadsafe(site.__aenter__(), loop).result()
+    try:
+        yield site
+    finally:
+        asyncio.run_coroutine_threadsafe(site.__aexit__(None, None, None), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
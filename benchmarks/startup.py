@@ -0,0 +1,146 @@
+"""
+Startup-time checks for the package, the CLI and markdown worker processes.
+
+Each target runs in a fresh interpreter under `python -X importtime`, which
+reports the cumulative import time of every module; a target's import time
+is the total over everything it imports, interpreter startup included (lazy
+imports through importlib show up as top-level entries, so no single module
+covers them). Besides timing, a target
+fails outright if it loads a module it is meant to leave alone, e.g. if
+`site-doc-gen --help` starts importing aiohttp again.
+
+    python -m benchmarks.startup                   # Every target
+    python -m benchmarks.startup --repeat 20
+    python -m benchmarks.startup --save            # Write benchmarks/baselines/startup.json
+    python -m benchmarks.startup --compare         # Compare against it, exit 1 on regressions
+"""
+
+import argparse
+import dataclasses
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from .baseline import BASELINE_DIR, compare, load_baseline, save_baseline
+
+DEFAULT_BASELINE = BASELINE_DIR / "startup.json"
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Reported metric to whether higher values are better
+METRICS = {
+    "import_ms": False,
+    "wall_ms": False,
+}
+
+# Dependencies only the crawl itself needs
+HEAVY = ("aiohttp", "bs4", "readability", "lxml", "markdownify")
+
+@dataclasses.dataclass
+class Target:
+    """A command whose startup is timed"""
+    args: List[str]  # Arguments to the interpreter
+    forbidden: Tuple[str, ...] = ()  # Top-level packages it must not import
+
+TARGETS: Dict[str, Target] = {
+    "import.package": Target(["-c", "import site_doc_gen"], HEAVY),
+    "import.config": Target(["-c", "from site_doc_gen import Config"], HEAVY),
+    "cli.help": Target(["-m", "site_doc_gen.cli", "--help"], HEAVY),
+    # What the web interface imports before its first crawl
+    "import.web": Target([
+        "-c",
+        "from site_doc_gen import Config; import site_doc_gen.search, site_doc_gen.snippets, "
+        "site_doc_gen.metrics, site_doc_gen.utils"
+    ], HEAVY),
+    # What a spawned ProcessPoolExecutor worker imports to convert pages
+    "worker.markdown": Target(["-c", "import site_doc_gen.markdown"], ("aiohttp", "readability")),
+    "import.core": Target(["-c", "import site_doc_gen.core"]),
+}
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+def run_target(target: Target) -> Dict[str, Any]:
+    """Run a target once, returning its import time, wall time and the packages it loaded"""
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", *target.args],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"{' '.join(target.args)} failed:\n{completed.stderr[-2000:]}")
+
+    total = 0
+    packages = set()
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        packages.add(match.group(4).split(".")[0])
+        if not match.group(3):
+            # Top-level entries include the time of everything they import
+            total += int(match.group(2))
+    return {"import_ms": total / 1000, "wall_ms": wall * 1000, "packages": packages}
+
+def measure(target: Target, repeat: int) -> Dict[str, Any]:
+    """Run a target repeat times (after one discarded warm-up run), returning medians"""
+    run_target(target)
+    runs = [run_target(target) for _ in range(repeat)]
+    loaded = set.union(*(run["packages"] for run in runs))
+    return {
+        "import_ms": round(statistics.median(run["import_ms"] for run in runs), 1),
+        "wall_ms": round(statistics.median(run["wall_ms"] for run in runs), 1),
+        "min_import_ms": round(min(run["import_ms"] for run in runs), 1),
+        "forbidden": sorted(loaded.intersection(target.forbidden)),
+        "samples": repeat,
+    }
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("targets", nargs="*", choices=[[], *TARGETS], metavar="target",
+                        help=f"Targets to run (default: all of {', '.join(TARGETS)})")
+    parser.add_argument("--repeat", type=int, default=7, help="Timed runs per target (default: 7)")
+    parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, type=Path, metavar="PATH",
+                        help="Save results as a baseline (default: benchmarks/baselines/startup.json)")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, type=Path, metavar="PATH",
+                        help="Compare results against a baseline")
+    parser.add_argument("--threshold", type=float, default=0.20,
+                        help="Relative change counted as a regression (default: 0.20)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    failures = []
+    print(f"{'Target':<20} {'Import ms':>10} {'Min ms':>8} {'Wall ms':>9}  Heavy imports")
+    for name in args.targets or TARGETS:
+        target = TARGETS[name]
+        result = measure(target, max(1, args.repeat))
+        results[name] = result
+        if result["forbidden"]:
+            failures.append(f"{name} imports {', '.join(result['forbidden'])}")
+        print(
+            f"{name:<20} {result['import_ms']:>10.1f} {result['min_import_ms']:>8.1f} "
+            f"{result['wall_ms']:>9.1f}  {', '.join(result['forbidden']) or '-'}"
+        )
+
+    if args.save:
+        save_baseline(args.save, results)
+        print(f"\nSaved baseline to {args.save}")
+    if args.compare:
+        print()
+        failures.extend(compare(results, load_baseline(args.compare), METRICS, args.threshold))
+    if failures:
+        print(f"\n{len(failures)} failure(s):")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,9 +2,35 @@
 site-doc-gen - A Python-based documentation site crawler and content extractor
 """
 
-from .core import DocGen
-from .config import Config
-from .types import Page, CodeSnippet, Heading
+import importlib
+from typing import TYPE_CHECKING
 
 __version__ = "0.1.0"
 __all__ = ["DocGen", "Config", "Page", "CodeSnippet", "Heading"]
+
+# Public names to the submodule defining them. They are imported on first
+# access, so `from site_doc_gen import Config` or `site-doc-gen --help` don't
+# load aiohttp, BeautifulSoup and readability.
+_LAZY = {
+    "DocGen": ".core",
+    "Config": ".config",
+    "Page": ".types",
+    "CodeSnippet": ".types",
+    "Heading": ".types",
+}
+
+if TYPE_CHECKING:
+    from .core import DocGen
+    from .config import Config
+    from .types import Page, CodeSnippet, Heading
+
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
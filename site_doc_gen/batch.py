@@ -0,0 +1,334 @@
+"""
+Batch mode: generate documentation for many sites in one process under a shared budget
+"""
+
+import asyncio
+import dataclasses
+import json
+import logging
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, Hashable, List, Optional
+
+import aiohttp
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONNECTIONS = 16  # Requests in flight across all sites
+DEFAULT_SITES = 4  # Sites processed at once
+DEFAULT_WORKERS = 8  # Threads shared by page extraction, rendering and local-source reads
+
+SUMMARY_FILE = "batch-summary.json"
+
+class FairScheduler:
+    """Share a fixed number of slots between clients, fairly.
+
+    Slots are granted immediately while any are free. Once they run out,
+    each freed slot goes to the waiting client holding the fewest slots
+    (ties go to the one served longest ago), so a site that queues many
+    requests can't starve one that queues few.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self.in_use = 0
+        self._waiters: Dict[Hashable, Deque[asyncio.Future]] = {}
+        self._queued = 0
+        self._held: Dict[Hashable, int] = defaultdict(int)
+        self._served_at: Dict[Hashable, int] = defaultdict(int)
+        self._serial = 0
+        self.granted: Dict[Hashable, int] = defaultdict(int)
+        self.waited: Dict[Hashable, float] = defaultdict(float)
+
+    def _grant(self, key: Hashable) -> None:
+        self.in_use += 1
+        self._held[key] += 1
+        self.granted[key] += 1
+        self._serial += 1
+        self._served_at[key] = self._serial
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiting clients"""
+        while self.in_use < self.capacity and self._queued:
+            key = min(self._waiters, key=lambda k: (self._held[k], self._served_at[k]))
+            waiters = self._waiters[key]
+            future = waiters.popleft()
+            self._queued -= 1
+            if not waiters:
+                del self._waiters[key]
+            if future.cancelled():
+                continue
+            self._grant(key)
+            future.set_result(None)
+
+    async def acquire(self, key: Hashable) -> None:
+        """Wait for a slot for a client"""
+        if self.in_use < self.capacity and not self._queued:
+            self._grant(key)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, deque()).append(future)
+        self._queued += 1
+        start = time.perf_counter()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just before the cancellation arrived
+                self.release(key)
+            elif key in self._waiters and future in self._waiters[key]:
+                self._waiters[key].remove(future)
+                self._queued -= 1
+                if not self._waiters[key]:
+                    del self._waiters[key]
+            raise
+        finally:
+            self.waited[key] += time.perf_counter() - start
+
+    def release(self, key: Hashable) -> None:
+        """Return a client's slot"""
+        self.in_use -= 1
+        self._held[key] -= 1
+        if not self._held[key]:
+            del self._held[key]
+        self._dispatch()
+
+class SiteLimiter:
+    """A site's own concurrency limit combined with its share of a FairScheduler.
+
+    Used like an asyncio.Semaphore, in place of DocGen's per-site semaphores.
+    """
+
+    def __init__(self, scheduler: FairScheduler, key: Hashable, concurrency: int):
+        self.scheduler = scheduler
+        self.key = key
+        self._local = asyncio.Semaphore(max(1, concurrency))
+
+    async def __aenter__(self):
+        await self._local.acquire()
+        try:
+            await self.scheduler.acquire(self.key)
+        except BaseException:
+            self._local.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.scheduler.release(self.key)
+        self._local.release()
+
+class Budget:
+    """Connections and worker threads shared by every DocGen in a batch.
+
+    Each site keeps its own ``concurrency`` limit, but its requests also need
+    one of ``connections`` slots, handed out fairly across sites. Sessions
+    share one connection pool of the same size. The CPU-bound work of every
+    site (HTML extraction, rendering the combined output, reading local
+    sources) runs on one pool of ``workers`` threads, so no more than that
+    many pages are being parsed at once however many sites are running.
+    """
+
+    def __init__(self, connections: int = DEFAULT_CONNECTIONS, workers: int = DEFAULT_WORKERS):
+        self.connections = max(1, connections)
+        self.scheduler = FairScheduler(self.connections)
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="site-doc-gen")
+        self.connector: Optional[aiohttp.TCPConnector] = None
+
+    def limiter(self, key: Hashable, concurrency: int) -> SiteLimiter:
+        return SiteLimiter(self.scheduler, key, concurrency)
+
+    async def __aenter__(self):
+        self.connector = aiohttp.TCPConnector(limit=self.connections, limit_per_host=0)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self.connector:
+            await self.connector.close()
+        self.executor.shutdown(wait=True)
+
+@dataclasses.dataclass
+class BatchSite:
+    """One entry of a batch manifest"""
+    url: str
+    options: Dict[str, Any] = dataclasses.field(default_factory=dict)  # Config overrides
+    output: Optional[Path] = None  # Combined JSON or markdown output, as with -o for a single site
+
+@dataclasses.dataclass
+class BatchManifest:
+    """Sites to process and the budget they share"""
+    sites: List[BatchSite]
+    defaults: Dict[str, Any] = dataclasses.field(default_factory=dict)  # Config overrides for every site
+    connections: int = DEFAULT_CONNECTIONS
+    max_sites: int = DEFAULT_SITES
+    workers: int = DEFAULT_WORKERS
+
+_CONFIG_FIELDS = {field.name for field in dataclasses.fields(Config)}
+
+def _check_options(options: Dict[str, Any], where: str) -> Dict[str, Any]:
+    unknown = sorted(set(options) - _CONFIG_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown Config option(s) in {where}: {', '.join(unknown)}")
+    return options
+
+def load_manifest(path: Path) -> BatchManifest:
+    """Read a batch manifest from a YAML or JSON file.
+
+    The file is either a list of sites or a mapping with ``sites`` and
+    optional ``defaults`` (Config overrides for every site) and ``budget``
+    (``connections``, ``sites``, ``workers``). A site is a URL string or a
+    mapping with ``url``, an optional ``output`` path for the combined
+    document (as with ``-o`` for a single site) and any Config fields to
+    override::
+
+        budget:
+          connections: 16
+          sites: 4
+        defaults:
+          max_pages: 200
+        sites:
+          - https://docs.example.org/
+          - url: https://github.com/owner/repo
+            match: ["docs/*"]
+            github_archive: true
+            output_format: json
+            output: repo.json
+
+    Raises:
+        ValueError: If the manifest is malformed or names unknown options
+    """
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("YAML manifests need PyYAML: pip install 'site-doc-gen[batch]'") from None
+        data = yaml.safe_load(text)
+    else:
+        data = json.loads(text)
+
+    if isinstance(data, list):
+        data = {"sites": data}
+    if not isinstance(data, dict) or not isinstance(data.get("sites"), list):
+        raise ValueError(f"{path}: expected a list of sites or a mapping with a 'sites' list")
+
+    sites = []
+    for i, entry in enumerate(data["sites"]):
+        if isinstance(entry, str):
+            entry = {"url": entry}
+        if not isinstance(entry, dict) or not entry.get("url"):
+            raise ValueError(f"{path}: site {i + 1} needs a url")
+        options = dict(entry)
+        url = options.pop("url")
+        output = options.pop("output", None)
+        sites.append(BatchSite(
+            url=url,
+            options=_check_options(options, f"{path} site {i + 1}"),
+            output=Path(output) if output else None
+        ))
+
+    budget = data.get("budget") or {}
+    return BatchManifest(
+        sites=sites,
+        defaults=_check_options(dict(data.get("defaults") or {}), f"{path} defaults"),
+        connections=int(budget.get("connections", DEFAULT_CONNECTIONS)),
+        max_sites=int(budget.get("sites", DEFAULT_SITES)),
+        workers=int(budget.get("workers", DEFAULT_WORKERS)),
+    )
+
+async def run_batch(
+    manifest: BatchManifest,
+    base_config: Optional[Dict[str, Any]] = None,
+    summary_path: Optional[Path] = None
+) -> Dict[str, Any]:
+    """Process every site of a manifest concurrently under one Budget.
+
+    A site that fails is recorded in the summary and does not stop the
+    rest. Sites are written as with the single-site command: a site with an
+    ``output`` path, or with output_format "json" (default path:
+    <site_dir>/documentation.json), also gets the combined document.
+
+    Args:
+        manifest: Sites and budget
+        base_config: Config options under the manifest's defaults (e.g. from the CLI)
+        summary_path: Where to write the combined summary (default:
+            output_dir/batch-summary.json)
+
+    Returns:
+        The combined summary
+    """
+    from .core import DocGen
+
+    site_slots = asyncio.Semaphore(max(1, manifest.max_sites))
+    started = time.perf_counter()
+
+    async with Budget(manifest.connections, manifest.workers) as budget:
+
+        async def process(site: BatchSite) -> Dict[str, Any]:
+            options = {**(base_config or {}), **manifest.defaults, **site.options}
+            result: Dict[str, Any] = {"url": site.url}
+            doc_gen = None
+            async with site_slots:
+                site_started = time.perf_counter()
+                try:
+                    config = Config(**options)
+                    doc_gen = DocGen(config, budget=budget)
+                    async with doc_gen:
+                        docs = await doc_gen.process_site(site.url)
+                    output_file = site.output
+                    if output_file is None and config.output_format == "json":
+                        output_file = Path(docs.metadata["output"]["site_dir"]) / "documentation.json"
+                    if output_file is not None:
+                        text = await asyncio.get_running_loop().run_in_executor(
+                            budget.executor, doc_gen.render_documentation, docs
+                        )
+                        output_file.parent.mkdir(parents=True, exist_ok=True)
+                        output_file.write_text(text, encoding="utf-8")
+                    # Unreachable sites and over-strict patterns produce no pages rather than errors
+                    result.update(
+                        status="ok" if docs.pages else "empty",
+                        pages=len(docs.pages),
+                        output=docs.metadata.get("output"),
+                        output_file=str(output_file) if output_file else None,
+                        metrics=docs.metadata.get("metrics"),
+                    )
+                except Exception as e:
+                    logger.error(f"Error processing {site.url}: {str(e)}")
+                    result.update(status="error", error=str(e))
+                result["elapsed_s"] = round(time.perf_counter() - site_started, 3)
+            if doc_gen is not None:
+                # DocGen instances are the scheduler's client keys
+                result["requests"] = budget.scheduler.granted.pop(doc_gen, 0)
+                result["slot_wait_s"] = round(budget.scheduler.waited.pop(doc_gen, 0.0), 3)
+            return result
+
+        results = await asyncio.gather(*(process(site) for site in manifest.sites))
+
+    summary = {
+        "generated_at": datetime.now().isoformat(),
+        "elapsed_s": round(time.perf_counter() - started, 3),
+        "budget": {
+            "connections": manifest.connections,
+            "sites": manifest.max_sites,
+            "workers": manifest.workers,
+        },
+        "total_sites": len(results),
+        "succeeded": sum(1 for result in results if result["status"] == "ok"),
+        "empty": sum(1 for result in results if result["status"] == "empty"),
+        "failed": sum(1 for result in results if result["status"] == "error"),
+        "total_pages": sum(result.get("pages", 0) for result in results),
+        "sites": results,
+    }
+
+    if summary_path is None:
+        output_dir = Config(**{**(base_config or {}), **manifest.defaults}).output_dir
+        summary_path = output_dir / SUMMARY_FILE
+    summary_path.parent.mkdir(parents=True, exist_ok=True)
+    summary_path.write_text(json.dumps(summary, indent=2, default=str), encoding="utf-8")
+    summary["summary_path"] = str(summary_path)
+    return summary
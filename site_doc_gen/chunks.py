@@ -0,0 +1,306 @@
+"""
+Size-bounded chunks of extracted pages for retrieval, streamed to JSONL
+"""
+
+import dataclasses
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+from .languages import language_from_classes
+from .rawtext import markdown_blocks
+from .types import Page
+
+CHUNK_UNITS = ("chars", "tokens")
+
+# Bumped when chunking changes, so chunks from older releases aren't reused
+CHUNK_FORMAT = 1
+
+HEADING_TAGS = ["h1", "h2", "h3", "h4", "h5", "h6"]
+BLOCK_TAGS = HEADING_TAGS + ["p", "li", "pre", "blockquote", "table", "dt", "dd"]
+
+# Blocks taken whole, so blocks nested inside them are skipped
+CONTAINER_TAGS = ["li", "pre", "blockquote", "table", "dd"]
+
+# Rough tokenizer: a word or a single punctuation character per token
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+# Ways of splitting a block that is too large, coarsest first; each piece keeps
+# the whitespace after it so joining the pieces gives back the text
+_CODE_SPLITS = [re.compile(r"[^\n]*\n|[^\n]+$")]
+_PROSE_SPLITS = [re.compile(r".+?(?:[.!?]\s+|$)", re.S), re.compile(r"\S+\s*")]
+
+def approx_tokens(text: str) -> int:
+    """Approximate the number of tokens in a text, without a model's tokenizer"""
+    return len(_TOKEN_RE.findall(text))
+
+@dataclasses.dataclass
+class Block:
+    """A paragraph, list item, table or code block and the headings above it"""
+    heading_path: Tuple[str, ...]
+    kind: str  # 'prose' or 'code'
+    text: str
+    language: Optional[str] = None  # For code
+
+def _clean_text(element) -> str:
+    return " ".join(element.get_text(" ").split())
+
+def _html_blocks(page: Page) -> Iterator[Block]:
+    soup = BeautifulSoup(page.content, "html.parser")
+    languages = {snippet.code.strip(): snippet.language for snippet in page.code_snippets}
+    path: List[Tuple[int, str]] = []
+    for element in soup.find_all(BLOCK_TAGS):
+        if element.find_parent(CONTAINER_TAGS):
+            continue
+        if element.name in HEADING_TAGS:
+            level = int(element.name[1])
+            while path and path[-1][0] >= level:
+                path.pop()
+            text = _clean_text(element)
+            if text:
+                path.append((level, text))
+            continue
+        headings = tuple(text for _, text in path)
+        if element.name == "pre":
+            code = element.find("code") or element
+            text = code.get_text().strip("\n")
+            if text.strip():
+                language = (
+                    languages.get(text.strip())
+                    or language_from_classes([*code.get("class", []), *element.get("class", [])])
+                    or "text"
+                )
+                yield Block(headings, "code", text, language)
+            continue
+        text = _clean_text(element)
+        if text:
+            yield Block(headings, "prose", f"- {text}" if element.name == "li" else text)
+
+def _markdown_blocks(page: Page) -> Iterator[Block]:
+    path: List[Tuple[int, str]] = []
+    for kind, level, text, info in markdown_blocks(page.content):
+        if kind == "heading":
+            while path and path[-1][0] >= level:
+                path.pop()
+            if text:
+                path.append((level, text))
+        elif text.strip():
+            headings = tuple(heading for _, heading in path)
+            if kind == "code":
+                yield Block(headings, "code", text, info.split()[0].lower() if info else "text")
+            else:
+                yield Block(headings, "prose", text)
+
+def page_blocks(page: Page) -> Iterator[Block]:
+    """Walk a page's extracted content into blocks, in document order"""
+    if page.content_format == "markdown":
+        return _markdown_blocks(page)
+    if page.content_format == "text":
+        return (
+            Block((), "code", snippet.code.strip("\n"), snippet.language)
+            for snippet in page.code_snippets
+            if snippet.code.strip()
+        )
+    return _html_blocks(page)
+
+def _hash(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8", "surrogatepass"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class Chunker:
+    """Splits pages into chunks of at most size characters or approximate tokens.
+
+    A chunk never spans two sections or mixes prose and code: consecutive
+    blocks under the same heading path are packed together, and a block too
+    large for one chunk is split at lines (code) or sentences, then words
+    (prose). Consecutive chunks of a section share up to overlap units,
+    in whole lines or sentences.
+    """
+
+    def __init__(self, size: int = 1500, overlap: int = 150, unit: str = "chars"):
+        if unit not in CHUNK_UNITS:
+            raise ValueError(f"chunk unit must be one of {', '.join(CHUNK_UNITS)}, not {unit!r}")
+        if size <= 0:
+            raise ValueError("chunk size must be positive")
+        if not 0 <= overlap < size:
+            raise ValueError("chunk overlap must be at least 0 and smaller than the chunk size")
+        self.size = size
+        self.overlap = overlap
+        self.unit = unit
+        self.measure = len if unit == "chars" else approx_tokens
+
+    def page_hash(self, page: Page) -> str:
+        """Hash of everything a page's chunks depend on, including the options"""
+        parts = [f"{CHUNK_FORMAT}:{self.unit}:{self.size}:{self.overlap}", page.url, page.title or "", page.content]
+        if page.content_format == "text":
+            parts.extend(f"{snippet.language}\0{snippet.code}" for snippet in page.code_snippets)
+        return _hash(*parts)
+
+    def _split(self, text: str, splits: List[re.Pattern]) -> List[str]:
+        """Split text into pieces no larger than the chunk size"""
+        if self.measure(text) <= self.size:
+            return [text]
+        if not splits:
+            # A single line or word longer than a chunk: cut it. A token is
+            # at least one character, so size characters fit either unit.
+            return [text[i:i + self.size] for i in range(0, len(text), self.size)]
+        pieces = []
+        for part in splits[0].findall(text):
+            pieces.extend(self._split(part, splits[1:]))
+        return pieces
+
+    def _pack(self, pieces: List[Tuple[str, int]]) -> Iterator[str]:
+        """Pack measured pieces into chunks, carrying an overlap between them"""
+        current: List[Tuple[str, int]] = []
+        current_size = 0
+        for piece, size in pieces:
+            if current and current_size + size > self.size:
+                yield "".join(text for text, _ in current)
+                # Start the next chunk with the tail of this one
+                tail: List[Tuple[str, int]] = []
+                tail_size = 0
+                for previous, previous_size in reversed(current):
+                    if tail_size + previous_size > self.overlap or tail_size + previous_size + size > self.size:
+                        break
+                    tail.insert(0, (previous, previous_size))
+                    tail_size += previous_size
+                current, current_size = tail, tail_size
+            current.append((piece, size))
+            current_size += size
+        if current:
+            yield "".join(text for text, _ in current)
+
+    def _groups(self, blocks: Iterable[Block]) -> Iterator[Tuple[Block, List[Block]]]:
+        """Group consecutive blocks sharing a heading path, kind and language"""
+        group: List[Block] = []
+        for block in blocks:
+            if group and (block.heading_path, block.kind, block.language) != (
+                group[0].heading_path, group[0].kind, group[0].language
+            ):
+                yield group[0], group
+                group = []
+            group.append(block)
+        if group:
+            yield group[0], group
+
+    def chunk_page(self, page: Page, page_hash: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield the chunks of a page as JSON-ready records, in document order.
+
+        A chunk's hash covers only its text; its id also covers the page URL
+        and heading path, so an unchanged chunk keeps its id across runs
+        even when chunks before it change.
+        """
+        page_hash = page_hash or self.page_hash(page)
+        position = 0
+        for first, group in self._groups(page_blocks(page)):
+            splits = _CODE_SPLITS if first.kind == "code" else _PROSE_SPLITS
+            separator = "\n" if first.kind == "code" else "\n\n"
+            pieces: List[Tuple[str, int]] = []
+            for i, block in enumerate(group):
+                text = block.text + (separator if i < len(group) - 1 else "")
+                pieces.extend((piece, self.measure(piece)) for piece in self._split(text, splits))
+            for text in self._pack(pieces):
+                text = text.strip("\n") if first.kind == "code" else text.strip()
+                if not text.strip():
+                    continue
+                content_hash = _hash(text)[:16]
+                yield {
+                    "id": _hash(page.url, *first.heading_path, text)[:16],
+                    "hash": content_hash,
+                    "url": page.url,
+                    "title": page.title or page.url,
+                    "heading_path": list(first.heading_path),
+                    "kind": first.kind,
+                    "language": first.language,
+                    "position": position,
+                    "chars": len(text),
+                    "tokens": approx_tokens(text),
+                    "page_hash": page_hash,
+                    "text": text,
+                }
+                position += 1
+
+def _previous_pages(path: Path) -> Dict[str, Tuple[str, int, int]]:
+    """Map each page URL in an earlier chunks file to its page hash and byte range"""
+    pages: Dict[str, Tuple[str, int, int]] = {}
+    if not path.exists():
+        return pages
+    conflicting = set()
+    offset = 0
+    last_url = None
+    with open(path, "rb") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+                url, page_hash = record["url"], record["page_hash"]
+            except (ValueError, KeyError, TypeError):
+                # Not a file this module wrote; nothing in it is reused
+                return {}
+            entry = pages.get(url)
+            if entry is None:
+                pages[url] = (page_hash, offset, offset + len(line))
+            elif url == last_url and entry[0] == page_hash:
+                pages[url] = (page_hash, entry[1], offset + len(line))
+            else:
+                conflicting.add(url)
+            last_url = url
+            offset += len(line)
+    for url in conflicting:
+        del pages[url]
+    return pages
+
+def export_chunks(pages: Iterable[Page], path: Path, chunker: Chunker) -> Dict[str, Any]:
+    """Stream the chunks of every page to a JSONL file, one chunk per line.
+
+    A page whose hash matches the one recorded in the existing file keeps
+    its lines, copied from that file without chunking the page again. The
+    file is replaced atomically once every page is written.
+
+    Returns:
+        Counts of pages and chunks written and reused, the file's size and sha256
+    """
+    path = Path(path)
+    previous = _previous_pages(path)
+    stats = {"pages": 0, "reused_pages": 0, "chunks": 0, "reused_chunks": 0}
+    digest = hashlib.sha256()
+    size = 0
+    tmp_path = path.with_name(path.name + ".tmp")
+    old_file = open(path, "rb") if previous else None
+    try:
+        with open(tmp_path, "wb") as out:
+            for page in pages:
+                page_hash = chunker.page_hash(page)
+                cached = previous.get(page.url)
+                if cached and cached[0] == page_hash:
+                    old_file.seek(cached[1])
+                    data = old_file.read(cached[2] - cached[1])
+                    count = data.count(b"\n")
+                    stats["reused_pages"] += 1
+                    stats["reused_chunks"] += count
+                else:
+                    lines = [
+                        json.dumps(chunk, ensure_ascii=False) + "\n"
+                        for chunk in chunker.chunk_page(page, page_hash)
+                    ]
+                    data = "".join(lines).encode("utf-8", "surrogatepass")
+                    count = len(lines)
+                out.write(data)
+                digest.update(data)
+                size += len(data)
+                stats["pages"] += 1
+                stats["chunks"] += count
+    finally:
+        if old_file:
+            old_file.close()
+    os.replace(tmp_path, path)
+    stats["size"] = size
+    stats["sha256"] = digest.hexdigest()
+    return stats
@@ -7,11 +7,15 @@ import argparse
 import sys
 from pathlib import Path
 import logging
-from typing import Optional
-import json
+from typing import TYPE_CHECKING, Optional
 
-from .core import DocGen
 from .config import Config
+from .metrics import format_report
+
+# Imported where used, so --help doesn't load aiohttp, BeautifulSoup and readability
+if TYPE_CHECKING:
+    from .core import DocGen
+    from .profiling import Profiler
 
 logger = logging.getLogger(__name__)
 
@@ -32,16 +36,38 @@ def create_parser() -> argparse.ArgumentParser:
     
     parser.add_argument(
         "url",
-        help="URL of the documentation site to process"
+        help="URL of the documentation site, GitHub repository or local directory to process",
+        nargs="?"
     )
     
     parser.add_argument(
         "-o", "--output",
-        help="Output file path (default: output.md or output.json)",
+        help="Output file path (default: output.md or output.json; with --manifest, the summary path)",
         type=Path,
         default=None
     )
     
+    parser.add_argument(
+        "--manifest",
+        help="Process every site in a YAML or JSON manifest in one process, under a shared budget",
+        type=Path,
+        default=None
+    )
+    
+    parser.add_argument(
+        "--connections",
+        help="With --manifest: requests in flight across all sites (overrides the manifest budget)",
+        type=int,
+        default=None
+    )
+    
+    parser.add_argument(
+        "--max-sites",
+        help="With --manifest: sites processed at once (overrides the manifest budget)",
+        type=int,
+        default=None
+    )
+    
     parser.add_argument(
         "-f", "--format",
         help="Output format (default: markdown)",
@@ -83,6 +109,97 @@ def create_parser() -> argparse.ArgumentParser:
         default=None
     )
     
+    parser.add_argument(
+        "-w", "--workers",
+        help="Processes used for markdown conversion (default: 1, 0 = one per CPU)",
+        type=int,
+        default=1
+    )
+    
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory for the markdown conversion cache",
+        type=Path,
+        default=None
+    )
+    
+    parser.add_argument(
+        "--render-html",
+        help="Pre-render generated markdown to cached HTML pages",
+        action="store_true"
+    )
+    
+    parser.add_argument(
+        "--chunks",
+        help="Export retrieval chunks of every page to chunks.jsonl",
+        action="store_true"
+    )
+    
+    parser.add_argument(
+        "--chunk-size",
+        help="Largest chunk, in --chunk-unit (default: 1500)",
+        type=int,
+        default=1500
+    )
+    
+    parser.add_argument(
+        "--chunk-overlap",
+        help="Units shared by consecutive chunks of a section (default: 150, or a tenth of a smaller --chunk-size)",
+        type=int
+    )
+    
+    parser.add_argument(
+        "--chunk-unit",
+        help="Unit of --chunk-size and --chunk-overlap (default: chars)",
+        choices=["chars", "tokens"],
+        default="chars"
+    )
+    
+    parser.add_argument(
+        "--archive",
+        help="Fetch GitHub repositories as a single streamed tarball",
+        action="store_true"
+    )
+    
+    parser.add_argument(
+        "--record",
+        help="Record every fetch to a compressed WARC file (e.g. site.warc.gz)",
+        type=Path,
+        default=None
+    )
+    
+    parser.add_argument(
+        "--replay",
+        help="Serve every fetch from a WARC file written by --record, without the network",
+        type=Path,
+        default=None
+    )
+    
+    parser.add_argument(
+        "--stats",
+        help="Print per-stage timings, per-host latency and byte counts after the run",
+        action="store_true"
+    )
+    
+    parser.add_argument(
+        "--profile",
+        help="Profile the run with cProfile (broken down by stage) and measure event-loop lag",
+        action="store_true"
+    )
+    
+    parser.add_argument(
+        "--trace-memory",
+        help="Record the top memory allocators at checkpoints with tracemalloc",
+        action="store_true"
+    )
+    
+    parser.add_argument(
+        "--profile-dir",
+        help="Directory for --profile and --trace-memory reports (default: <output>.profile next to the output)",
+        type=Path,
+        default=None
+    )
+    
     parser.add_argument(
         "-v", "--verbose",
         help="Enable verbose logging",
@@ -91,13 +208,105 @@ def create_parser() -> argparse.ArgumentParser:
     
     return parser
 
+async def generate(
+    url: str,
+    config: Config,
+    output_path: Path,
+    profiler: Optional["Profiler"] = None
+) -> "DocGen":
+    """Process a site and write its documentation to output_path"""
+    from .core import DocGen
+    
+    async with DocGen(config) as doc_gen:
+        if profiler:
+            profiler.attach(doc_gen.metrics)
+        docs = await doc_gen.process_site(url)
+    if profiler:
+        profiler.checkpoint("processed")
+    
+    # Generate output
+    output = doc_gen.render_documentation(docs)
+    if profiler:
+        profiler.checkpoint("rendered")
+    
+    # Write output
+    with doc_gen.metrics.time("write"):
+        output_path.write_text(output)
+    logger.info(f"Documentation written to {output_path}")
+    return doc_gen
+
+async def run_manifest(args: argparse.Namespace, options: dict) -> int:
+    """Process the sites of a batch manifest, with command-line options as defaults"""
+    from .batch import load_manifest, run_batch
+    
+    try:
+        manifest = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        logger.error(f"Error reading manifest: {str(e)}")
+        return 1
+    if args.connections:
+        manifest.connections = args.connections
+    if args.max_sites:
+        manifest.max_sites = args.max_sites
+    
+    # Options left unset on the command line fall back to Config defaults
+    base_config = {key: value for key, value in options.items() if value is not None}
+    summary = await run_batch(manifest, base_config, summary_path=args.output)
+    
+    print(f"\n{'Site':<50} {'Status':<7} {'Pages':>6} {'Seconds':>8}")
+    for result in summary["sites"]:
+        print(f"{result['url'][:50]:<50} {result['status']:<7} {result.get('pages', 0):>6} {result['elapsed_s']:>8.1f}")
+    empty = f" ({summary['empty']} with no pages)" if summary["empty"] else ""
+    print(
+        f"\n{summary['succeeded']} of {summary['total_sites']} sites succeeded{empty}, "
+        f"{summary['total_pages']} pages in {summary['elapsed_s']:.1f}s"
+    )
+    logger.info(f"Batch summary written to {summary['summary_path']}")
+    return 0 if not summary["failed"] else 1
+
 async def main(args: Optional[list] = None) -> int:
     """Main entry point"""
     parser = create_parser()
     args = parser.parse_args(args)
     
+    if bool(args.url) == bool(args.manifest):
+        parser.error("give either a url or --manifest")
+    if args.manifest and (args.profile or args.trace_memory):
+        parser.error("--profile and --trace-memory apply to a single site, not --manifest")
+    if args.manifest and args.record:
+        parser.error("--record applies to a single site; set record_warc per site in the manifest")
+    if args.record and args.replay:
+        parser.error("--record and --replay can't be used together")
+    if args.chunk_size <= 0:
+        parser.error("--chunk-size must be positive")
+    if args.chunk_overlap is not None and not 0 <= args.chunk_overlap < args.chunk_size:
+        parser.error("--chunk-overlap must be at least 0 and smaller than --chunk-size")
+    
     setup_logging(args.verbose)
     
+    # Configuration from the command line
+    options = dict(
+        concurrency=args.concurrency,
+        match=args.match,
+        exclude=args.exclude,
+        content_selector=args.selector,
+        max_pages=args.max_pages,
+        output_format=args.format,
+        convert_workers=args.workers,
+        cache_dir=args.cache_dir,
+        render_html=args.render_html,
+        export_chunks=args.chunks,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        chunk_unit=args.chunk_unit,
+        github_archive=args.archive,
+        record_warc=args.record,
+        replay_warc=args.replay
+    )
+    
+    if args.manifest:
+        return await run_manifest(args, options)
+    
     # Determine output path
     if args.output:
         output_path = args.output
@@ -105,29 +314,25 @@ async def main(args: Optional[list] = None) -> int:
         output_path = Path(f"output.{args.format}")
     
     # Create configuration
-    config = Config(
-        concurrency=args.concurrency,
-        match=args.match,
-        exclude=args.exclude,
-        content_selector=args.selector,
-        max_pages=args.max_pages,
-        output_format=args.format
-    )
+    config = Config(**options)
     
     try:
-        # Process site
-        doc_gen = DocGen(config)
-        docs = await doc_gen.process_site(args.url)
-        
-        # Generate output
-        if args.format == "json":
-            output = json.dumps(docs.to_json(), indent=2)
+        if args.profile or args.trace_memory:
+            from .profiling import Profiler
+            
+            profiler = Profiler(
+                args.profile_dir or output_path.with_name(f"{output_path.name}.profile"),
+                cpu=args.profile,
+                memory=args.trace_memory
+            )
+            async with profiler:
+                doc_gen = await profiler.track(generate(args.url, config, output_path, profiler))
+            logger.info(f"Profile written to {profiler.profile_dir}")
         else:
-            output = docs.to_markdown()
+            doc_gen = await generate(args.url, config, output_path)
         
-        # Write output
-        output_path.write_text(output)
-        logger.info(f"Documentation written to {output_path}")
+        if args.stats:
+            print(format_report(doc_gen.metrics.summary()))
         
         return 0
         
@@ -8,6 +8,13 @@ from pathlib import Path
 
 from .utils import ensure_array, match_path
 
+# Defined here rather than in .github so importing Config stays light
+GITHUB_API_URL = "https://api.github.com"
+GITHUB_RAW_URL = "https://raw.githubusercontent.com"
+
+# Chunk overlap used unless it would be more than a tenth of the chunk size
+DEFAULT_CHUNK_OVERLAP = 150
+
 @dataclass
 class Config:
     """Configuration for the documentation generator"""
@@ -25,6 +32,8 @@ class Config:
     # Limits
     max_pages: Optional[int] = None
     max_size_mb: float = 50.0  # Max size of all content
+    max_file_size_kb: Optional[float] = None  # Cap for a single repository or local file (None for no cap)
+    truncate_large_files: bool = False  # Keep the start of files over the cap instead of skipping them
     
     # Output options
     output_format: Literal["json", "markdown"] = "markdown"
@@ -33,6 +42,18 @@ class Config:
     preserve_code_blocks: bool = True
     split_pages: bool = False  # Whether to create separate files for each page
     create_index: bool = True  # Whether to create an index.html for split pages
+    convert_workers: int = 1  # Processes for markdown conversion (0 = one per CPU)
+    cache_dir: Optional[Path] = None  # Markdown conversion cache directory
+    search_index: bool = True  # Maintain a full-text index in output_dir/search.db
+    snippet_index: bool = True  # Write <site>/snippets.json and maintain output_dir/snippets.db
+    precompress: bool = True  # Write .gz (and .br if brotli is installed) sidecars
+    render_html: bool = False  # Pre-render markdown output to cached HTML after saving
+    
+    # Chunk export options, for feeding retrieval systems
+    export_chunks: bool = False  # Write <site>/chunks.jsonl
+    chunk_size: int = 1500  # Largest chunk, in chunk_unit
+    chunk_overlap: Optional[int] = None  # Units shared by consecutive chunks (default: min(150, chunk_size // 10))
+    chunk_unit: Literal["chars", "tokens"] = "chars"  # Tokens are approximated, not model-specific
     
     # Code snippet options
     code_block_markers: List[str] = field(
@@ -50,6 +71,20 @@ class Config:
     follow_redirects: bool = True
     verify_ssl: bool = True
     
+    # GitHub options
+    github_api_url: str = GITHUB_API_URL
+    github_raw_url: str = GITHUB_RAW_URL
+    github_concurrency: int = 16  # Concurrent file downloads per repository
+    github_archive: bool = False  # Stream one tarball instead of fetching files individually
+    github_cache_dir: Optional[Path] = None  # ETag cache for GitHub requests (default: cache_dir/github)
+    
+    # Recording options (crawls and GitHub repositories; local sources aren't fetched)
+    record_warc: Optional[Path] = None  # Record every fetch to this .warc.gz file
+    replay_warc: Optional[Path] = None  # Serve every fetch from this .warc.gz file, without the network
+    
+    # Local source options
+    scan_workers: int = 8  # Threads scanning and reading local directories
+    
     # Logging options
     quiet: bool = False  # Suppress informational output
     
@@ -58,6 +93,26 @@ class Config:
         # Convert output_dir to Path if it's a string
         if isinstance(self.output_dir, str):
             self.output_dir = Path(self.output_dir)
+        if isinstance(self.cache_dir, str):
+            self.cache_dir = Path(self.cache_dir)
+        if isinstance(self.github_cache_dir, str):
+            self.github_cache_dir = Path(self.github_cache_dir)
+        if isinstance(self.record_warc, str):
+            self.record_warc = Path(self.record_warc)
+        if isinstance(self.replay_warc, str):
+            self.replay_warc = Path(self.replay_warc)
+        if self.record_warc and self.replay_warc:
+            raise ValueError("record_warc and replay_warc can't be used together")
+        if self.chunk_unit not in ("chars", "tokens"):
+            raise ValueError(f"chunk_unit must be 'chars' or 'tokens', not {self.chunk_unit!r}")
+        if self.chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        if self.chunk_overlap is None:
+            self.chunk_overlap = min(DEFAULT_CHUNK_OVERLAP, self.chunk_size // 10)
+        if not 0 <= self.chunk_overlap < self.chunk_size:
+            raise ValueError("chunk_overlap must be at least 0 and smaller than chunk_size")
+        if self.github_cache_dir is None and self.cache_dir:
+            self.github_cache_dir = self.cache_dir / "github"
         
         # Ensure match and exclude are lists
         if self.match:
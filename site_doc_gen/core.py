@@ -3,42 +3,147 @@ Core documentation generation functionality
 """
 
 import asyncio
+import contextlib
+import gzip
+import hashlib
+import json
 import os
 import re
-from typing import Dict, List, Optional, Set, Tuple
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set, Tuple
 import aiohttp
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from urllib.parse import quote, urljoin, urlparse
 import logging
 from pathlib import Path
 from readability import Document
 
 from .config import Config
+from .local import HTML_EXTENSIONS, local_source_path, read_text, scan_directory
+from .filetypes import FileClassifier
+from .languages import detect_language, language_for_path, language_from_classes
+from .metrics import Metrics
+from .rawtext import code_fence, markdown_headings
+from .github import (
+    GitHubClient,
+    NullRateLimiter,
+    compile_path_patterns,
+    fetch_tree,
+    stream_tarball
+)
 from .types import Documentation, Page, CodeSnippet, Heading
+from .warc import RecordingSession, ReplaySession, WarcArchive, WarcWriter
+
+if TYPE_CHECKING:
+    from .batch import Budget
 
 logger = logging.getLogger(__name__)
 
+# Wrappers above a <pre> searched for a language class hint
+SNIPPET_WRAPPER_DEPTH = 2
+
+# Output files smaller than this are not worth precompressing
+PRECOMPRESS_MIN_BYTES = 1024
+
 class DocGen:
     """Main documentation generator class"""
     
-    def __init__(self, config: Config):
+    def __init__(
+        self,
+        config: Config,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        metrics: Optional[Metrics] = None,
+        budget: Optional["Budget"] = None
+    ):
+        """
+        Args:
+            config: Generator configuration
+            progress: Optional callback receiving a progress snapshot
+                (pages fetched, queue size, pages/sec) as the crawl advances
+            metrics: Optional process-wide collector that this generator's
+                per-run metrics are also recorded into
+            budget: Optional connections and worker threads shared with
+                other generators (see batch.Budget); requests then also wait
+                for a fairly scheduled global slot
+        """
         self.config = config
+        self.progress = progress
+        self.budget = budget
+        self.metrics = Metrics(parent=metrics)
+        # An aiohttp.ClientSession, or a warc session recording or replaying one
         self.session: Optional[aiohttp.ClientSession] = None
+        self.github: Optional[GitHubClient] = None
+        self.classifier = FileClassifier(
+            max_bytes=int(config.max_file_size_kb * 1024) if config.max_file_size_kb else None,
+            truncate=config.truncate_large_files
+        )
         self.processed_urls: Set[str] = set()
         self.base_url: Optional[str] = None
         self.base_domain: Optional[str] = None
         self.semaphore: Optional[asyncio.Semaphore] = None
+        self.pages_fetched = 0
+        self._started_at: Optional[float] = None
+        self._written_files: Dict[Path, Dict[str, Any]] = {}
         
     async def __aenter__(self):
         """Set up async context"""
-        self.session = aiohttp.ClientSession(headers=self.config.headers)
-        self.semaphore = asyncio.Semaphore(self.config.concurrency)
+        if self.config.replay_warc:
+            # Indexing the archive reads all of it once
+            archive = await asyncio.get_running_loop().run_in_executor(
+                None, WarcArchive, self.config.replay_warc
+            )
+            self.session = ReplaySession(archive)
+            if not self.config.quiet:
+                logger.info(f"Replaying {len(archive)} responses from {self.config.replay_warc}")
+        else:
+            self.session = aiohttp.ClientSession(
+                headers=self.config.headers,
+                trace_configs=[self.metrics.trace_config()],
+                connector=self.budget.connector if self.budget else None,
+                connector_owner=self.budget is None
+            )
+            if self.config.record_warc:
+                self.session = RecordingSession(self.session, WarcWriter(self.config.record_warc))
+        archived = bool(self.config.record_warc or self.config.replay_warc)
+        self.github = GitHubClient(
+            self.session,
+            api_url=self.config.github_api_url,
+            # Conditional requests would record or replay 304s instead of bodies
+            cache_dir=None if archived else self.config.github_cache_dir,
+            limiter=NullRateLimiter() if self.config.replay_warc else None,
+            metrics=self.metrics
+        )
+        self.semaphore = self._limiter(self.config.concurrency)
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Clean up async context"""
         if self.session:
             await self.session.close()
+        if isinstance(self.session, RecordingSession) and not self.config.quiet:
+            logger.info(f"Recorded {self.session.writer.records} WARC records to {self.config.record_warc}")
+        elif isinstance(self.session, ReplaySession) and self.session.misses:
+            logger.warning(f"{self.session.misses} requests were not in {self.config.replay_warc}")
+    
+    def _limiter(self, concurrency: int):
+        """Bound concurrent requests, within the shared budget if there is one"""
+        if self.budget:
+            return self.budget.limiter(self, concurrency)
+        return asyncio.Semaphore(concurrency)
+    
+    def _report_progress(self, queue_size: int, current: Optional[str] = None) -> None:
+        """Send a progress snapshot to the progress callback, if any"""
+        if not self.progress:
+            return
+        elapsed = time.monotonic() - (self._started_at or time.monotonic())
+        self.progress({
+            "pages_fetched": self.pages_fetched,
+            "queue_size": queue_size,
+            "elapsed_seconds": round(elapsed, 2),
+            "pages_per_sec": round(self.pages_fetched / elapsed, 2) if elapsed > 0 else 0.0,
+            "current": current
+        })
     
     def _normalize_url(self, url: str) -> str:
         """Normalize URL to handle relative paths and fragments"""
@@ -58,172 +163,198 @@ class DocGen:
         parsed = urlparse(url)
         return parsed.netloc == self.base_domain
     
-    def _parse_github_url(self, url: str) -> Optional[Tuple[str, str, str]]:
+    def _parse_github_url(self, url: str) -> Optional[Tuple[str, str, Optional[str]]]:
         """Parse GitHub repository URL into owner, repo, and branch.
         
         Args:
             url: GitHub repository URL
             
         Returns:
-            Tuple of (owner, repo, branch) or None if not a GitHub URL
+            Tuple of (owner, repo, branch) or None if not a GitHub URL;
+            branch is None when the URL names no branch
         """
         github_pattern = r"https?://github\.com/([^/]+)/([^/]+)(?:/tree/([^/]+))?"
         match = re.match(github_pattern, url)
         if match:
             owner, repo = match.group(1), match.group(2)
-            branch = match.group(3) or "main"  # Default to main if no branch specified
+            branch = match.group(3)  # None means the repository's default branch
             return owner, repo, branch
         return None
     
-    async def _fetch_github_contents(
+    async def _fetch_github_file(self, url: str) -> Optional[str]:
+        """Fetch raw file content from GitHub, up to the file size cap"""
+        status, body = await self.github.get(
+            url,
+            accept="application/vnd.github.v3.raw",
+            max_bytes=self.classifier.max_bytes,
+            accept_content=self.classifier.accepts_content
+        )
+        if status != 200:
+            logger.error(f"Error fetching {url}: {status}")
+            return None
+        if body is None:
+            print(f"✗ Skipped binary content: {url}")
+            return None
+        return body.decode("utf-8", errors="replace")
+    
+    def _source_file_page(self, path: str, content: str, url: str) -> Page:
+        """Create a page for a file from a source repository.
+        
+        Markdown is kept as raw markdown, with headings found by a line
+        scanner; any other file becomes a single snippet in the language of
+        its name (or, with detect_languages, its shebang or content). No HTML
+        parsing is involved.
+        """
+        with self.metrics.time("extract"):
+            if path.lower().endswith((".md", ".markdown")):
+                return Page(
+                    url=url,
+                    title=path,
+                    content=content,
+                    headings=markdown_headings(content),
+                    content_format="markdown"
+                )
+            
+            if self.config.detect_languages:
+                language = detect_language(content, path=path)
+            else:
+                language = language_for_path(path)
+            return Page(
+                url=url,
+                title=path,
+                content="",
+                code_snippets=[CodeSnippet(
+                    language=language,
+                    code=content,
+                    context=path,
+                    type="documentation" if language in ("text", "rst") else "source"
+                )],
+                content_format="text"
+            )
+    
+    def _source_path_filter(
+        self,
+        source: str = "GitHub"
+    ) -> Callable[[str, Optional[int]], bool]:
+        """Build the predicate deciding which repository files are documented.
+        
+        The predicate takes a file's path and, when known, its size.
+        """
+        matcher = compile_path_patterns(self.config.match) if self.config.match else None
+        
+        def select(file_path: str, size: Optional[int] = None) -> bool:
+            if matcher and not matcher(file_path):
+                print(f"✗ Skipped {source} file: {file_path} (no pattern matches)")
+                return False
+            # Skip binary files and catch all text-based files
+            if not self.classifier.accepts_path(file_path):
+                return False
+            if not self.classifier.accepts_size(size):
+                print(f"✗ Skipped {source} file: {file_path} ({size} bytes is over the size limit)")
+                return False
+            return True
+        return select
+    
+    async def _fetch_github_files(
         self,
         owner: str,
         repo: str,
-        path: str = ""
-    ) -> List[Dict]:
-        """Fetch repository contents using GitHub API"""
-        url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}"
-        
-        # Add GitHub token if available
-        headers = dict(self.session.headers)
-        github_token = os.environ.get("GITHUB_TOKEN")
-        if github_token:
-            headers["Authorization"] = f"token {github_token}"
-            if not self.config.quiet:
-                logger.info("Using GitHub token for authentication")
+        branch: Optional[str]
+    ) -> List[Page]:
+        """Fetch repository files listed by the git Trees API.
         
-        async with self.session.get(url, headers=headers) as response:
-            if response.status == 200:
-                return await response.json()
-            else:
-                logger.error(f"Error fetching {url}: {response.status}")
-                return []
-    
-    async def _fetch_github_file(self, url: str) -> Optional[str]:
-        """Fetch raw file content from GitHub"""
-        headers = dict(self.session.headers)
-        headers["Accept"] = "application/vnd.github.v3.raw"
+        The tree for the ref is listed in one request, filtered against the
+        match patterns, and the remaining files are downloaded by a bounded
+        pool of concurrent requests. Pages keep the tree's path order
+        regardless of which downloads finish first.
+        """
+        ref = branch or "HEAD"
+        tree = await fetch_tree(self.github, owner, repo, branch)
+        select = self._source_path_filter()
+        files = [
+            item for item in tree
+            if item["type"] == "blob" and select(item["path"], item.get("size"))
+        ]
+        if not self.config.quiet:
+            logger.info(f"Fetching {len(files)} of {len(tree)} entries from {owner}/{repo}")
         
-        async with self.session.get(url, headers=headers) as response:
-            if response.status == 200:
-                return await response.text()
-            else:
-                logger.error(f"Error fetching {url}: {response.status}")
+        semaphore = self._limiter(max(1, self.config.github_concurrency))
+        
+        async def fetch(item: Dict) -> Optional[Page]:
+            file_path = item["path"]
+            url = f"{self.config.github_raw_url}/{owner}/{repo}/{quote(ref)}/{quote(file_path)}"
+            try:
+                async with semaphore:
+                    content = await self._fetch_github_file(url)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Error fetching {url}: {str(e)}")
+                return None
+            if not content:
                 return None
+            
+            print(f"\nProcessing GitHub file: {file_path}")
+            self.pages_fetched += 1
+            self._report_progress(len(files) - self.pages_fetched, file_path)
+            return self._source_file_page(
+                file_path,
+                content,
+                f"https://github.com/{owner}/{repo}/blob/{quote(ref)}/{quote(file_path)}"
+            )
+        
+        results = await asyncio.gather(*(fetch(item) for item in files))
+        return [page for page in results if page]
     
-    def _check_github_patterns(self, path: str, patterns: List[str]) -> List[str]:
-        """Check if a path matches any GitHub patterns"""
-        matches = []
-        for pattern in patterns:
-            if pattern.endswith('/*'):
-                base_pattern = pattern[:-2]
-                if path.startswith(base_pattern + '/') or path == base_pattern:
-                    matches.append(f"matches directory pattern: {pattern}")
-            elif pattern == path:
-                matches.append(f"matches exact pattern: {pattern}")
-        return matches
+    async def _fetch_github_archive(
+        self,
+        owner: str,
+        repo: str,
+        branch: Optional[str]
+    ) -> List[Page]:
+        """Fetch repository files from a single streamed tarball.
+        
+        Produces the same pages as _fetch_github_files with one request in
+        place of one per file.
+        """
+        ref = branch or "HEAD"
+        found: List[Tuple[str, Page]] = []
+        
+        def handle(file_path: str, data: bytes) -> None:
+            if not data:
+                return
+            print(f"\nProcessing GitHub file: {file_path}")
+            found.append((file_path, self._source_file_page(
+                file_path,
+                data.decode("utf-8", errors="replace"),
+                f"https://github.com/{owner}/{repo}/blob/{quote(ref)}/{quote(file_path)}"
+            )))
+            self.pages_fetched += 1
+            self._report_progress(0, file_path)
+        
+        await stream_tarball(
+            self.github,
+            owner,
+            repo,
+            self._source_path_filter(),
+            handle,
+            ref=branch,
+            max_bytes=self.classifier.max_bytes,
+            accept_content=self.classifier.accepts_content
+        )
+        # Archive order is git's; sort to match the tree listing
+        found.sort(key=lambda item: item[0])
+        return [page for _, page in found]
     
     async def _process_github_repo(
         self,
         owner: str,
         repo: str,
-        branch: str
+        branch: Optional[str]
     ) -> Documentation:
         """Process a GitHub repository"""
-        async def process_directory(path: str = "") -> List[Page]:
-            pages = []
-            contents = await self._fetch_github_contents(owner, repo, path)
-            
-            for item in contents:
-                if item["type"] == "file":
-                    # Check if file path matches patterns
-                    file_path = item["path"]
-                    if not self.config.match:
-                        print(f"\nProcessing GitHub file (no pattern restrictions): {file_path}")
-                    else:
-                        matches = self._check_github_patterns(file_path, self.config.match)
-                        if matches:
-                            print(f"\nProcessing GitHub file: {file_path}")
-                            print(f"Pattern matches: {', '.join(matches)}")
-                        else:
-                            print(f"✗ Skipped GitHub file: {file_path} (no pattern matches)")
-                            continue
-                    
-                    # Process file if it matches patterns
-                    # Skip binary files and catch all text-based files
-                    if not any(item["name"].endswith(ext) for ext in [
-                        # Binary files to skip
-                        ".exe", ".dll", ".so", ".dylib", ".pyc", ".pyo",
-                        ".jpg", ".jpeg", ".png", ".gif", ".bmp", ".ico",
-                        ".mp3", ".mp4", ".avi", ".mov", ".wav",
-                        ".zip", ".tar", ".gz", ".7z", ".rar",
-                        ".pdf", ".doc", ".docx", ".xls", ".xlsx",
-                        ".db", ".sqlite", ".sqlite3",
-                        ".bin", ".dat"
-                    ]):
-                        content = await self._fetch_github_file(item["download_url"])
-                        if content:
-                            # Create a page for the file
-                            is_markdown = item["name"].endswith(".md")
-                            file_content = content
-                            
-                            if is_markdown:
-                                # For markdown, parse the raw content first
-                                headings = []
-                                for line in file_content.split('\n'):
-                                    if line.startswith('#'):
-                                        level = len(line) - len(line.lstrip('#'))
-                                        text = line.lstrip('#').strip()
-                                        id = text.lower().replace(' ', '-')
-                                        headings.append(Heading(level=level, text=text, id=id))
-                                
-                                # Then wrap in HTML for display
-                                soup = BeautifulSoup(
-                                    f"<div>{file_content}</div>",
-                                    "html.parser"
-                                )
-                            else:
-                                # Wrap code in pre/code tags
-                                soup = BeautifulSoup(
-                                    f'<pre><code class="language-python">{file_content}</code></pre>',
-                                    "html.parser"
-                                )
-                                headings = []
-                            
-                            pages.append(Page(
-                                url=item["html_url"],
-                                title=item["path"],
-                                content=str(soup),
-                                code_snippets=[CodeSnippet(
-                                    language="python" if item["name"].endswith(".py") else "markdown",
-                                    code=content,
-                                    context=item["path"],
-                                    type="source" if item["name"].endswith(".py") else "documentation"
-                                )] if not is_markdown else [],
-                                headings=headings
-                            ))
-                
-                elif item["type"] == "dir":
-                    # For directories, check if any pattern matches this directory
-                    dir_path = item["path"]
-                    if not self.config.match:
-                        print(f"\nProcessing GitHub directory (no pattern restrictions): {dir_path}")
-                        dir_pages = await process_directory(dir_path)
-                        pages.extend(dir_pages)
-                    else:
-                        matches = self._check_github_patterns(dir_path, self.config.match)
-                        if matches:
-                            print(f"\nProcessing GitHub directory: {dir_path}")
-                            print(f"Pattern matches: {', '.join(matches)}")
-                            dir_pages = await process_directory(dir_path)
-                            pages.extend(dir_pages)
-                        else:
-                            print(f"✗ Skipped GitHub directory: {dir_path} (no pattern matches)")
-            
-            return pages
-        
-        # Process the entire repository
-        pages = await process_directory()
+        if self.config.github_archive:
+            pages = await self._fetch_github_archive(owner, repo, branch)
+        else:
+            pages = await self._fetch_github_files(owner, repo, branch)
         
         return Documentation(
             base_url=f"https://github.com/{owner}/{repo}",
@@ -249,11 +380,33 @@ class DocGen:
                         logger.warning(f"Skipping non-HTML content at {url}")
                         return None
                     
-                    return await response.text()
+                    with self.metrics.time("download"):
+                        return await response.text()
         except Exception as e:
             logger.error(f"Error fetching {url}: {str(e)}")
             return None
     
+    def _snippet_classes(self, pre, code) -> List[str]:
+        """CSS classes that may name a snippet's language, nearest first.
+        
+        The hint sits on the code element, the pre or a wrapper around it,
+        depending on the generator (Prism, MkDocs, Docusaurus, Sphinx).
+        """
+        classes = [*code.get("class", []), *pre.get("class", [])]
+        parent = pre.parent
+        for _ in range(SNIPPET_WRAPPER_DEPTH):
+            if parent is None or parent.name in ("body", "[document]"):
+                break
+            classes.extend(parent.get("class", []))
+            parent = parent.parent
+        return classes
+    
+    def _snippet_language(self, pre, code, text: str) -> str:
+        """Language of a code block, detected unless detect_languages is off"""
+        if self.config.detect_languages:
+            return detect_language(text, self._snippet_classes(pre, code))
+        return language_from_classes(code.get("class", [])) or "text"
+    
     def _extract_code_snippets(self, soup: BeautifulSoup) -> List[CodeSnippet]:
         """Extract code snippets from HTML content"""
         snippets = []
@@ -262,17 +415,12 @@ class DocGen:
         for pre in soup.find_all("pre"):
             code = pre.find("code")
             if code:
-                # Try to detect language from class
-                classes = code.get("class", [])
-                language = next((
-                    cls.replace("language-", "")
-                    for cls in classes
-                    if cls.startswith("language-")
-                ), "text")
+                text = code.get_text()
+                language = self._snippet_language(pre, code, text)
                 
                 snippets.append(CodeSnippet(
                     language=language,
-                    code=code.get_text(),
+                    code=text,
                     context=pre.parent.get_text()[:100].split('\n')[0],  # Get first line of context
                     type="example" if "example" in pre.parent.get_text().lower() else "unknown"
                 ))
@@ -324,13 +472,23 @@ class DocGen:
             print(f"Failed to fetch: {url}")
             return None
         
+        if self.budget:
+            # In a batch, extraction across all sites shares the budget's worker threads
+            return await asyncio.get_running_loop().run_in_executor(
+                self.budget.executor, self._extract_page, url, html
+            )
+        return self._extract_page(url, html)
+    
+    def _extract_page(self, url: str, html: str) -> Page:
+        """Extract the main content of an HTML page"""
         # Initial cleanup with BeautifulSoup
-        soup = BeautifulSoup(html, "html.parser")
-        
-        # Remove unwanted elements
-        for selector in ["script", "style", "iframe", "noscript", "meta", "link", "svg", "img", "video"]:
-            for element in soup.find_all(selector):
-                element.decompose()
+        with self.metrics.time("parse"):
+            soup = BeautifulSoup(html, "html.parser")
+            
+            # Remove unwanted elements
+            for selector in ["script", "style", "iframe", "noscript", "meta", "link", "svg", "img", "video"]:
+                for element in soup.find_all(selector):
+                    element.decompose()
         
         # Get title from page
         title = soup.title.string if soup.title else url
@@ -348,16 +506,70 @@ class DocGen:
         
         # If no content found through selector, use readability
         if not content_soup:
-            doc = Document(str(soup))
-            article = doc.summary()
-            content_soup = BeautifulSoup(article, "html.parser")
-        
-        return Page(
-            url=url,
-            title=title or url,
-            content=str(content_soup),
-            code_snippets=self._extract_code_snippets(content_soup),
-            headings=self._extract_headings(content_soup)
+            with self.metrics.time("readability"):
+                doc = Document(str(soup))
+                article = doc.summary()
+                content_soup = BeautifulSoup(article, "html.parser")
+        
+        with self.metrics.time("extract"):
+            return Page(
+                url=url,
+                title=title or url,
+                content=str(content_soup),
+                code_snippets=self._extract_code_snippets(content_soup),
+                headings=self._extract_headings(content_soup)
+            )
+    
+    async def _process_local_source(self, root: Path) -> Documentation:
+        """Process a local directory, such as a checkout or built HTML docs.
+        
+        The tree is scanned with os.scandir across a thread pool. HTML files
+        go through the same extraction as crawled pages and everything else
+        through the same path as GitHub repository files.
+        """
+        loop = asyncio.get_running_loop()
+        select = self._source_path_filter("local")
+        
+        if self.budget:
+            executor_context = contextlib.nullcontext(self.budget.executor)
+        else:
+            executor_context = ThreadPoolExecutor(max_workers=max(1, self.config.scan_workers))
+        with executor_context as executor:
+            files = await loop.run_in_executor(
+                None, scan_directory, root, select, executor
+            )
+            if self.config.max_pages:
+                files = files[:self.config.max_pages]
+            if not self.config.quiet:
+                logger.info(f"Processing {len(files)} files from {root}")
+            
+            def build(relpath: str) -> Optional[Page]:
+                path = root / relpath
+                try:
+                    text = read_text(path, self.classifier)
+                except OSError as e:
+                    logger.error(f"Error reading {path}: {str(e)}")
+                    return None
+                if not text:
+                    # Empty, binary or over the size limit
+                    return None
+                if relpath.endswith(HTML_EXTENSIONS):
+                    return self._extract_page(path.as_uri(), text)
+                return self._source_file_page(relpath, text, path.as_uri())
+            
+            async def process(relpath: str) -> Optional[Page]:
+                page = await loop.run_in_executor(executor, build, relpath)
+                if page:
+                    print(f"\nProcessing local file: {relpath}")
+                    self.pages_fetched += 1
+                    self._report_progress(len(files) - self.pages_fetched, relpath)
+                return page
+            
+            results = await asyncio.gather(*(process(relpath) for relpath in files))
+        
+        return Documentation(
+            base_url=root.as_uri(),
+            pages=[page for page in results if page]
         )
     
     def _create_index_html(self, docs: Documentation, output_dir: Path) -> None:
@@ -398,17 +610,189 @@ class DocGen:
         ])
         
         index_file = output_dir / "index.html"
-        index_file.write_text("\n".join(index_content))
+        self._write_output(index_file, "\n".join(index_content))
+    
+    def _site_name(self, base_url: str) -> str:
+        """Get the output directory name for a site"""
+        github_info = self._parse_github_url(base_url)
+        if github_info:
+            owner, repo, _ = github_info
+            return f"github_{owner}_{repo}"
+        if base_url.startswith("file://"):
+            return f"local_{Path(urlparse(base_url).path).name}"
+        return urlparse(base_url).netloc.replace('.', '_')
+    
+    def _update_search_index(self, site_name: str, entries: List[Tuple[Page, str]]) -> None:
+        """Incrementally update the output directory's full-text search index"""
+        from .search import SearchIndex
+        
+        try:
+            with SearchIndex(self.config.output_dir / "search.db") as index:
+                stats = index.update_site(site_name, entries)
+        except Exception as e:
+            logger.error(f"Error updating search index for {site_name}: {str(e)}")
+            return
+        if not self.config.quiet:
+            logger.info(
+                f"Search index updated for {site_name}: "
+                f"{stats['added']} added, {stats['updated']} updated, "
+                f"{stats['unchanged']} unchanged, {stats['removed']} removed"
+            )
+    
+    def _update_snippet_index(self, docs: Documentation, site_name: str, site_dir: Path) -> None:
+        """Write the site's deduplicated snippet index and load it into the shared database"""
+        from .snippets import SnippetIndex, SnippetStore
+        
+        index = SnippetIndex.from_pages(docs.pages)
+        self._write_output(site_dir / "snippets.json", json.dumps(index.to_json(docs.base_url), indent=2))
+        try:
+            with SnippetStore(self.config.output_dir / "snippets.db") as store:
+                store.replace_site(site_name, index)
+        except Exception as e:
+            logger.error(f"Error updating snippet index for {site_name}: {str(e)}")
+            return
+        if not self.config.quiet:
+            logger.info(
+                f"Snippet index updated for {site_name}: "
+                f"{len(index.entries)} distinct of {index.total} snippets"
+            )
+    
+    def _export_chunks(self, docs: Documentation, site_dir: Path) -> None:
+        """Stream the site's retrieval chunks to chunks.jsonl, reusing those of unchanged pages"""
+        from .chunks import Chunker, export_chunks
+        
+        path = site_dir / "chunks.jsonl"
+        chunker = Chunker(self.config.chunk_size, self.config.chunk_overlap, self.config.chunk_unit)
+        with self.metrics.time("export"):
+            stats = export_chunks(docs.pages, path, chunker)
+        self._written_files[path] = {"size": stats["size"], "sha256": stats["sha256"], "encodings": []}
+        self.metrics.add_bytes(written=stats["size"])
+        if not self.config.quiet:
+            logger.info(
+                f"Exported {stats['chunks']} chunks from {stats['pages']} pages "
+                f"({stats['reused_chunks']} reused from {stats['reused_pages']} unchanged pages)"
+            )
+    
+    def _write_output(self, path: Path, text: str) -> None:
+        """Write an output file, tracking its size and hash for the site manifest"""
+        with self.metrics.time("write"):
+            data = text.encode("utf-8")
+            path.write_bytes(data)
+            self._written_files[path] = {
+                "size": len(data),
+                "sha256": hashlib.sha256(data).hexdigest(),
+                "encodings": self._compress_output(path, data)
+            }
+        self.metrics.add_bytes(written=len(data))
+    
+    def _compress_output(self, path: Path, data: bytes) -> List[str]:
+        """Write precompressed .gz/.br sidecars next to an output file.
+        
+        Returns:
+            Content encodings for which a sidecar was written
+        """
+        sidecars = {"gzip": path.with_name(path.name + ".gz"), "br": path.with_name(path.name + ".br")}
+        encodings = []
+        if self.config.precompress and len(data) >= PRECOMPRESS_MIN_BYTES:
+            compressed = {"gzip": gzip.compress(data, compresslevel=6, mtime=0)}
+            try:
+                import brotli
+            except ImportError:
+                pass  # Brotli is optional; gzip alone covers every browser
+            else:
+                compressed["br"] = brotli.compress(data, quality=5)
+            for encoding, payload in compressed.items():
+                if len(payload) < len(data):
+                    sidecars.pop(encoding).write_bytes(payload)
+                    encodings.append(encoding)
+        
+        # Remove sidecars left over from earlier runs that no longer match
+        for stale in sidecars.values():
+            if stale.exists():
+                stale.unlink()
+        return encodings
+    
+    def _write_manifest(self, site_dir: Path, docs: Documentation) -> None:
+        """Write manifest.json listing the hash, size, mtime and encodings of every output file.
+        
+        The server only trusts an entry's hash while the file's size and
+        mtime still match it.
+        """
+        manifest = {
+            "base_url": docs.base_url,
+            "generated_at": docs.generated_at.isoformat(),
+            "total_pages": len(docs.pages),
+            "files": {
+                path.relative_to(site_dir).as_posix(): {**entry, "mtime_ns": path.stat().st_mtime_ns}
+                for path, entry in sorted(self._written_files.items())
+            }
+        }
+        tmp_file = site_dir / "manifest.json.tmp"
+        tmp_file.write_text(json.dumps(manifest, indent=2))
+        os.replace(tmp_file, site_dir / "manifest.json")
+    
+    def _page_body_lines(self, page: Page) -> List[str]:
+        """Render the body of a page as markdown lines for the saved output"""
+        if page.content_format == "markdown":
+            return [page.content.strip(), ""]
+        if page.content_format == "text":
+            lines = []
+            for snippet in page.code_snippets:
+                fence = code_fence(snippet.code)
+                lines.extend([f"{fence}{snippet.language}", snippet.code.strip(), fence, ""])
+            return lines
+        
+        lines = []
+        # Languages were detected when the snippets were extracted
+        languages = {snippet.code.strip(): snippet.language for snippet in page.code_snippets}
+        content_soup = BeautifulSoup(page.content, "html.parser")
+        elements = content_soup.find_all(["h1", "h2", "h3", "h4", "h5", "h6", "p", "pre"])
+        current_section = []
+        
+        for element in elements:
+            if element.name.startswith('h'):
+                if current_section:
+                    lines.extend(current_section)
+                    lines.append("")
+                current_section = []
+                level = int(element.name[1])
+                lines.append(f"{'#' * level} {element.get_text().strip()}")
+            elif element.name == 'p':
+                text = element.get_text().strip()
+                if text:
+                    current_section.append(text)
+                    current_section.append("")
+            elif element.name == 'pre':
+                if current_section:
+                    lines.extend(current_section)
+                    lines.append("")
+                current_section = []
+                code = element.find("code")
+                if code:
+                    context = element.parent.get_text()[:100].split('\n')[0].strip()
+                    text = code.get_text()
+                    language = languages.get(text.strip()) or self._snippet_language(element, code, text)
+                    fence = code_fence(text)
+                    lines.extend([
+                        f"{fence}{language}",
+                        text.strip(),
+                        fence,
+                        "",
+                        f"Context: {context}",
+                        ""
+                    ])
+        
+        if current_section:
+            lines.extend(current_section)
+            lines.append("")
+        return lines
     
     def _save_documentation(self, docs: Documentation) -> None:
         """Save documentation to files based on configuration"""
         # Create site-specific output directory
-        github_info = self._parse_github_url(docs.base_url)
-        if github_info:
-            owner, repo, _ = github_info
-            site_name = f"github_{owner}_{repo}"
-        else:
-            site_name = urlparse(docs.base_url).netloc.replace('.', '_')
+        site_name = self._site_name(docs.base_url)
+        search_entries: List[Tuple[Page, str]] = []
+        self._written_files = {}
         
         site_dir = self.config.output_dir / site_name
         site_dir.mkdir(exist_ok=True)
@@ -423,6 +807,7 @@ class DocGen:
                 title = page.title or page.url.split('/')[-1]
                 safe_filename = title.lower().replace(' ', '-').replace('/', '-') + ".md"
                 file_path = docs_dir / safe_filename
+                search_entries.append((page, f"{site_name}/docs/{safe_filename}"))
                 
                 # Generate page content
                 page_content = []
@@ -438,47 +823,8 @@ class DocGen:
                 ])
                 
                 # Add content sections
-                content_soup = BeautifulSoup(page.content, "html.parser")
-                elements = content_soup.find_all(["h1", "h2", "h3", "h4", "h5", "h6", "p", "pre"])
-                current_section = []
-                
-                for element in elements:
-                    if element.name.startswith('h'):
-                        if current_section:
-                            page_content.extend(current_section)
-                            page_content.append("")
-                        current_section = []
-                        level = int(element.name[1])
-                        page_content.append(f"{'#' * level} {element.get_text().strip()}")
-                    elif element.name == 'p':
-                        text = element.get_text().strip()
-                        if text:
-                            current_section.append(text)
-                            current_section.append("")
-                    elif element.name == 'pre':
-                        if current_section:
-                            page_content.extend(current_section)
-                            page_content.append("")
-                        current_section = []
-                        code = element.find("code")
-                        if code:
-                            language = "text"
-                            if code.get("class"):
-                                lang_class = next((cls for cls in code.get("class", []) if cls.startswith("language-")), None)
-                                if lang_class:
-                                    language = lang_class.replace("language-", "")
-                            page_content.extend([
-                                f"```{language}",
-                                code.get_text().strip(),
-                                "```",
-                                "",
-                                f"Context: {element.parent.get_text()[:100].split('\n')[0].strip()}",
-                                ""
-                            ])
-                
-                if current_section:
-                    page_content.extend(current_section)
-                    page_content.append("")
+                with self.metrics.time("render"):
+                    page_content.extend(self._page_body_lines(page))
                 
                 # Add footer with back to index link
                 page_content.extend([
@@ -488,14 +834,17 @@ class DocGen:
                 ])
                 
                 # Write page file
-                file_path.write_text("\n".join(page_content))
+                self._write_output(file_path, "\n".join(page_content))
             
             # Create index.html if enabled
             if self.config.create_index:
                 self._create_index_html(docs, site_dir)
         else:
+            from .sections import SECTIONS_FILE, SectionOffsets
+            
             # Save as a single file
             output_file = site_dir / "documentation.md"
+            offsets = SectionOffsets()
             content = []
             
             # Add header
@@ -514,72 +863,91 @@ class DocGen:
                 content.append(f"{indent}- [{title}](#{title.lower().replace(' ', '-')})")
             
             content.extend(["", "## Contents", ""])
+            offsets.add(content)
             
             # Add page contents
             for page in docs.pages:
                 title = page.title or page.url.split('/')[-1]
-                content.extend([
+                search_entries.append((page, f"{site_name}/documentation.md"))
+                header = [
                     f"### {title}",
                     "",
                     f"Source: {page.url}",
                     ""
-                ])
+                ]
+                content.extend(header)
+                offsets.add_page(title, page.url, header)
                 
                 # Add content sections
-                content_soup = BeautifulSoup(page.content, "html.parser")
-                elements = content_soup.find_all(["h1", "h2", "h3", "h4", "h5", "h6", "p", "pre"])
-                current_section = []
-                
-                for element in elements:
-                    if element.name.startswith('h'):
-                        if current_section:
-                            content.extend(current_section)
-                            content.append("")
-                        current_section = []
-                        level = int(element.name[1])
-                        content.append(f"{'#' * level} {element.get_text().strip()}")
-                    elif element.name == 'p':
-                        text = element.get_text().strip()
-                        if text:
-                            current_section.append(text)
-                            current_section.append("")
-                    elif element.name == 'pre':
-                        if current_section:
-                            content.extend(current_section)
-                            content.append("")
-                        current_section = []
-                        code = element.find("code")
-                        if code:
-                            language = "text"
-                            if code.get("class"):
-                                lang_class = next((cls for cls in code.get("class", []) if cls.startswith("language-")), None)
-                                if lang_class:
-                                    language = lang_class.replace("language-", "")
-                            content.extend([
-                                f"```{language}",
-                                code.get_text().strip(),
-                                "```",
-                                "",
-                                f"Context: {element.parent.get_text()[:100].split('\n')[0].strip()}",
-                                ""
-                            ])
-                
-                if current_section:
-                    content.extend(current_section)
-                    content.append("")
+                with self.metrics.time("render"):
+                    body = self._page_body_lines(page)
+                content.extend(body)
+                offsets.add_body(body)
                 
                 content.append("---\n")
+                offsets.add(["---\n"])
             
-            output_file.write_text("\n".join(content))
+            self._write_output(output_file, "\n".join(content))
+            
+            # Byte offsets of every page and heading, for serving one section at a time
+            written = self._written_files[output_file]
+            self._write_output(
+                site_dir / SECTIONS_FILE,
+                json.dumps(offsets.to_json(written["size"], written["sha256"]))
+            )
+        
+        if self.config.snippet_index:
+            self._update_snippet_index(docs, site_name, site_dir)
+        
+        if self.config.export_chunks:
+            self._export_chunks(docs, site_dir)
+        
+        docs.metadata["output"] = {
+            "site_name": site_name,
+            "site_dir": str(site_dir),
+            "total_pages": len(docs.pages),
+            "total_files": len(self._written_files),
+            "total_size_bytes": sum(entry["size"] for entry in self._written_files.values())
+        }
+        self._write_manifest(site_dir, docs)
+        
+        if self.config.search_index:
+            self._update_search_index(site_name, search_entries)
+        
+        if self.config.render_html:
+            from .render import HTMLRenderer
+            with self.metrics.time("render"):
+                rendered = HTMLRenderer(site_dir).render_site()
+            if not self.config.quiet:
+                logger.info(f"Pre-rendered {rendered} markdown files to HTML for {site_name}")
+    
+    def render_documentation(self, docs: Documentation) -> str:
+        """Render documentation as one JSON or markdown document, per output_format"""
+        with self.metrics.time("render"):
+            if self.config.output_format == "json":
+                return json.dumps(docs.to_json(), indent=2)
+            return docs.to_markdown(
+                workers=self.config.convert_workers,
+                cache_dir=self.config.cache_dir
+            )
     
     async def process_site(self, url: str) -> Documentation:
-        """Process a website or GitHub repository"""
-        # Check if this is a GitHub repository
+        """Process a website, GitHub repository or local directory (path or file:// URL)"""
+        self._started_at = time.monotonic()
+        self.pages_fetched = 0
+        self.metrics.reset()
+        
+        # Check if this is a local directory or GitHub repository
+        local_root = local_source_path(url)
         github_info = self._parse_github_url(url)
-        if github_info:
+        if local_root:
+            if not self.config.quiet:
+                logger.info(f"Processing local directory: {local_root}")
+            docs = await self._process_local_source(local_root)
+        elif github_info:
             owner, repo, branch = github_info
             if not self.config.quiet:
-                logger.info(f"Processing GitHub repository: {owner}/{repo} ({branch})")
+                logger.info(f"Processing GitHub repository: {owner}/{repo} ({branch or 'default branch'})")
             docs = await self._process_github_repo(owner, repo, branch)
         else:
             # Process as a regular website
@@ -609,10 +977,12 @@ class DocGen:
                     if page:
                         print(f"✓ Success: {parsed_url.path}")
                         pages.append(page)
+                        self.pages_fetched += 1
                         
                         # Extract and add new URLs to process
-                        soup = BeautifulSoup(page.content, "html.parser")
-                        new_urls = self._extract_links(soup, current_url)
+                        with self.metrics.time("extract"):
+                            soup = BeautifulSoup(page.content, "html.parser")
+                            new_urls = self._extract_links(soup, current_url)
                         
                         # Add only new URLs to process queue
                         new_urls_to_process = [
@@ -623,6 +993,8 @@ class DocGen:
                         
                         if new_urls_to_process:
                             print(f"  Found {len(new_urls_to_process)} new URLs to process")
+                    
+                    self._report_progress(len(to_process), current_url)
                 else:
                     print(f"✗ Skipped: {parsed_url.path} (pattern mismatch)")
             
@@ -633,5 +1005,6 @@ class DocGen:
         
         # Save documentation based on configuration
         self._save_documentation(docs)
+        docs.metadata["metrics"] = self.metrics.summary()
         
         return docs
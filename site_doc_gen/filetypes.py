@@ -0,0 +1,84 @@
+"""
+Classification of source files as text or binary
+"""
+
+import re
+from typing import Optional
+
+# Files with these extensions are never fetched or documented
+BINARY_EXTENSIONS = frozenset({
+    # Executables and object code
+    "exe", "dll", "so", "dylib", "o", "a", "lib", "pyc", "pyo", "pyd", "class", "jar", "wasm",
+    # Images
+    "jpg", "jpeg", "png", "gif", "bmp", "ico", "icns", "webp", "tif", "tiff", "psd", "heic",
+    # Audio and video
+    "mp3", "mp4", "avi", "mov", "wav", "flac", "ogg", "webm", "mkv", "m4a",
+    # Archives and packages
+    "zip", "tar", "gz", "tgz", "bz2", "xz", "zst", "7z", "rar", "whl", "egg", "deb", "rpm", "dmg", "iso", "msi",
+    # Documents
+    "pdf", "doc", "docx", "xls", "xlsx", "ppt", "pptx",
+    # Fonts
+    "ttf", "otf", "woff", "woff2", "eot",
+    # Databases and data formats
+    "db", "sqlite", "sqlite3", "parquet", "avro", "orc", "feather", "arrow", "npy", "npz", "pkl", "pickle", "h5", "hdf5",
+    # Model weights
+    "onnx", "pt", "pth", "ckpt", "safetensors", "pb", "tflite", "gguf",
+    # Generic binary blobs
+    "bin", "dat",
+})
+
+_BINARY_NAME_RE = re.compile(
+    r"\.(?:" + "|".join(sorted(map(re.escape, BINARY_EXTENSIONS))) + r")$",
+    re.IGNORECASE
+)
+
+# Leading bytes of common binary formats that may not contain a NUL early on
+_BINARY_MAGIC_RE = re.compile(
+    rb"\A(?:\x89PNG|GIF8[79]a|\xff\xd8\xff|%PDF-|PK\x03\x04|\x7fELF|\x00asm|\x1f\x8b|"
+    rb"\xfd7zXZ|7z\xbc\xaf|Rar!\x1a|PAR1|\xca\xfe\xba\xbe|wOFF|wOF2|SQLite format 3\x00)"
+)
+
+# Bytes inspected when sniffing content, as git does for its binary check
+SNIFF_BYTES = 8000
+
+def is_binary_path(path: str) -> bool:
+    """Check whether a file name has a known binary extension"""
+    return _BINARY_NAME_RE.search(path) is not None
+
+def is_binary_content(data: bytes) -> bool:
+    """Check whether the start of a file looks binary"""
+    head = data[:SNIFF_BYTES]
+    return b"\x00" in head or _BINARY_MAGIC_RE.match(head) is not None
+
+class FileClassifier:
+    """Decides which source files are read, and how much of each.
+
+    Files are rejected by extension before anything is fetched, by the size
+    from the listing before they are downloaded, and by sniffing their first
+    bytes as soon as those arrive.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, truncate: bool = False):
+        """
+        Args:
+            max_bytes: Size cap for a single file (None for no cap)
+            truncate: Keep the first max_bytes of larger files instead of
+                skipping them
+        """
+        self.max_bytes = max_bytes
+        self.truncate = truncate
+
+    def accepts_path(self, path: str) -> bool:
+        return not is_binary_path(path)
+
+    def accepts_size(self, size: Optional[int]) -> bool:
+        """Check a file's size, when known, against the cap"""
+        return (
+            self.max_bytes is None
+            or self.truncate
+            or size is None
+            or size <= self.max_bytes
+        )
+
+    def accepts_content(self, head: bytes) -> bool:
+        return not is_binary_content(head)
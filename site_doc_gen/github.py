@@ -0,0 +1,625 @@
+"""
+GitHub API helpers for site-doc-gen
+"""
+
+import asyncio
+import contextlib
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import tarfile
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from .config import GITHUB_API_URL
+from .filetypes import SNIFF_BYTES
+
+if TYPE_CHECKING:
+    import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from the network per chunk when streaming a tarball or file
+TARBALL_CHUNK_SIZE = 64 * 1024
+READ_CHUNK_SIZE = 16 * 1024
+
+# Concurrent tree requests when a truncated tree is walked level by level
+TREE_WALK_CONCURRENCY = 8
+
+# Steady API request rate and burst size shared by all jobs in the process
+GITHUB_REQUESTS_PER_SECOND = 10.0
+GITHUB_BURST = 20
+
+# Below this fraction of the hourly quota, requests are spread out until the reset
+PACING_THRESHOLD = 0.2
+
+# Wait used for secondary rate limits that give no Retry-After
+DEFAULT_RETRY_AFTER = 60.0
+
+# Rate-limited responses retried before the error is returned
+MAX_RATE_LIMIT_RETRIES = 5
+
+def github_headers(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Copy request headers, adding the GITHUB_TOKEN authorization if set"""
+    headers = dict(headers or {})
+    github_token = os.environ.get("GITHUB_TOKEN")
+    if github_token:
+        headers["Authorization"] = f"token {github_token}"
+    return headers
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every event loop in the process.
+
+    Each acquire() reserves a token up front and sleeps until it is due, so
+    callers are served in arrival order and concurrent jobs (each running its
+    own loop in the web app) get a fair share of the rate.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token, returning how long to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    async def acquire(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+class RateLimiter(TokenBucket):
+    """Token bucket that follows GitHub's rate-limit headers.
+
+    Once less than PACING_THRESHOLD of the quota is left, the rate drops to
+    spread the remaining requests until the reset; when the quota is used
+    up, requests wait for the reset instead of failing.
+    """
+
+    def __init__(self, rate: float = GITHUB_REQUESTS_PER_SECOND, capacity: float = GITHUB_BURST):
+        super().__init__(rate, capacity)
+        self.base_rate = rate
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self._blocked_until = 0.0  # time.monotonic() value
+
+    def _reserve(self) -> float:
+        delay = super()._reserve()
+        with self._lock:
+            return max(delay, self._blocked_until - time.monotonic())
+
+    def update(self, headers) -> None:
+        """Record the budget reported by a response"""
+        try:
+            remaining = int(headers["X-RateLimit-Remaining"])
+            reset = float(headers["X-RateLimit-Reset"])
+            limit = int(headers.get("X-RateLimit-Limit", 0)) or None
+        except (KeyError, ValueError):
+            return
+        until_reset = max(reset - time.time(), 1.0)
+        with self._lock:
+            self.limit, self.remaining = limit, remaining
+            if remaining <= 0:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + until_reset)
+            elif limit and remaining < limit * PACING_THRESHOLD:
+                self.rate = min(self.base_rate, remaining / until_reset)
+            else:
+                self.rate = self.base_rate
+
+    def backoff(self, headers) -> float:
+        """Block all requests after a rate-limited response.
+
+        Returns:
+            Seconds until requests may resume
+        """
+        delay = DEFAULT_RETRY_AFTER
+        if "Retry-After" in headers:
+            try:
+                delay = float(headers["Retry-After"])
+            except ValueError:
+                pass
+        elif headers.get("X-RateLimit-Remaining") == "0" and "X-RateLimit-Reset" in headers:
+            try:
+                delay = float(headers["X-RateLimit-Reset"]) - time.time() + 1
+            except ValueError:
+                pass
+        delay = max(delay, 1.0)
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        return delay
+
+class NullRateLimiter:
+    """Stands in for RateLimiter when responses are replayed rather than requested"""
+
+    async def acquire(self) -> None:
+        pass
+
+    def update(self, headers) -> None:
+        pass
+
+    def backoff(self, headers) -> float:
+        return 0.0
+
+_shared_limiters: Dict[str, RateLimiter] = {}
+_shared_limiters_lock = threading.Lock()
+
+def shared_rate_limiter(api_url: str = GITHUB_API_URL) -> RateLimiter:
+    """Get the process-wide rate limiter for an API and the current token"""
+    key = f"{api_url} {os.environ.get('GITHUB_TOKEN', '')}"
+    with _shared_limiters_lock:
+        if key not in _shared_limiters:
+            _shared_limiters[key] = RateLimiter()
+        return _shared_limiters[key]
+
+class ETagCache:
+    """On-disk cache of response bodies by URL for conditional requests"""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+
+    def _paths(self, url: str) -> Tuple[Path, Path]:
+        key = hashlib.sha256(url.encode()).hexdigest()
+        base = self.cache_dir / key[:2] / key
+        return base.with_suffix(".etag"), base.with_suffix(".body")
+
+    def get(self, url: str) -> Optional[Tuple[str, bytes]]:
+        """Get the (etag, body) stored for a URL"""
+        etag_file, body_file = self._paths(url)
+        try:
+            return etag_file.read_text(), body_file.read_bytes()
+        except OSError:
+            return None
+
+    def put(self, url: str, etag: str, body: bytes) -> None:
+        etag_file, body_file = self._paths(url)
+        try:
+            etag_file.parent.mkdir(parents=True, exist_ok=True)
+            for path, data in ((body_file, body), (etag_file, etag.encode())):
+                tmp_file = path.with_suffix(f"{path.suffix}.{os.getpid()}.{threading.get_ident()}.tmp")
+                tmp_file.write_bytes(data)
+                os.replace(tmp_file, path)
+        except OSError as e:
+            logger.warning(f"Could not cache {url}: {str(e)}")
+
+class GitHubClient:
+    """GitHub HTTP client with rate-limit pacing and conditional requests.
+
+    API requests wait for the shared rate limiter and are retried once the
+    limit resets rather than failing. With a cache, GET responses carrying an
+    ETag are stored and revalidated with If-None-Match; 304 responses do not
+    count against the quota.
+    """
+
+    def __init__(
+        self,
+        session: "aiohttp.ClientSession",
+        api_url: str = GITHUB_API_URL,
+        cache_dir: Optional[Path] = None,
+        limiter: Optional[RateLimiter] = None,
+        headers: Optional[Dict[str, str]] = None,
+        metrics=None
+    ):
+        self.session = session
+        self.api_url = api_url
+        self.cache = ETagCache(cache_dir) if cache_dir else None
+        self.limiter = limiter or shared_rate_limiter(api_url)
+        self.headers = github_headers(headers)
+        self.metrics = metrics  # Optional metrics.Metrics timing body downloads
+        self.requests = 0
+        self.not_modified = 0
+
+    def _is_rate_limited(self, response: "aiohttp.ClientResponse") -> bool:
+        return response.status == 429 or (
+            response.status == 403 and (
+                response.headers.get("X-RateLimit-Remaining") == "0"
+                or "Retry-After" in response.headers
+            )
+        )
+
+    @contextlib.asynccontextmanager
+    async def _request(self, url: str, headers: Dict[str, str], params: Optional[Dict] = None):
+        """Send a GET, waiting out rate limits; yields the final response"""
+        is_api = url.startswith(f"{self.api_url}/repos/")
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            if is_api:
+                await self.limiter.acquire()
+            self.requests += 1
+            async with self.session.get(url, headers=headers, params=params) as response:
+                if is_api:
+                    self.limiter.update(response.headers)
+                if attempt == MAX_RATE_LIMIT_RETRIES or not self._is_rate_limited(response):
+                    yield response
+                    return
+                delay = self.limiter.backoff(response.headers)
+                logger.warning(f"GitHub rate limit reached; waiting {delay:.0f}s before retrying {url}")
+            if not is_api:
+                # Only API requests wait on the limiter, so wait out the backoff here
+                await asyncio.sleep(delay)
+
+    async def get(
+        self,
+        url: str,
+        params: Optional[Dict[str, str]] = None,
+        accept: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        accept_content: Optional[Callable[[bytes], bool]] = None
+    ) -> Tuple[int, Optional[bytes]]:
+        """Fetch a URL, revalidating a cached copy when there is one.
+
+        Args:
+            url: URL to fetch
+            params: Query parameters
+            accept: Accept header to send
+            max_bytes: Stop reading the body after this many bytes
+            accept_content: Called with the first SNIFF_BYTES of the body;
+                if it returns False the download is abandoned
+
+        Returns:
+            Tuple of (status, body); a 304 is reported as 200 with the
+            cached body, and a body rejected by accept_content as 200 with
+            None
+        """
+        headers = dict(self.headers)
+        if accept:
+            headers["Accept"] = accept
+        cache_key = f"{url}?{urlencode(params or {})} {accept or ''}"
+        cached = self.cache.get(cache_key) if self.cache else None
+        if cached:
+            headers["If-None-Match"] = cached[0]
+
+        async with self._request(url, headers, params) as response:
+            if response.status == 304 and cached:
+                self.not_modified += 1
+                return 200, cached[1]
+            if response.status != 200:
+                return response.status, None
+
+            download_start = time.perf_counter()
+            body = bytearray()
+            sniffed = accept_content is None
+            truncated = False
+            async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+                body += chunk
+                if not sniffed and len(body) >= SNIFF_BYTES:
+                    if not accept_content(bytes(body[:SNIFF_BYTES])):
+                        return 200, None
+                    sniffed = True
+                if max_bytes is not None and len(body) >= max_bytes:
+                    truncated = len(body) > max_bytes or not response.content.at_eof()
+                    del body[max_bytes:]
+                    break
+            if self.metrics:
+                self.metrics.observe("download", time.perf_counter() - download_start)
+            if not sniffed and not accept_content(bytes(body)):
+                return 200, None
+
+            body = bytes(body)
+            etag = response.headers.get("ETag")
+            if self.cache and etag and not truncated:
+                self.cache.put(cache_key, etag, body)
+            return 200, body
+
+    async def get_json(self, url: str, params: Optional[Dict[str, str]] = None) -> Optional[Any]:
+        """Fetch and decode a JSON API response, or None on error"""
+        status, body = await self.get(url, params)
+        if status != 200:
+            logger.error(f"Error fetching {url}: {status}")
+            return None
+        return json.loads(body)
+
+    @contextlib.asynccontextmanager
+    async def stream(self, url: str):
+        """Open a response for streaming, without caching; waits out rate limits"""
+        async with self._request(url, self.headers) as response:
+            yield response
+
+async def _get_tree(client: GitHubClient, url: str, recursive: bool) -> Optional[Dict]:
+    """Fetch a single git tree object"""
+    return await client.get_json(url, {"recursive": "1"} if recursive else None)
+
+async def fetch_tree(
+    client: GitHubClient,
+    owner: str,
+    repo: str,
+    ref: Optional[str] = None
+) -> List[Dict]:
+    """List every entry of a repository at a ref using the git Trees API.
+
+    One recursive request covers the whole repository. If GitHub truncates the
+    response, the tree is walked one level at a time instead, fetching each
+    level's subtrees concurrently.
+
+    Args:
+        client: GitHub client to send requests with
+        owner: Repository owner
+        repo: Repository name
+        ref: Branch, tag or commit SHA (default: the default branch)
+
+    Returns:
+        Tree entries with "path", "type" ("blob" or "tree"), "sha" and, for
+        blobs, "size", sorted by path
+    """
+    trees_url = f"{client.api_url}/repos/{owner}/{repo}/git/trees"
+    root = await _get_tree(client, f"{trees_url}/{ref or 'HEAD'}", recursive=True)
+    if root is None:
+        return []
+    if not root.get("truncated"):
+        return sorted(root.get("tree", []), key=lambda entry: entry["path"])
+
+    logger.info(f"Tree for {owner}/{repo} is truncated; walking it level by level")
+    semaphore = asyncio.Semaphore(TREE_WALK_CONCURRENCY)
+
+    async def get_subtree(sha: str) -> Optional[Dict]:
+        async with semaphore:
+            return await _get_tree(client, f"{trees_url}/{sha}", recursive=False)
+
+    entries: List[Dict] = []
+    level = [("", root["sha"])]
+    while level:
+        trees = await asyncio.gather(*(get_subtree(sha) for _, sha in level))
+        next_level = []
+        for (prefix, _), tree in zip(level, trees):
+            for entry in (tree or {}).get("tree", []):
+                entry = dict(entry, path=f"{prefix}{entry['path']}")
+                entries.append(entry)
+                if entry["type"] == "tree":
+                    next_level.append((f"{entry['path']}/", entry["sha"]))
+        level = next_level
+    return sorted(entries, key=lambda entry: entry["path"])
+
+def compile_path_patterns(patterns: List[str]) -> Callable[[str], bool]:
+    """Compile GitHub match patterns into a single path predicate.
+
+    Patterns ending in ``/*`` match the directory and everything below it,
+    other patterns containing wildcards are matched as globs (``*.md``), and
+    anything else matches one path exactly.
+    """
+    exact = set()
+    prefixes = []
+    globs = []
+    for pattern in patterns:
+        if pattern.endswith('/*'):
+            exact.add(pattern[:-2])
+            prefixes.append(pattern[:-2] + '/')
+        elif any(char in pattern for char in '*?['):
+            globs.append(fnmatch.translate(pattern))
+        else:
+            exact.add(pattern)
+    prefixes = tuple(prefixes)
+    glob_re = re.compile('|'.join(globs)) if globs else None
+
+    def matches(path: str) -> bool:
+        return (
+            path in exact
+            or (bool(prefixes) and path.startswith(prefixes))
+            or (glob_re is not None and glob_re.match(path) is not None)
+        )
+    return matches
+
+class _ChunkPipe:
+    """Blocking file-like reader over chunks fed from the event loop.
+
+    Lets tarfile consume a download as a stream from a reader thread while
+    the event loop keeps receiving it; at most ``maxsize`` chunks are
+    buffered at a time. Feeding never blocks the loop or occupies an
+    executor thread: a full buffer is waited on as an asyncio event that
+    the reader sets whenever it takes a chunk.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = 16):
+        self._loop = loop
+        self._chunks: queue.Queue = queue.Queue(maxsize)
+        self._space = asyncio.Event()
+        self._buffer = b""
+        self._eof = False
+        self.closed = threading.Event()  # Set by the reader when it stops
+        self.aborted = threading.Event()  # Set by the writer when the download fails
+
+    def _wake_writer(self) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._space.set)
+        except RuntimeError:
+            pass  # The loop is closed; nobody is waiting
+
+    async def feed(self, chunk: bytes) -> bool:
+        """Queue a chunk, waiting while the buffer is full.
+
+        Returns:
+            False if the reader has stopped and the download can be abandoned
+        """
+        while not self.closed.is_set():
+            try:
+                self._chunks.put_nowait(chunk)
+                return True
+            except queue.Full:
+                self._space.clear()
+                # The reader may have made room before the event was cleared
+                if self._chunks.full() and not self.closed.is_set():
+                    await self._space.wait()
+        return False
+
+    async def finish(self) -> None:
+        """Signal the end of the stream"""
+        await self.feed(b"")
+
+    def close(self) -> None:
+        """Called by the reader when it stops reading"""
+        self.closed.set()
+        self._wake_writer()
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            try:
+                chunk = self._chunks.get(timeout=0.1)
+            except queue.Empty:
+                if self.aborted.is_set():
+                    raise OSError("Download aborted")
+                continue
+            self._wake_writer()
+            if not chunk:
+                self._eof = True
+            self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+def _read_tarball(
+    pipe: _ChunkPipe,
+    select: Callable[[str, int], bool],
+    handle: Callable[[str, bytes], None],
+    max_bytes: Optional[int],
+    accept_content: Optional[Callable[[bytes], bool]]
+) -> int:
+    """Walk a streamed repository tarball, handing selected files to handle()
+
+    Runs on the reader thread; handle() is expected to pass each file on
+    rather than process it there.
+    """
+    count = 0
+    try:
+        with tarfile.open(fileobj=pipe, mode="r|gz") as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                # Entries are nested under a single "<owner>-<repo>-<sha>/" directory
+                path = member.name.partition("/")[2]
+                if not path or not select(path, member.size):
+                    continue
+                f = archive.extractfile(member)
+                head = f.read(SNIFF_BYTES)
+                if accept_content and not accept_content(head):
+                    continue
+                if max_bytes is None:
+                    data = head + f.read()
+                else:
+                    data = (head + f.read(max(max_bytes - len(head), 0)))[:max_bytes]
+                handle(path, data)
+                count += 1
+    finally:
+        pipe.close()
+    return count
+
+def _start_reader(loop: asyncio.AbstractEventLoop, target: Callable[..., Any], *args) -> "asyncio.Future":
+    """Run a blocking reader on its own thread, returning a future for its result.
+
+    A dedicated thread rather than the loop's executor: a reader waits for
+    chunks for as long as its download lasts, and several streams sharing a
+    bounded pool could otherwise take every worker.
+    """
+    future = loop.create_future()
+
+    def resolve(result: Any, error: Optional[BaseException]) -> None:
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def run() -> None:
+        try:
+            result = target(*args)
+        except BaseException as e:
+            outcome = (None, e)
+        else:
+            outcome = (result, None)
+        try:
+            loop.call_soon_threadsafe(resolve, *outcome)
+        except RuntimeError:
+            pass  # The loop is closed; nobody is waiting for the result
+
+    threading.Thread(target=run, name="tarball-reader", daemon=True).start()
+    return future
+
+async def stream_tarball(
+    client: GitHubClient,
+    owner: str,
+    repo: str,
+    select: Callable[[str, int], bool],
+    handle: Callable[[str, bytes], None],
+    ref: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    accept_content: Optional[Callable[[bytes], bool]] = None
+) -> int:
+    """Download a repository tarball once and walk it as it arrives.
+
+    The archive is decompressed and read by a dedicated thread while it is
+    still downloading, so it is never held in memory or written to disk.
+
+    Args:
+        client: GitHub client to send requests with
+        owner: Repository owner
+        repo: Repository name
+        select: Called with each file's repository path and size; only
+            files it accepts are read
+        handle: Called on the event loop with (path, content) for each
+            selected file, in archive order; all calls have been made when
+            this returns
+        ref: Branch, tag or commit SHA (default: the default branch)
+        max_bytes: Read at most this many bytes of each file
+        accept_content: Called with the first SNIFF_BYTES of each selected
+            file; files it rejects are skipped without reading the rest
+
+    Returns:
+        Number of files handed to handle()
+    """
+    url = f"{client.api_url}/repos/{owner}/{repo}/tarball/{ref or 'HEAD'}"
+    loop = asyncio.get_running_loop()
+    async with client.stream(url) as response:
+        if response.status != 200:
+            logger.error(f"Error fetching {url}: {response.status}")
+            return 0
+
+        pipe = _ChunkPipe(loop)
+        failures: List[BaseException] = []
+
+        def dispatch(path: str, data: bytes) -> None:
+            if failures:
+                return
+            try:
+                handle(path, data)
+            except BaseException as e:
+                failures.append(e)
+                pipe.aborted.set()  # Stops the reader at its next read
+
+        def deliver(path: str, data: bytes) -> None:
+            # Handlers touch progress and metrics state owned by the loop
+            loop.call_soon_threadsafe(dispatch, path, data)
+
+        reader = _start_reader(loop, _read_tarball, pipe, select, deliver, max_bytes, accept_content)
+        try:
+            async for chunk in response.content.iter_chunked(TARBALL_CHUNK_SIZE):
+                if not await pipe.feed(chunk):
+                    break
+        except BaseException:
+            pipe.aborted.set()
+            reader.add_done_callback(lambda future: future.cancelled() or future.exception())
+            raise
+        await pipe.finish()
+        try:
+            # Deliveries are queued ahead of the reader's result, so every
+            # handle() call has run once it resolves
+            count = await reader
+        except OSError:
+            if failures:
+                raise failures[0] from None
+            raise
+        if failures:
+            raise failures[0]
+        return count
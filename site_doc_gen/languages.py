@@ -0,0 +1,213 @@
+"""
+Programming language identification for code snippets
+"""
+
+import functools
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable, Optional, Tuple
+
+# File extension (lowercase, without the dot) to markdown code fence language
+EXTENSION_LANGUAGES = {
+    "py": "python", "pyi": "python", "pyx": "cython",
+    "js": "javascript", "mjs": "javascript", "cjs": "javascript", "jsx": "jsx",
+    "ts": "typescript", "tsx": "tsx",
+    "java": "java", "kt": "kotlin", "kts": "kotlin", "scala": "scala", "groovy": "groovy",
+    "c": "c", "h": "c", "cc": "cpp", "cpp": "cpp", "cxx": "cpp", "hpp": "cpp", "hh": "cpp",
+    "cs": "csharp", "fs": "fsharp", "go": "go", "rs": "rust", "swift": "swift",
+    "m": "objectivec", "mm": "objectivec",
+    "rb": "ruby", "php": "php", "pl": "perl", "pm": "perl", "lua": "lua", "r": "r",
+    "jl": "julia", "dart": "dart", "ex": "elixir", "exs": "elixir", "erl": "erlang",
+    "hs": "haskell", "ml": "ocaml", "clj": "clojure", "zig": "zig", "nim": "nim",
+    "sh": "bash", "bash": "bash", "zsh": "bash", "fish": "fish", "ps1": "powershell",
+    "bat": "batch", "cmd": "batch",
+    "sql": "sql", "graphql": "graphql", "gql": "graphql", "proto": "protobuf",
+    "html": "html", "htm": "html", "xml": "xml", "svg": "xml",
+    "css": "css", "scss": "scss", "sass": "sass", "less": "less",
+    "vue": "vue", "svelte": "svelte",
+    "json": "json", "jsonc": "json", "yaml": "yaml", "yml": "yaml", "toml": "toml",
+    "ini": "ini", "cfg": "ini", "conf": "ini",
+    "md": "markdown", "markdown": "markdown", "rst": "rst", "tex": "latex",
+    "tf": "hcl", "hcl": "hcl", "nix": "nix", "cmake": "cmake", "gradle": "groovy",
+    "txt": "text",
+}
+
+# Whole file names that identify a language regardless of extension
+FILENAME_LANGUAGES = {
+    "dockerfile": "dockerfile",
+    "makefile": "makefile",
+    "gnumakefile": "makefile",
+    "cmakelists.txt": "cmake",
+    "gemfile": "ruby",
+    "rakefile": "ruby",
+    "jenkinsfile": "groovy",
+}
+
+def language_for_path(path: str, default: str = "text") -> str:
+    """Get the code fence language for a file from its name"""
+    name = os.path.basename(path).lower()
+    if name in FILENAME_LANGUAGES:
+        return FILENAME_LANGUAGES[name]
+    _, ext = os.path.splitext(name)
+    return EXTENSION_LANGUAGES.get(ext[1:], default)
+
+# Code fence languages for interpreter names in a shebang line
+SHEBANG_LANGUAGES = {
+    "python": "python", "pypy": "python",
+    "sh": "bash", "bash": "bash", "dash": "bash", "ksh": "bash", "zsh": "bash", "fish": "fish",
+    "node": "javascript", "deno": "typescript", "bun": "javascript", "ts-node": "typescript",
+    "ruby": "ruby", "perl": "perl", "php": "php", "lua": "lua", "rscript": "r",
+    "pwsh": "powershell", "tclsh": "tcl", "awk": "awk", "gawk": "awk",
+}
+
+# Class hint names that aren't file extensions
+LANGUAGE_ALIASES = {
+    "python3": "python", "py3": "python", "ipython": "python", "ipython3": "python",
+    "shell": "bash", "console": "console", "shell-session": "console", "sh-session": "console",
+    "javascript": "javascript", "typescript": "typescript", "golang": "go", "c++": "cpp",
+    "docker": "dockerfile", "make": "makefile", "yml": "yaml", "text": "text",
+    "none": "text", "plain": "text", "plaintext": "text", "nohighlight": "text",
+}
+
+# Class prefixes naming a language: Prism/highlight.js/MkDocs ("language-py"),
+# Google Prettify ("lang-js") and Sphinx ("highlight-python3")
+CLASS_PREFIXES = ("language-", "lang-", "highlight-")
+
+# Class hints naming no particular language (Sphinx's "highlight-default" is the project default)
+UNSPECIFIED_LANGUAGES = {"default", "auto", "code", "source"}
+
+# Candidate languages for a Pygments guess, with their lexer names. Only lexers
+# whose analyse_text() recognizes something are worth asking.
+GUESS_LEXERS = {
+    "python": "python",
+    "bash": "bash",
+    "html": "html",
+    "xml": "xml",
+    "php": "php",
+    "c": "c",
+    "cpp": "cpp",
+    "ruby": "ruby",
+    "perl": "perl",
+    "sql": "sql",
+    "diff": "diff",
+    "makefile": "make",
+    "ini": "ini",
+}
+
+# Lowest analyse_text() score accepted as a guess
+GUESS_MIN_SCORE = 0.1
+
+# Characters of a snippet looked at by a guess; snippets are keyed by a hash of these
+GUESS_MAX_CHARS = 4096
+
+# Guesses remembered per process
+GUESS_CACHE_SIZE = 4096
+
+SHEBANG_RE = re.compile(r"#!\s*(\S+)(?:[ \t]+(.*))?")
+
+_guess_cache: "OrderedDict[bytes, Optional[str]]" = OrderedDict()
+_guess_lock = threading.Lock()
+
+def _hint_language(hint: str) -> Optional[str]:
+    hint = hint.lower()
+    if hint in UNSPECIFIED_LANGUAGES:
+        return None
+    return LANGUAGE_ALIASES.get(hint) or EXTENSION_LANGUAGES.get(hint, hint)
+
+def language_from_classes(classes: Iterable[str]) -> Optional[str]:
+    """Get the language named by a class hint such as "language-py", if any"""
+    for cls in classes:
+        for prefix in CLASS_PREFIXES:
+            if cls.startswith(prefix) and len(cls) > len(prefix):
+                language = _hint_language(cls[len(prefix):])
+                if language:
+                    return language
+    return None
+
+def language_from_shebang(code: str) -> Optional[str]:
+    """Get the language of a script from its "#!" line, if it has one"""
+    if not code.startswith("#!"):
+        return None
+    match = SHEBANG_RE.match(code.partition("\n")[0])
+    if not match:
+        return None
+    interpreter = os.path.basename(match.group(1))
+    if interpreter == "env" and match.group(2):
+        # "#!/usr/bin/env -S python3 -u": the first argument that isn't an option
+        interpreter = next((arg for arg in match.group(2).split() if not arg.startswith("-")), "")
+    # "python3.11" -> "python"
+    interpreter = interpreter.lower().rstrip("0123456789.")
+    return SHEBANG_LANGUAGES.get(interpreter)
+
+@functools.lru_cache(maxsize=None)
+def _guess_lexers() -> Tuple[Tuple[str, Any], ...]:
+    """The candidate lexer classes, loaded on the first guess"""
+    from pygments.lexers import find_lexer_class_by_name
+    from pygments.util import ClassNotFound
+
+    lexers = []
+    for language, name in GUESS_LEXERS.items():
+        try:
+            lexers.append((language, find_lexer_class_by_name(name)))
+        except ClassNotFound:
+            pass
+    return tuple(lexers)
+
+def _guess(sample: str) -> Optional[str]:
+    best, best_score = None, GUESS_MIN_SCORE
+    for language, lexer in _guess_lexers():
+        score = lexer.analyse_text(sample)
+        if score > best_score or (score == best_score and best is None):
+            best, best_score = language, score
+    return best
+
+def guess_language(code: str) -> Optional[str]:
+    """Guess a snippet's language with Pygments' lexer heuristics.
+
+    Only the first GUESS_MAX_CHARS characters are analysed, and results are
+    memoized by a hash of them, so repeated snippets cost one lookup.
+    """
+    sample = code[:GUESS_MAX_CHARS]
+    if not sample.strip():
+        return None
+    key = hashlib.blake2b(sample.encode("utf-8", errors="surrogatepass"), digest_size=16).digest()
+    with _guess_lock:
+        if key in _guess_cache:
+            _guess_cache.move_to_end(key)
+            return _guess_cache[key]
+    language = _guess(sample)
+    with _guess_lock:
+        _guess_cache[key] = language
+        if len(_guess_cache) > GUESS_CACHE_SIZE:
+            _guess_cache.popitem(last=False)
+    return language
+
+def detect_language(
+    code: str,
+    classes: Iterable[str] = (),
+    path: Optional[str] = None,
+    default: str = "text"
+) -> str:
+    """Get the code fence language for a snippet.
+
+    Cheap evidence is tried first: class hints from the surrounding markup,
+    then the file name (extension or well-known name), then a shebang line.
+    Pygments is only asked to guess when none of them names a language.
+
+    Args:
+        code: Snippet text
+        classes: CSS classes of the snippet's element and its containers
+        path: File the snippet came from, if any
+        default: Language when nothing matches
+    """
+    language = language_from_classes(classes)
+    if language:
+        return language
+    if path:
+        language = language_for_path(path, default="")
+        if language:
+            return language
+    return language_from_shebang(code) or guess_language(code) or default
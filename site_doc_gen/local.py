@@ -0,0 +1,107 @@
+"""
+Local filesystem sources: checked-out repositories and built documentation trees
+"""
+
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+from .filetypes import SNIFF_BYTES, FileClassifier
+
+# Files at least this large are read through mmap instead of a buffered read.
+# Below any practical size cap, so capped files can still use it.
+MMAP_MIN_BYTES = 64 * 1024
+
+HTML_EXTENSIONS = (".html", ".htm")
+
+def local_source_path(url: str) -> Optional[Path]:
+    """Resolve a file:// URL or directory path to a local directory.
+
+    Returns:
+        The directory, or None if the URL does not name a local directory
+    """
+    if url.startswith("file://"):
+        path = Path(unquote(urlparse(url).path))
+    elif "://" in url:
+        return None
+    else:
+        path = Path(url).expanduser()
+    return path.resolve() if path.is_dir() else None
+
+def _scan_one(directory: str) -> Tuple[List[str], List[str]]:
+    """List the files and subdirectories of one directory, skipping hidden entries"""
+    files, subdirs = [], []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file():
+                    files.append(entry.path)
+    except OSError:
+        pass
+    return files, subdirs
+
+def scan_directory(
+    root: Path,
+    select: Callable[[str], bool],
+    executor: ThreadPoolExecutor
+) -> List[str]:
+    """Find the files below root accepted by select.
+
+    Each directory is listed with os.scandir as its own task on the executor,
+    so sibling directories are scanned in parallel.
+
+    Args:
+        root: Directory to scan
+        select: Called with each file's path relative to root (using "/")
+        executor: Thread pool running the scans
+
+    Returns:
+        Selected relative paths, sorted
+    """
+    root_str = str(root)
+    selected = []
+    pending = {executor.submit(_scan_one, root_str)}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            files, subdirs = future.result()
+            for path in files:
+                relpath = os.path.relpath(path, root_str).replace(os.sep, "/")
+                if select(relpath):
+                    selected.append(relpath)
+            pending.update(executor.submit(_scan_one, subdir) for subdir in subdirs)
+    return sorted(selected)
+
+def read_text(path: Path, classifier: Optional[FileClassifier] = None) -> Optional[str]:
+    """Read a file as UTF-8 text, mapping large files instead of buffering them.
+
+    Returns:
+        The text, or None if the classifier rejects the file's size or content
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        limit = size
+        if classifier:
+            if not classifier.accepts_size(size):
+                return None
+            if classifier.max_bytes is not None:
+                limit = min(size, classifier.max_bytes)
+        if size == 0:
+            return ""
+        if size < MMAP_MIN_BYTES:
+            data = f.read(limit)
+            if classifier and not classifier.accepts_content(data[:SNIFF_BYTES]):
+                return None
+            return data.decode("utf-8", errors="replace")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if classifier and not classifier.accepts_content(mapped[:SNIFF_BYTES]):
+                return None
+            with memoryview(mapped) as view:
+                return str(view[:limit], "utf-8", "replace")
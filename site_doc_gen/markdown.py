@@ -2,18 +2,63 @@
 Markdown conversion and formatting utilities
 """
 
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
+from concurrent.futures import ProcessPoolExecutor
+import dataclasses
+from pathlib import Path
+import hashlib
+import json
+import os
 import re
-from bs4 import BeautifulSoup
 from markdownify import markdownify as md
 
+from .rawtext import code_fence
+from .snippets import SnippetEntry, SnippetIndex
 from .types import Documentation, Page, CodeSnippet, Heading
 
+# Pages listed after a shared snippet before the rest are summarized
+MAX_BACK_REFERENCES = 5
+
+# Options passed to markdownify; part of the conversion cache key
+MARKDOWNIFY_OPTIONS = {"heading_style": "ATX", "bullets": "-"}
+
+def _no_code_language(_) -> str:
+    """Code language callback for markdownify (module-level so it can be pickled)"""
+    return ""
+
+def _html_to_markdown(html: str) -> str:
+    """Convert HTML to markdown; runs in worker processes"""
+    return md(html, code_language_callback=_no_code_language, **MARKDOWNIFY_OPTIONS)
+
 class MarkdownConverter:
     """Convert documentation to markdown format"""
     
-    def __init__(self, docs: Documentation):
+    def __init__(
+        self,
+        docs: Documentation,
+        workers: int = 1,
+        cache_dir: Optional[Path] = None,
+        dedupe_snippets: bool = True
+    ):
+        """
+        Args:
+            docs: Documentation to convert
+            workers: Number of processes used for HTML conversion
+                (1 converts in-process, 0 uses one per CPU)
+            cache_dir: Directory for the conversion cache, keyed by a hash
+                of the page content and converter options
+            dedupe_snippets: Render a snippet repeated across the site once,
+                with later copies referring back to it
+        """
         self.docs = docs
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.dedupe_snippets = dedupe_snippets
+        self.snippets: Optional[SnippetIndex] = None
+        self._rendered_snippets: Set[str] = set()
+        self._converted: Dict[str, str] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
     
     def _generate_toc(self, headings: List[Heading], level: int = 0) -> str:
         """Generate table of contents from headings"""
@@ -42,17 +87,125 @@ class MarkdownConverter:
         
         # Add code block
         lang_tag = snippet.language if snippet.language != "text" else ""
+        fence = code_fence(snippet.code)
         parts.extend([
-            f"```{lang_tag}",
+            f"{fence}{lang_tag}",
             snippet.code.strip(),
-            "```"
+            fence
         ])
         
         return "\n".join(parts)
     
+    def _format_shared_snippet(self, page: Page, snippet: CodeSnippet, entry: SnippetEntry) -> str:
+        """Format a snippet that appears more than once in the site.
+        
+        The first copy is rendered in full under an anchor, followed by the
+        other pages using it; later copies keep their context and link back.
+        """
+        if entry.hash in self._rendered_snippets:
+            first = entry.pages[0]
+            parts = [snippet.context.strip(), ""] if snippet.context else []
+            parts.append(
+                f"*Same code as the {entry.language} snippet on "
+                f"[{entry.titles[first]}](#{entry.anchor}), used {entry.occurrences} times.*"
+            )
+            return "\n".join(parts)
+        
+        self._rendered_snippets.add(entry.hash)
+        # The merged copy: normalized code, and a language even if this copy had none
+        merged = dataclasses.replace(snippet, code=entry.code, language=entry.language)
+        parts = [f'<a id="{entry.anchor}"></a>', "", self._format_code_snippet(merged)]
+        others = [entry.titles[url] for url in entry.pages if url != page.url]
+        if others:
+            listed = ", ".join(others[:MAX_BACK_REFERENCES])
+            if len(others) > MAX_BACK_REFERENCES:
+                listed += f" and {len(others) - MAX_BACK_REFERENCES} more"
+            parts.extend(["", f"*Also used on: {listed}.*"])
+        return "\n".join(parts)
+    
     def _convert_html_to_markdown(self, html: str) -> str:
         """Convert HTML to markdown while preserving code blocks"""
-        return md(html, heading_style="ATX", bullets="-", code_language_callback=lambda _: "")
+        key = self._cache_key(html)
+        if key not in self._converted:
+            cached = self._cache_get(key)
+            if cached is None:
+                cached = _html_to_markdown(html)
+                self._cache_put(key, cached)
+            self._converted[key] = cached
+        return self._converted[key]
+    
+    def _cache_key(self, html: str) -> str:
+        """Hash page content together with the converter options"""
+        digest = hashlib.sha256()
+        digest.update(json.dumps(MARKDOWNIFY_OPTIONS, sort_keys=True).encode())
+        digest.update(b"\0")
+        digest.update(html.encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+    
+    def _cache_path(self, key: str) -> Path:
+        """Get the on-disk location of a cache entry"""
+        return self.cache_dir / key[:2] / f"{key}.md"
+    
+    def _cache_get(self, key: str) -> Optional[str]:
+        """Read a converted page from the cache"""
+        if not self.cache_dir:
+            return None
+        try:
+            content = self._cache_path(key).read_text(encoding="utf-8")
+        except OSError:
+            self.cache_misses += 1
+            return None
+        self.cache_hits += 1
+        return content
+    
+    def _cache_put(self, key: str, markdown: str) -> None:
+        """Write a converted page to the cache"""
+        if not self.cache_dir:
+            return
+        path = self._cache_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so readers never see partial entries
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(markdown, encoding="utf-8")
+        os.replace(tmp_path, path)
+    
+    def _prepare(self, pages: List[Page]) -> None:
+        """Convert all uncached page content up front, across processes if enabled"""
+        pending: Dict[str, str] = {}
+        for page in pages:
+            if page.content_format != "html":
+                continue
+            key = self._cache_key(page.content)
+            if key in self._converted or key in pending:
+                continue
+            cached = self._cache_get(key)
+            if cached is not None:
+                self._converted[key] = cached
+            else:
+                pending[key] = page.content
+        
+        if not pending:
+            return
+        
+        keys = list(pending)
+        if self.workers > 1 and len(keys) > 1:
+            workers = min(self.workers, len(keys))
+            chunksize = max(1, len(keys) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # map() yields results in submission order
+                results = executor.map(
+                    _html_to_markdown,
+                    (pending[key] for key in keys),
+                    chunksize=chunksize
+                )
+                for key, markdown in zip(keys, results):
+                    self._converted[key] = markdown
+                    self._cache_put(key, markdown)
+        else:
+            for key in keys:
+                markdown = _html_to_markdown(pending[key])
+                self._converted[key] = markdown
+                self._cache_put(key, markdown)
     
     def _format_page(self, page: Page) -> str:
         """Format a single page as markdown"""
@@ -75,9 +228,11 @@ class MarkdownConverter:
                 ""
             ])
         
-        # Convert main content
-        content = self._convert_html_to_markdown(page.content)
-        parts.append(content)
+        # Convert main content; raw markdown and source files need no conversion
+        if page.content_format == "html":
+            parts.append(self._convert_html_to_markdown(page.content))
+        elif page.content_format == "markdown":
+            parts.append(page.content.strip())
         
         # Add code snippets section if any
         if page.code_snippets:
@@ -88,7 +243,11 @@ class MarkdownConverter:
             ])
             
             for snippet in page.code_snippets:
-                parts.append(self._format_code_snippet(snippet))
+                entry = self.snippets.entry_for(snippet) if self.snippets else None
+                if entry and entry.shared:
+                    parts.append(self._format_shared_snippet(page, snippet, entry))
+                else:
+                    parts.append(self._format_code_snippet(snippet))
                 parts.append("")  # Empty line between snippets
         
         return "\n".join(parts)
@@ -107,6 +266,12 @@ class MarkdownConverter:
             ""
         ])
         
+        # Convert page content up front so formatting only reads results
+        self._prepare(self.docs.pages)
+        if self.dedupe_snippets:
+            self.snippets = SnippetIndex.from_pages(self.docs.pages)
+            self._rendered_snippets = set()
+        
         # Process each page
         for page in self.docs.pages:
             parts.append(self._format_page(page))
@@ -0,0 +1,242 @@
+"""
+Per-stage timing, latency histograms and byte counters for documentation runs
+"""
+
+import bisect
+import contextlib
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds, in seconds, of the histogram buckets (Prometheus defaults)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Stages in the order they happen to a page
+STAGES = ("connect", "ttfb", "download", "parse", "readability", "extract", "render", "write", "export")
+
+class Histogram:
+    """Fixed-bucket histogram of durations in seconds"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating within its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "total_seconds": round(self.sum, 4),
+            "mean_ms": round(self.sum / self.count * 1000, 2) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5) * 1000, 2),
+            "p95_ms": round(self.quantile(0.95) * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+class Metrics:
+    """Thread-safe collector for one run, optionally forwarding to a process-wide parent.
+
+    Tracks the time spent in each stage (see STAGES), request latency per
+    host, bytes received from the network and bytes written to the output.
+    """
+
+    def __init__(self, parent: Optional["Metrics"] = None):
+        self.parent = parent
+        # Called with a stage name; the context manager it returns wraps the
+        # stage's work (used by the profiler to attribute CPU time to stages)
+        self.stage_hook: Optional[Callable[[str], ContextManager]] = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear this collector (the parent keeps its totals)"""
+        with self._lock:
+            self.stages: Dict[str, Histogram] = defaultdict(Histogram)
+            self.hosts: Dict[str, Histogram] = defaultdict(Histogram)
+            self.requests: Dict[str, int] = defaultdict(int)
+            self.errors = 0
+            self.bytes_in = 0
+            self.bytes_out = 0
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record time spent in a stage"""
+        with self._lock:
+            self.stages[stage].observe(seconds)
+        if self.parent:
+            self.parent.observe(stage, seconds)
+
+    @contextlib.contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block as a stage"""
+        hook = self.stage_hook(stage) if self.stage_hook else contextlib.nullcontext()
+        start = time.perf_counter()
+        try:
+            with hook:
+                yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe_request(self, host: str, seconds: float) -> None:
+        """Record a request's latency until response headers arrived"""
+        with self._lock:
+            self.hosts[host].observe(seconds)
+            self.requests[host] += 1
+        if self.parent:
+            self.parent.observe_request(host, seconds)
+
+    def add_error(self) -> None:
+        with self._lock:
+            self.errors += 1
+        if self.parent:
+            self.parent.add_error()
+
+    def add_bytes(self, received: int = 0, written: int = 0) -> None:
+        with self._lock:
+            self.bytes_in += received
+            self.bytes_out += written
+        if self.parent:
+            self.parent.add_bytes(received, written)
+
+    def trace_config(self):
+        """Build an aiohttp TraceConfig feeding connect, TTFB and byte counts into this collector"""
+        import aiohttp
+
+        async def on_request_start(session, ctx, params):
+            ctx.request_start = time.perf_counter()
+
+        async def on_request_end(session, ctx, params):
+            elapsed = time.perf_counter() - ctx.request_start
+            self.observe("ttfb", elapsed)
+            self.observe_request(params.url.host or "", elapsed)
+
+        async def on_request_exception(session, ctx, params):
+            self.add_error()
+
+        async def on_connection_create_start(session, ctx, params):
+            ctx.connect_start = time.perf_counter()
+
+        async def on_connection_create_end(session, ctx, params):
+            self.observe("connect", time.perf_counter() - ctx.connect_start)
+
+        async def on_response_chunk_received(session, ctx, params):
+            self.add_bytes(received=len(params.chunk))
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_connection_create_start.append(on_connection_create_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_response_chunk_received.append(on_response_chunk_received)
+        return trace_config
+
+    def summary(self) -> Dict[str, Any]:
+        """Summarize the run for Documentation.metadata"""
+        with self._lock:
+            ordered = [stage for stage in STAGES if stage in self.stages]
+            ordered += sorted(stage for stage in self.stages if stage not in STAGES)
+            return {
+                "stages": {stage: self.stages[stage].summary() for stage in ordered},
+                "hosts": {
+                    host: dict(histogram.summary(), requests=self.requests[host])
+                    for host, histogram in sorted(self.hosts.items())
+                },
+                "requests": sum(self.requests.values()),
+                "errors": self.errors,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+            }
+
+    def prometheus(self, prefix: str = "site_doc_gen") -> str:
+        """Render the collected metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            lines += _histogram_lines(
+                f"{prefix}_stage_seconds", "Time spent in each generation stage",
+                "stage", self.stages
+            )
+            lines += _histogram_lines(
+                f"{prefix}_host_latency_seconds", "Request latency until response headers, per host",
+                "host", self.hosts
+            )
+            lines += [
+                f"# HELP {prefix}_requests_total HTTP requests sent, per host",
+                f"# TYPE {prefix}_requests_total counter",
+            ]
+            lines += [
+                f'{prefix}_requests_total{{host="{_label(host)}"}} {count}'
+                for host, count in sorted(self.requests.items())
+            ]
+            for name, help_text, value in (
+                ("request_errors_total", "HTTP requests that failed without a response", self.errors),
+                ("bytes_received_total", "Bytes received from the network", self.bytes_in),
+                ("bytes_written_total", "Bytes written to output files", self.bytes_out),
+            ):
+                lines += [
+                    f"# HELP {prefix}_{name} {help_text}",
+                    f"# TYPE {prefix}_{name} counter",
+                    f"{prefix}_{name} {value}",
+                ]
+        return "\n".join(lines) + "\n"
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _histogram_lines(name: str, help_text: str, label: str, histograms: Dict[str, Histogram]) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for key, histogram in sorted(histograms.items()):
+        value = _label(key)
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{name}_bucket{{{label}="{value}",le="{le}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{label}="{value}"}} {histogram.sum}')
+        lines.append(f'{name}_count{{{label}="{value}"}} {histogram.count}')
+    return lines
+
+def format_report(summary: Dict[str, Any]) -> str:
+    """Format a metrics summary as a plain-text table for the --stats report"""
+    lines = [
+        f"{'Stage':<12} {'Count':>7} {'Total s':>9} {'Mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'Max ms':>9}"
+    ]
+    for stage, stats in summary["stages"].items():
+        lines.append(
+            f"{stage:<12} {stats['count']:>7} {stats['total_seconds']:>9.3f} {stats['mean_ms']:>9.2f} "
+            f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['max_ms']:>9.2f}"
+        )
+    if summary["hosts"]:
+        lines += ["", f"{'Host':<32} {'Requests':>8} {'Mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}"]
+        for host, stats in summary["hosts"].items():
+            lines.append(
+                f"{host:<32} {stats['requests']:>8} {stats['mean_ms']:>9.2f} "
+                f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f}"
+            )
+    lines += [
+        "",
+        f"Requests: {summary['requests']} ({summary['errors']} failed)",
+        f"Bytes in: {summary['bytes_in']:,}  Bytes out: {summary['bytes_out']:,}",
+    ]
+    return "\n".join(lines)
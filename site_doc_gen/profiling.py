@@ -0,0 +1,311 @@
+"""
+CPU profiling, memory tracing and event-loop lag measurement for a run
+"""
+
+import asyncio
+import collections.abc
+import contextlib
+import contextvars
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from .metrics import STAGES, Histogram, Metrics
+
+# Buckets for CPU time that falls outside any timed stage
+UNTIMED = "untimed"  # Task code between stages
+EVENT_LOOP = "event-loop"  # Loop internals and callbacks outside tasks (socket reads, timers)
+
+LAG_INTERVAL = 0.01  # Seconds between event-loop lag probes
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SLOW_LAG = 0.1  # Lag at which the loop is reported as blocked
+
+TOP_FUNCTIONS = 40
+TOP_STAGE_FUNCTIONS = 15
+TOP_ALLOCATIONS = 20
+
+# Allocation sites left out of memory reports
+_IGNORED_ALLOCATORS = (
+    tracemalloc.__file__,
+    "<frozen importlib._bootstrap>",
+    "<frozen importlib._bootstrap_external>",
+    "<unknown>",
+)
+
+class _StageCoroutine(collections.abc.Coroutine):
+    """Wrap a task's coroutine so each step runs under the profile of the task's current stage"""
+
+    def __init__(self, coro, profiler: "Profiler"):
+        self._coro = coro
+        self._profiler = profiler
+
+    def send(self, value):
+        self._profiler._activate(self._profiler._stage.get())
+        try:
+            return self._coro.send(value)
+        finally:
+            self._profiler._activate(EVENT_LOOP)
+
+    def throw(self, *args):
+        self._profiler._activate(self._profiler._stage.get())
+        try:
+            return self._coro.throw(*args)
+        finally:
+            self._profiler._activate(EVENT_LOOP)
+
+    def close(self):
+        return self._coro.close()
+
+    def __await__(self):
+        return self._coro.__await__()
+
+    def __getattr__(self, name):
+        # cr_frame, cr_code etc. for task reprs and debugging
+        return getattr(self._coro, name)
+
+class Profiler:
+    """Profile a run, writing reports to a directory when it finishes.
+
+    With ``cpu`` enabled, code on the event-loop thread is profiled with
+    cProfile into one profile per stage. Stages come from Metrics.time, and
+    since asyncio interleaves tasks, the active stage is tracked per task:
+    every task step switches to the profile of the stage its task is in,
+    so time another task spends while one awaits inside a stage is not
+    charged to that stage. Event-loop lag is sampled alongside.
+
+    With ``memory`` enabled, tracemalloc snapshots are taken at checkpoints
+    and the top allocators (and growth between checkpoints) are reported.
+
+    Work done in thread or process pools is not profiled.
+
+    Usage:
+        async with Profiler(directory, cpu=True, memory=True) as profiler:
+            profiler.attach(doc_gen.metrics)
+            await profiler.track(work())
+            profiler.checkpoint("done")
+    """
+
+    def __init__(self, profile_dir: Path, cpu: bool = True, memory: bool = False):
+        self.profile_dir = Path(profile_dir)
+        self.cpu = cpu
+        self.memory = memory
+        self.metrics: Optional[Metrics] = None
+        self._stage = contextvars.ContextVar(f"profile_stage_{id(self)}", default=UNTIMED)
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._active: Optional[str] = None
+        self._thread_id: Optional[int] = None
+        self._previous_factory = None
+        self._lag = Histogram(LAG_BUCKETS)
+        self._slow_lags = 0
+        self._lag_task: Optional[asyncio.Task] = None
+        self._snapshots: List[tuple] = []
+        self._started_at = 0.0
+        self._elapsed = 0.0
+
+    def _activate(self, bucket: str) -> None:
+        """Switch cProfile collection to a bucket's profile"""
+        if bucket == self._active:
+            return
+        if self._active is not None:
+            self._profiles[self._active].disable()
+        profile = self._profiles.get(bucket)
+        if profile is None:
+            profile = self._profiles[bucket] = cProfile.Profile()
+        profile.enable()
+        self._active = bucket
+
+    def _stop_profiling(self) -> None:
+        if self._active is not None:
+            self._profiles[self._active].disable()
+            self._active = None
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Attribute the enclosed block to a stage (a Metrics.stage_hook)"""
+        # Other threads share the interpreter's profiler, so only the loop thread switches
+        if not self.cpu or threading.get_ident() != self._thread_id:
+            yield
+            return
+        token = self._stage.set(name)
+        self._activate(name)
+        try:
+            yield
+        finally:
+            self._stage.reset(token)
+            self._activate(self._stage.get())
+
+    def attach(self, metrics: Metrics) -> None:
+        """Take stage boundaries (and wall times for the report) from a run's metrics"""
+        self.metrics = metrics
+        if self.cpu:
+            metrics.stage_hook = self.stage
+
+    def _task_factory(self, loop, coro, **kwargs):
+        return asyncio.Task(_StageCoroutine(coro, self), loop=loop, **kwargs)
+
+    async def track(self, coro):
+        """Run a coroutine as a task whose steps are attributed to stages"""
+        return await asyncio.get_running_loop().create_task(coro)
+
+    async def _watch_loop(self) -> None:
+        """Measure how late the loop wakes a sleeping task"""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LAG_INTERVAL)
+            lag = max(0.0, loop.time() - start - LAG_INTERVAL)
+            self._lag.observe(lag)
+            if lag >= SLOW_LAG:
+                self._slow_lags += 1
+
+    def checkpoint(self, name: str) -> None:
+        """Snapshot traced memory allocations"""
+        if not self.memory:
+            return
+        # Keep the snapshot itself out of the CPU profile
+        active = self._active
+        self._stop_profiling()
+        current, peak = tracemalloc.get_traced_memory()
+        self._snapshots.append((name, current, peak, tracemalloc.take_snapshot()))
+        if active is not None:
+            self._activate(active)
+
+    async def __aenter__(self):
+        self._started_at = time.perf_counter()
+        if self.memory:
+            tracemalloc.start()
+            self.checkpoint("start")
+        if self.cpu:
+            loop = asyncio.get_running_loop()
+            self._thread_id = threading.get_ident()
+            # Started before the task factory is installed, so probes count as loop overhead
+            self._lag_task = loop.create_task(self._watch_loop())
+            self._previous_factory = loop.get_task_factory()
+            loop.set_task_factory(self._task_factory)
+            self._activate(self._stage.get())
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._elapsed = time.perf_counter() - self._started_at
+        if self.cpu:
+            self._stop_profiling()
+            asyncio.get_running_loop().set_task_factory(self._previous_factory)
+            self._lag_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._lag_task
+        if self.memory:
+            if not self._snapshots or self._snapshots[-1][0] != "end":
+                self.checkpoint("end")
+            tracemalloc.stop()
+        if self.metrics and self.metrics.stage_hook == self.stage:
+            self.metrics.stage_hook = None
+        self.write_reports()
+
+    def _stage_order(self, wall: Dict[str, Any]) -> List[str]:
+        seen = set(self._profiles) | set(wall)
+        names = [stage for stage in STAGES if stage in seen]
+        names += sorted(name for name in seen if name not in STAGES and name not in (UNTIMED, EVENT_LOOP))
+        return names + [name for name in (UNTIMED, EVENT_LOOP) if name in seen]
+
+    def summary(self) -> Dict[str, Any]:
+        """Summarize the profile for summary.json"""
+        summary: Dict[str, Any] = {"elapsed_s": round(self._elapsed, 4)}
+        if self.cpu:
+            wall = self.metrics.summary()["stages"] if self.metrics else {}
+            # Stages timed from aiohttp callbacks (connect, ttfb) run no code of their own
+            summary["stages"] = {
+                name: {
+                    "wall_s": wall.get(name, {}).get("total_seconds"),
+                    "cpu_s": round(pstats.Stats(self._profiles[name]).total_tt, 4) if name in self._profiles else None,
+                }
+                for name in self._stage_order(wall)
+            }
+            summary["loop_lag"] = {
+                "interval_ms": LAG_INTERVAL * 1000,
+                "samples": self._lag.count,
+                "mean_ms": round(self._lag.sum / self._lag.count * 1000, 2) if self._lag.count else 0.0,
+                "p50_ms": round(self._lag.quantile(0.5) * 1000, 2),
+                "p99_ms": round(self._lag.quantile(0.99) * 1000, 2),
+                "max_ms": round(self._lag.max * 1000, 2),
+                f"over_{int(SLOW_LAG * 1000)}ms": self._slow_lags,
+            }
+        if self.memory:
+            summary["memory"] = [
+                {"checkpoint": name, "current_mb": round(current / 2**20, 2), "peak_mb": round(peak / 2**20, 2)}
+                for name, current, peak, _ in self._snapshots
+            ]
+        return summary
+
+    def _cpu_report(self, summary: Dict[str, Any]) -> str:
+        out = io.StringIO()
+        out.write("CPU time per stage (wall time from the run's metrics; CPU profiled on the event-loop thread)\n\n")
+        out.write(f"{'Stage':<14} {'Wall s':>10} {'CPU s':>10}\n")
+        for name, stats in summary["stages"].items():
+            wall = f"{stats['wall_s']:.3f}" if stats["wall_s"] is not None else "-"
+            cpu = f"{stats['cpu_s']:.3f}" if stats["cpu_s"] is not None else "-"
+            out.write(f"{name:<14} {wall:>10} {cpu:>10}\n")
+
+        lag = summary["loop_lag"]
+        out.write(
+            f"\nEvent-loop lag ({lag['samples']} probes every {lag['interval_ms']:.0f} ms): "
+            f"mean {lag['mean_ms']} ms, p50 {lag['p50_ms']} ms, p99 {lag['p99_ms']} ms, "
+            f"max {lag['max_ms']} ms, {self._slow_lags} over {SLOW_LAG * 1000:.0f} ms\n"
+        )
+
+        out.write("\n\nTop functions by cumulative time, all stages\n")
+        stats = pstats.Stats(*self._profiles.values(), stream=out)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+
+        for name in self._stage_order({}):
+            out.write(f"\n\nTop functions by own time in {name}\n")
+            pstats.Stats(self._profiles[name], stream=out).sort_stats(pstats.SortKey.TIME).print_stats(TOP_STAGE_FUNCTIONS)
+        return out.getvalue()
+
+    def _memory_report(self) -> str:
+        out = io.StringIO()
+        previous = None
+        for name, current, peak, snapshot in self._snapshots:
+            out.write(f"== {name}: {current / 2**20:.1f} MiB traced, peak {peak / 2**20:.1f} MiB ==\n\n")
+            out.write(f"Top {TOP_ALLOCATIONS} allocators:\n")
+            for stat in _top_allocators(snapshot.statistics("lineno")):
+                out.write(f"  {stat}\n")
+            if previous:
+                out.write(f"\nTop {TOP_ALLOCATIONS} changes since {previous[0]}:\n")
+                for stat in _top_allocators(snapshot.compare_to(previous[1], "lineno")):
+                    out.write(f"  {stat}\n")
+            out.write("\n")
+            previous = (name, snapshot)
+        return out.getvalue()
+
+    def write_reports(self) -> Path:
+        """Write the reports to the profile directory.
+
+        Files:
+            summary.json: stage CPU/wall times, loop lag and memory checkpoints
+            cpu.txt: stage breakdown, loop lag and the top functions overall and per stage
+            cpu.pstats, cpu-<stage>.pstats: raw profiles for pstats or snakeviz
+            memory.txt: top allocators at each checkpoint and growth between them
+        """
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        summary = self.summary()
+        (self.profile_dir / "summary.json").write_text(json.dumps(summary, indent=2), encoding="utf-8")
+        if self.cpu and self._profiles:
+            (self.profile_dir / "cpu.txt").write_text(self._cpu_report(summary), encoding="utf-8")
+            pstats.Stats(*self._profiles.values()).dump_stats(self.profile_dir / "cpu.pstats")
+            for name, profile in self._profiles.items():
+                pstats.Stats(profile).dump_stats(self.profile_dir / f"cpu-{name}.pstats")
+        if self.memory:
+            (self.profile_dir / "memory.txt").write_text(self._memory_report(), encoding="utf-8")
+        return self.profile_dir
+
+def _top_allocators(stats: list) -> list:
+    return [
+        stat for stat in stats
+        if stat.traceback[0].filename not in _IGNORED_ALLOCATORS
+    ][:TOP_ALLOCATIONS]
@@ -0,0 +1,142 @@
+"""
+Line-based scanning of raw markdown and source files, without an HTML parser
+"""
+
+import re
+from typing import Iterable, Iterator, List, Tuple
+
+from .types import Heading
+
+# ATX heading: up to three spaces of indent, 1-6 '#', then text and optional closing '#'s
+_ATX_HEADING_RE = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$")
+
+# Opening fence: up to three spaces of indent and at least three backticks or tildes
+_FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+
+_BACKTICK_RUN_RE = re.compile(r"`{3,}")
+
+def heading_id(text: str) -> str:
+    """Generate the anchor ID used for a heading"""
+    return text.lower().replace(" ", "-")
+
+def _scan_lines(lines: Iterable[str]) -> Iterator[Tuple[int, str, int, str, str]]:
+    """Yield (line number, kind, level, text, line) for each line of a markdown document.
+
+    kind is "fence" for the line opening fenced code (text is its info
+    string), "code" for the lines inside it, "end" for the closing fence,
+    "heading" for an ATX heading (with its level and text) and "text" for
+    any other line. A fence left open runs to the end of the document.
+    """
+    fence = ""
+    for number, line in enumerate(lines):
+        if fence:
+            stripped = line.strip()
+            if stripped.startswith(fence) and stripped.strip(fence[0]) == "":
+                fence = ""
+                yield number, "end", 0, "", line
+            else:
+                yield number, "code", 0, "", line
+            continue
+        match = _FENCE_RE.match(line)
+        # Backtick fences can't have backticks in their info string
+        if match and (match.group(1)[0] == "~" or "`" not in line[match.end():]):
+            fence = match.group(1)
+            yield number, "fence", 0, line[match.end():].strip(), line
+            continue
+        match = _ATX_HEADING_RE.match(line)
+        if match:
+            yield number, "heading", len(match.group(1)), (match.group(2) or "").strip(), line
+        else:
+            yield number, "text", 0, "", line
+
+def _outside_code(lines: Iterable[str]) -> Iterator[Tuple[int, int, str, str]]:
+    """Yield (line number, level, heading, line) for each line outside fenced code.
+
+    level is 0 and heading empty for lines that are not headings.
+    """
+    for number, kind, level, heading, line in _scan_lines(lines):
+        if kind in ("heading", "text"):
+            yield number, level, heading, line
+
+def _scan(text: str) -> Iterator[Tuple[int, str, str]]:
+    """Yield (level, heading, line) for each line outside fenced code"""
+    for _, level, heading, line in _outside_code(text.splitlines()):
+        yield level, heading, line
+
+def markdown_headings(text: str) -> List[Heading]:
+    """Find the ATX headings of a markdown document, ignoring fenced code"""
+    return [
+        Heading(level=level, text=heading, id=heading_id(heading))
+        for level, heading, _ in _scan(text)
+        if level and heading
+    ]
+
+def heading_offsets(text: str) -> List[Tuple[int, str, int]]:
+    """Find the ATX headings of a markdown document as (level, heading, offset).
+
+    offset is the position of the heading line in the UTF-8 encoded text.
+    """
+    lines = text.split("\n")
+    starts = []
+    offset = 0
+    for line in lines:
+        starts.append(offset)
+        offset += len(line.encode("utf-8", "surrogatepass")) + 1
+    return [
+        (level, heading, starts[number])
+        for number, level, heading, _ in _outside_code(lines)
+        if level and heading
+    ]
+
+def markdown_sections(text: str) -> List[Tuple[str, str, str]]:
+    """Split a markdown document into (heading, anchor, text) sections.
+
+    Fenced code is left out of the section text.
+    """
+    sections = []
+    heading, body = "", []
+    for level, line_heading, line in _scan(text):
+        if level:
+            if heading or any(body):
+                sections.append((heading, heading_id(heading), "\n".join(body).strip()))
+            heading, body = line_heading, []
+        elif line.strip():
+            body.append(line.strip())
+    if heading or any(body):
+        sections.append((heading, heading_id(heading), "\n".join(body).strip()))
+    return sections
+
+def markdown_blocks(text: str) -> Iterator[Tuple[str, int, str, str]]:
+    """Yield (kind, level, text, info) for the blocks of a markdown document.
+
+    kind is "heading" (with its level), "prose" for a run of non-blank lines,
+    or "code" for fenced code, with the fence's info string in info.
+    """
+    in_code, info = False, ""
+    lines: List[str] = []
+    for _, kind, level, value, line in _scan_lines(text.splitlines()):
+        if kind == "fence":
+            if lines:
+                yield "prose", 0, "\n".join(lines), ""
+            in_code, info, lines = True, value, []
+        elif kind == "code":
+            lines.append(line)
+        elif kind == "end":
+            yield "code", 0, "\n".join(lines), info
+            in_code, lines = False, []
+        elif kind == "heading" or not line.strip():
+            if lines:
+                yield "prose", 0, "\n".join(lines), ""
+                lines = []
+            if kind == "heading":
+                yield "heading", level, value, ""
+        else:
+            lines.append(line.strip())
+    if lines:
+        # An unclosed fence runs to the end of the document
+        yield ("code" if in_code else "prose"), 0, "\n".join(lines), info if in_code else ""
+
+def code_fence(code: str) -> str:
+    """Pick a backtick fence longer than any backtick run inside the code"""
+    longest = max((len(run) for run in _BACKTICK_RUN_RE.findall(code)), default=2)
+    return "`" * (longest + 1)
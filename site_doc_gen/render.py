@@ -0,0 +1,147 @@
+"""
+Server-side HTML rendering of generated markdown with an on-disk cache
+"""
+
+import hashlib
+import html
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bump when the rendered output changes so stale cache entries are ignored
+RENDERER_VERSION = "2"
+
+# Markdown files larger than this are served raw instead of rendered
+MAX_RENDER_BYTES = 20 * 1024 * 1024
+
+CACHE_DIR_NAME = ".html"
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: system-ui, -apple-system, sans-serif; max-width: 900px; margin: 0 auto; padding: 2rem; line-height: 1.6; }}
+a {{ color: #0066cc; text-decoration: none; }}
+a:hover {{ text-decoration: underline; }}
+pre {{ padding: 1rem; overflow-x: auto; border-radius: 0.375rem; }}
+table {{ border-collapse: collapse; }}
+th, td {{ border: 1px solid #e2e8f0; padding: 0.25rem 0.5rem; }}
+{pygments_css}
+</style>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+class HTMLRenderer:
+    """Render a site's markdown files to HTML, caching results on disk.
+
+    Cache entries live in ``<site_dir>/.html`` and are named by a hash of the
+    source content, so an unchanged file is never rendered twice. Lookups are
+    keyed by path and mtime first, which lets repeat views skip reading and
+    hashing the source entirely.
+    """
+
+    def __init__(self, site_dir: Path, style: str = "default"):
+        self.site_dir = Path(site_dir)
+        self.cache_dir = self.site_dir / CACHE_DIR_NAME
+        self.style = style
+        self._lock = threading.Lock()
+        self._by_mtime: Dict[Tuple[str, int, int], Path] = {}
+        self._pygments_css: Optional[str] = None
+
+    def _stylesheet(self) -> str:
+        if self._pygments_css is None:
+            from pygments.formatters import HtmlFormatter
+            self._pygments_css = HtmlFormatter(style=self.style).get_style_defs(".codehilite")
+        return self._pygments_css
+
+    def to_html(self, text: str, title: str) -> str:
+        """Convert markdown text to a standalone HTML page"""
+        import markdown
+
+        from .safe_markdown import EscapeHtmlExtension
+
+        # Sources are crawled pages, so raw HTML in them is escaped rather than rendered
+        body = markdown.markdown(
+            text,
+            extensions=["fenced_code", "codehilite", "tables", "toc", EscapeHtmlExtension()],
+            extension_configs={"codehilite": {"guess_lang": False, "css_class": "codehilite"}},
+            output_format="html"
+        )
+        return PAGE_TEMPLATE.format(
+            title=html.escape(title),
+            pygments_css=self._stylesheet(),
+            body=body
+        )
+
+    def render(self, source: Path) -> Optional[Path]:
+        """Get the rendered HTML for a markdown file, rendering it if needed.
+
+        Returns:
+            Path of the cached HTML file, or None if the source is too large
+            or missing
+        """
+        source = Path(source)
+        try:
+            stat = source.stat()
+        except OSError:
+            return None
+        if stat.st_size > MAX_RENDER_BYTES:
+            return None
+
+        key = (str(source), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._by_mtime.get(key)
+        if cached and cached.exists():
+            return cached
+
+        data = source.read_bytes()
+        digest = hashlib.sha256()
+        digest.update(f"{RENDERER_VERSION}:{self.style}:".encode())
+        digest.update(data)
+        target = self.cache_dir / f"{digest.hexdigest()}.html"
+
+        if not target.exists():
+            self.cache_dir.mkdir(exist_ok=True)
+            rendered = self.to_html(data.decode("utf-8", "replace"), source.stem)
+            tmp_file = target.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_file.write_text(rendered, encoding="utf-8")
+            os.replace(tmp_file, target)
+
+        with self._lock:
+            self._by_mtime[key] = target
+        return target
+
+    def render_site(self) -> int:
+        """Pre-render every markdown file of the site.
+
+        Returns:
+            Number of files rendered or found in the cache
+        """
+        rendered = set()
+        for source in sorted(self.site_dir.rglob("*.md")):
+            if CACHE_DIR_NAME in source.relative_to(self.site_dir).parts:
+                continue
+            try:
+                target = self.render(source)
+            except Exception as e:
+                logger.error(f"Error rendering {source}: {str(e)}")
+                continue
+            if target:
+                rendered.add(target)
+        
+        # Drop cache entries for sources that changed or no longer exist
+        if self.cache_dir.exists():
+            for entry in self.cache_dir.glob("*.html"):
+                if entry not in rendered:
+                    entry.unlink()
+        return len(rendered)
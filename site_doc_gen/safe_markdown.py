@@ -0,0 +1,58 @@
+"""
+Markdown extension for rendering crawled content without live HTML
+"""
+
+import re
+import xml.etree.ElementTree as etree
+
+from markdown.extensions import Extension
+from markdown.inlinepatterns import InlineProcessor
+from markdown.treeprocessors import Treeprocessor
+
+# Link and image URLs with any other scheme (javascript:, data:, ...) are dropped
+SAFE_URL_SCHEMES = {"http", "https", "mailto", "ftp"}
+
+URL_ATTRIBUTES = ("href", "src")
+
+# The empty anchor MarkdownConverter places before a shared snippet, the only raw HTML kept
+ANCHOR_RE = r'<a id="([A-Za-z0-9_-]+)"></a>'
+
+# Browsers ignore whitespace and control characters inside a URL scheme
+_URL_NOISE_RE = re.compile(r"[\x00-\x20\x7f]+")
+_SCHEME_RE = re.compile(r"^([a-z][a-z0-9+.-]*):")
+
+def is_safe_url(url: str) -> bool:
+    """Check whether a URL is relative or uses a scheme that can't run script"""
+    match = _SCHEME_RE.match(_URL_NOISE_RE.sub("", url).lower())
+    return match is None or match.group(1) in SAFE_URL_SCHEMES
+
+class AnchorInlineProcessor(InlineProcessor):
+    """Keep the empty snippet anchors, rebuilt as elements rather than passed through"""
+
+    def handleMatch(self, m, data):
+        element = etree.Element("a")
+        element.set("id", m.group(1))
+        return element, m.start(0), m.end(0)
+
+class SafeUrlTreeprocessor(Treeprocessor):
+    """Remove link and image URLs with unsafe schemes"""
+
+    def run(self, root):
+        for element in root.iter():
+            for attribute in URL_ATTRIBUTES:
+                value = element.get(attribute)
+                if value is not None and not is_safe_url(value):
+                    del element.attrib[attribute]
+
+class EscapeHtmlExtension(Extension):
+    """Render raw HTML in the source as text.
+
+    Block and inline HTML are no longer passed through, so tags such as
+    <script> or <img onerror=...> in a crawled page show up escaped.
+    """
+
+    def extendMarkdown(self, md):
+        md.preprocessors.deregister("html_block")
+        md.inlinePatterns.deregister("html")
+        md.inlinePatterns.register(AnchorInlineProcessor(ANCHOR_RE, md), "snippet_anchor", 90)
+        md.treeprocessors.register(SafeUrlTreeprocessor(md), "safe_urls", 0)
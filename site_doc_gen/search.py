@@ -0,0 +1,246 @@
+"""
+Full-text search index over generated documentation
+"""
+
+import hashlib
+import html
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .rawtext import markdown_sections
+from .types import Page
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    site TEXT NOT NULL,
+    url TEXT NOT NULL,
+    path TEXT NOT NULL,
+    title TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    UNIQUE (site, url)
+);
+CREATE TABLE IF NOT EXISTS sections (
+    id INTEGER PRIMARY KEY,
+    page_id INTEGER NOT NULL REFERENCES pages(id) ON DELETE CASCADE,
+    title TEXT NOT NULL,
+    heading TEXT NOT NULL,
+    anchor TEXT NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sections_page ON sections(page_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS sections_fts USING fts5(
+    title, heading, body,
+    content='sections', content_rowid='id',
+    tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS sections_ai AFTER INSERT ON sections BEGIN
+    INSERT INTO sections_fts(rowid, title, heading, body)
+    VALUES (new.id, new.title, new.heading, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS sections_ad AFTER DELETE ON sections BEGIN
+    INSERT INTO sections_fts(sections_fts, rowid, title, heading, body)
+    VALUES ('delete', old.id, old.title, old.heading, old.body);
+END;
+"""
+
+# BM25 column weights for title, heading and body
+RANK_WEIGHTS = (5.0, 3.0, 1.0)
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+# Control characters used to delimit matches in raw snippets before escaping
+_MARK_START, _MARK_END = "\x02", "\x03"
+
+def page_hash(page: Page) -> str:
+    """Hash the parts of a page that end up in the index"""
+    digest = hashlib.sha256()
+    parts = [page.title or "", page.content]
+    if page.content_format == "text":
+        parts.extend(snippet.code for snippet in page.code_snippets)
+    for part in parts:
+        digest.update(part.encode("utf-8", "surrogatepass"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def page_sections(page: Page) -> List[Tuple[str, str, str]]:
+    """Split a page into (heading, anchor, text) sections at each heading"""
+    if page.content_format == "markdown":
+        return markdown_sections(page.content)
+    if page.content_format == "text":
+        return [("", "", "\n".join(snippet.code for snippet in page.code_snippets))]
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(page.content, "html.parser")
+    sections = []
+    heading, anchor, body = "", "", []
+    for element in soup.find_all(["h1", "h2", "h3", "h4", "h5", "h6", "p", "pre", "li"]):
+        text = element.get_text(" ", strip=True)
+        if element.name.startswith("h"):
+            if heading or body:
+                sections.append((heading, anchor, "\n".join(body)))
+            heading, anchor, body = text, text.lower().replace(" ", "-"), []
+        elif text and element.find_parent(["li", "pre"]) is None:
+            body.append(text)
+    if heading or body:
+        sections.append((heading, anchor, "\n".join(body)))
+    return sections
+
+def build_match_query(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 query, prefix-matching the last term"""
+    terms = _TERM_RE.findall(query)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+def _highlight(snippet: str) -> str:
+    """Escape a raw snippet as HTML, wrapping matched terms in <mark>"""
+    return (
+        html.escape(snippet)
+        .replace(_MARK_START, "<mark>")
+        .replace(_MARK_END, "</mark>")
+    )
+
+class SearchIndex:
+    """SQLite FTS5 index of documentation sections, shared by all sites in an output directory"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the underlying database connection"""
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def update_site(self, site: str, entries: Iterable[Tuple[Page, str]]) -> Dict[str, int]:
+        """Re-index a site from (page, output path) pairs.
+
+        Pages whose content hash is unchanged are left alone; pages no longer
+        present in the site are removed.
+
+        Returns:
+            Counts of added, updated, unchanged and removed pages
+        """
+        stats = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0}
+        with self._lock, self._conn:
+            existing = {
+                url: (page_id, digest, path)
+                for page_id, url, digest, path in self._conn.execute(
+                    "SELECT id, url, hash, path FROM pages WHERE site = ?", (site,)
+                )
+            }
+            seen = set()
+            for page, path in entries:
+                if page.url in seen:
+                    continue
+                seen.add(page.url)
+                digest = page_hash(page)
+                current = existing.get(page.url)
+                if current and current[1] == digest:
+                    if current[2] != path:
+                        self._conn.execute(
+                            "UPDATE pages SET path = ? WHERE id = ?", (path, current[0])
+                        )
+                    stats["unchanged"] += 1
+                    continue
+
+                title = page.title or page.url
+                if current:
+                    page_id = current[0]
+                    self._conn.execute("DELETE FROM sections WHERE page_id = ?", (page_id,))
+                    self._conn.execute(
+                        "UPDATE pages SET path = ?, title = ?, hash = ? WHERE id = ?",
+                        (path, title, digest, page_id)
+                    )
+                    stats["updated"] += 1
+                else:
+                    page_id = self._conn.execute(
+                        "INSERT INTO pages (site, url, path, title, hash) VALUES (?, ?, ?, ?, ?)",
+                        (site, page.url, path, title, digest)
+                    ).lastrowid
+                    stats["added"] += 1
+
+                self._conn.executemany(
+                    "INSERT INTO sections (page_id, title, heading, anchor, body) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (page_id, title, heading, anchor, body)
+                        for heading, anchor, body in page_sections(page)
+                    ]
+                )
+
+            for url, (page_id, _, _) in existing.items():
+                if url not in seen:
+                    self._conn.execute("DELETE FROM sections WHERE page_id = ?", (page_id,))
+                    self._conn.execute("DELETE FROM pages WHERE id = ?", (page_id,))
+                    stats["removed"] += 1
+        return stats
+
+    def remove_site(self, site: str) -> None:
+        """Drop every page of a site from the index"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM sections WHERE page_id IN (SELECT id FROM pages WHERE site = ?)",
+                (site,)
+            )
+            self._conn.execute("DELETE FROM pages WHERE site = ?", (site,))
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        offset: int = 0,
+        site: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Return sections ranked by BM25, best match first"""
+        match = build_match_query(query)
+        if not match:
+            return []
+
+        sql = [
+            "SELECT pages.site, pages.url, pages.path, sections.title, sections.heading,",
+            "       sections.anchor,",
+            "       snippet(sections_fts, 2, ?, ?, '…', 16),",
+            "       bm25(sections_fts, ?, ?, ?) AS rank",
+            "FROM sections_fts",
+            "JOIN sections ON sections.id = sections_fts.rowid",
+            "JOIN pages ON pages.id = sections.page_id",
+            "WHERE sections_fts MATCH ?",
+        ]
+        params: List[Any] = [_MARK_START, _MARK_END, *RANK_WEIGHTS, match]
+        if site:
+            sql.append("AND pages.site = ?")
+            params.append(site)
+        sql.append("ORDER BY rank LIMIT ? OFFSET ?")
+        params.extend([limit, offset])
+
+        with self._lock:
+            rows = self._conn.execute("\n".join(sql), params).fetchall()
+
+        return [
+            {
+                "site": row[0],
+                "url": row[1],
+                "path": row[2],
+                "title": row[3],
+                "heading": row[4],
+                "anchor": row[5],
+                "snippet": _highlight(row[6]),
+                "score": round(-row[7], 4),
+            }
+            for row in rows
+        ]
@@ -0,0 +1,141 @@
+"""
+Byte-offset index of the pages and headings of a single-file documentation.md
+"""
+
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .rawtext import heading_id, heading_offsets
+
+# Sidecar written next to documentation.md
+SECTIONS_FILE = "documentation.sections.json"
+
+class SectionOffsets:
+    """Tracks where pages and headings land while a document is built line by line.
+
+    Every list of lines appended to the document must be passed to add(),
+    add_page() or add_body() in the same order, with the document being
+    the lines joined by newlines. Lines may themselves contain newlines.
+    """
+
+    def __init__(self):
+        self.position = 0
+        self.sections: List[Dict[str, Any]] = []
+        self._page: Optional[int] = None
+        self._body_ends: Dict[int, int] = {}  # Page section to the end of its body
+
+    def add(self, lines: List[str]) -> None:
+        """Account for lines that hold no indexed headings"""
+        for line in lines:
+            self.position += len(line.encode("utf-8")) + 1
+
+    def add_page(self, title: str, url: str, header: List[str]) -> None:
+        """Start a page section at its header lines"""
+        self._page = len(self.sections)
+        self.sections.append({
+            "kind": "page",
+            "level": 3,
+            "title": title,
+            "anchor": heading_id(title),
+            "url": url,
+            "start": self.position,
+        })
+        self.add(header)
+
+    def add_body(self, lines: List[str]) -> None:
+        """Account for a page's body lines, recording the headings in them"""
+        if not lines:
+            return
+        text = "\n".join(lines)
+        for level, heading, offset in heading_offsets(text):
+            self.sections.append({
+                "kind": "heading",
+                "level": level,
+                "title": heading,
+                "anchor": heading_id(heading),
+                "page": self._page,
+                "start": self.position + offset,
+            })
+        self.position += len(text.encode("utf-8")) + 1
+        self._body_ends[self._page] = self.position
+
+    def to_json(self, size: int, sha256: str, file: str = "documentation.md") -> Dict[str, Any]:
+        """The index as a JSON document, with the end offset of every section.
+
+        A page ends where the next page starts; a heading ends at the next
+        heading of the same or a higher level on its page, or with the page
+        body (before the separator that follows it).
+        """
+        ends: List[int] = [size] * len(self.sections)
+        open_headings: List[int] = []
+        last_page: Optional[int] = None
+
+        def close_page(end: int) -> None:
+            if last_page is None:
+                return
+            ends[last_page] = end
+            for j in open_headings:
+                ends[j] = min(self._body_ends.get(last_page, end), end)
+            open_headings.clear()
+
+        for i, section in enumerate(self.sections):
+            if section["kind"] == "page":
+                close_page(section["start"])
+                last_page = i
+                continue
+            while open_headings and self.sections[open_headings[-1]]["level"] >= section["level"]:
+                ends[open_headings.pop()] = section["start"]
+            open_headings.append(i)
+        close_page(size)
+        return {
+            "file": file,
+            "size": size,
+            "sha256": sha256,
+            "pages": sum(1 for section in self.sections if section["kind"] == "page"),
+            "sections": [{**section, "end": end} for section, end in zip(self.sections, ends)],
+        }
+
+class SectionIndex:
+    """A loaded section index, reading single sections of its document on demand"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        self.document = self.path.with_name(data["file"])
+        self.size: int = data["size"]
+        self.sha256: str = data["sha256"]
+        self.sections: List[Dict[str, Any]] = data["sections"]
+        self.pages = [i for i, section in enumerate(self.sections) if section["kind"] == "page"]
+        self._anchors: Dict[str, int] = {}
+        for i, section in enumerate(self.sections):
+            self._anchors.setdefault(section["anchor"], i)
+
+    @property
+    def current(self) -> bool:
+        """Whether the document is still the one the index was built for"""
+        try:
+            return os.path.getsize(self.document) == self.size
+        except OSError:
+            return False
+
+    def window(self, offset: int = 0, limit: int = 100, pages_only: bool = False) -> List[Dict[str, Any]]:
+        """A slice of the table of contents, each entry with its section id"""
+        ids = self.pages if pages_only else range(len(self.sections))
+        return [{"id": i, **self.sections[i]} for i in ids[offset:offset + limit]]
+
+    def total(self, pages_only: bool = False) -> int:
+        return len(self.pages) if pages_only else len(self.sections)
+
+    def find(self, anchor: str) -> Optional[int]:
+        """The id of the first section with an anchor"""
+        return self._anchors.get(anchor)
+
+    def read(self, section_id: int) -> bytes:
+        """Read one section from the document without loading the rest of it"""
+        section = self.sections[section_id]
+        with open(self.document, "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                return view[section["start"]:section["end"]]
@@ -0,0 +1,234 @@
+"""
+Site-wide index of code snippets, with identical snippets merged
+"""
+
+import dataclasses
+import hashlib
+import sqlite3
+import textwrap
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .types import CodeSnippet, Page
+
+# Snippets shorter than this (normalized) are repeated rather than replaced by a reference
+MIN_SHARED_CHARS = 40
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snippets (
+    id INTEGER PRIMARY KEY,
+    site TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    language TEXT NOT NULL,
+    code TEXT NOT NULL,
+    lines INTEGER NOT NULL,
+    occurrences INTEGER NOT NULL,
+    UNIQUE (site, hash)
+);
+CREATE INDEX IF NOT EXISTS snippets_language ON snippets(language);
+CREATE TABLE IF NOT EXISTS snippet_pages (
+    snippet_id INTEGER NOT NULL REFERENCES snippets(id) ON DELETE CASCADE,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snippet_pages_snippet ON snippet_pages(snippet_id);
+CREATE INDEX IF NOT EXISTS snippet_pages_url ON snippet_pages(url);
+"""
+
+def normalize_code(code: str) -> str:
+    """Normalize a snippet so copies differing only in whitespace compare equal.
+
+    Line endings become LF, trailing whitespace and surrounding blank lines
+    are dropped and common indentation is removed.
+    """
+    lines = [line.rstrip() for line in code.replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+    return textwrap.dedent("\n".join(lines)).strip("\n")
+
+def _digest(normalized: str) -> str:
+    return hashlib.sha256(normalized.encode("utf-8", "surrogatepass")).hexdigest()[:16]
+
+def snippet_hash(code: str) -> str:
+    """Hash of a snippet's normalized code"""
+    return _digest(normalize_code(code))
+
+@dataclasses.dataclass
+class SnippetEntry:
+    """One distinct snippet and where it appears"""
+    hash: str
+    language: str
+    code: str  # Normalized code of the first occurrence
+    occurrences: int = 0
+    pages: List[str] = dataclasses.field(default_factory=list)  # URLs, in first-appearance order
+    titles: Dict[str, str] = dataclasses.field(default_factory=dict)  # URL to page title
+
+    @property
+    def anchor(self) -> str:
+        return f"snippet-{self.hash}"
+
+    @property
+    def shared(self) -> bool:
+        """Whether copies elsewhere are rendered as references to the first"""
+        return self.occurrences > 1 and len(self.code) >= MIN_SHARED_CHARS
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "hash": self.hash,
+            "language": self.language,
+            "lines": self.code.count("\n") + 1,
+            "occurrences": self.occurrences,
+            "pages": self.pages,
+            "code": self.code,
+        }
+
+class SnippetIndex:
+    """Distinct snippets of a site keyed by the hash of their normalized code.
+
+    A snippet's language is the first specific one seen: a copy labelled
+    "text" is upgraded when another copy names a language.
+    """
+
+    def __init__(self):
+        self.entries: Dict[str, SnippetEntry] = {}
+        self._hashes: Dict[int, str] = {}  # id(snippet) to hash, for lookups while rendering
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[Page]) -> "SnippetIndex":
+        index = cls()
+        for page in pages:
+            for snippet in page.code_snippets:
+                index.add(page, snippet)
+        return index
+
+    def add(self, page: Page, snippet: CodeSnippet) -> SnippetEntry:
+        code = normalize_code(snippet.code)
+        digest = _digest(code)
+        self._hashes[id(snippet)] = digest
+        entry = self.entries.get(digest)
+        if entry is None:
+            entry = self.entries[digest] = SnippetEntry(hash=digest, language=snippet.language, code=code)
+        elif entry.language == "text" and snippet.language != "text":
+            entry.language = snippet.language
+        entry.occurrences += 1
+        if page.url not in entry.titles:
+            entry.pages.append(page.url)
+            entry.titles[page.url] = page.title or page.url
+        return entry
+
+    def entry_for(self, snippet: CodeSnippet) -> Optional[SnippetEntry]:
+        """The entry an indexed snippet was merged into"""
+        digest = self._hashes.get(id(snippet))
+        return self.entries.get(digest) if digest else None
+
+    def by_language(self, language: str) -> List[SnippetEntry]:
+        return [entry for entry in self.entries.values() if entry.language == language]
+
+    @property
+    def total(self) -> int:
+        return sum(entry.occurrences for entry in self.entries.values())
+
+    def to_json(self, base_url: str) -> Dict[str, Any]:
+        """The index as a JSON document, most repeated snippets first"""
+        entries = sorted(self.entries.values(), key=lambda entry: -entry.occurrences)
+        return {
+            "base_url": base_url,
+            "total_snippets": self.total,
+            "unique_snippets": len(self.entries),
+            "shared_snippets": sum(1 for entry in entries if entry.occurrences > 1),
+            "languages": sorted({entry.language for entry in entries}),
+            "snippets": [entry.to_json() for entry in entries],
+        }
+
+class SnippetStore:
+    """SQLite index of the snippets of every site in an output directory"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the underlying database connection"""
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def replace_site(self, site: str, index: SnippetIndex) -> None:
+        """Replace a site's snippets with those of an index"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM snippets WHERE site = ?", (site,))
+            for entry in index.entries.values():
+                snippet_id = self._conn.execute(
+                    "INSERT INTO snippets (site, hash, language, code, lines, occurrences) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (site, entry.hash, entry.language, entry.code, entry.code.count("\n") + 1, entry.occurrences)
+                ).lastrowid
+                self._conn.executemany(
+                    "INSERT INTO snippet_pages (snippet_id, url, title, position) VALUES (?, ?, ?, ?)",
+                    [(snippet_id, url, entry.titles[url], i) for i, url in enumerate(entry.pages)]
+                )
+
+    def remove_site(self, site: str) -> None:
+        """Drop every snippet of a site"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM snippets WHERE site = ?", (site,))
+
+    def find(
+        self,
+        language: Optional[str] = None,
+        contains: Optional[str] = None,
+        site: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """Find snippets by language and/or text they contain (e.g. an API name).
+
+        Returns:
+            Matching snippets with the pages they appear on, most repeated first
+        """
+        sql = ["SELECT id, site, hash, language, code, lines, occurrences FROM snippets WHERE 1 = 1"]
+        params: List[Any] = []
+        if language:
+            sql.append("AND language = ?")
+            params.append(language)
+        if contains:
+            sql.append("AND instr(code, ?) > 0")
+            params.append(contains)
+        if site:
+            sql.append("AND site = ?")
+            params.append(site)
+        sql.append("ORDER BY occurrences DESC, id LIMIT ? OFFSET ?")
+        params.extend([limit, offset])
+
+        with self._lock:
+            rows = self._conn.execute(" ".join(sql), params).fetchall()
+            pages: Dict[int, List[Dict[str, str]]] = {}
+            if rows:
+                ids = [row[0] for row in rows]
+                for snippet_id, url, title in self._conn.execute(
+                    f"SELECT snippet_id, url, title FROM snippet_pages "
+                    f"WHERE snippet_id IN ({', '.join('?' * len(ids))}) ORDER BY snippet_id, position",
+                    ids
+                ):
+                    pages.setdefault(snippet_id, []).append({"url": url, "title": title})
+
+        return [
+            {
+                "site": row[1],
+                "hash": row[2],
+                "language": row[3],
+                "code": row[4],
+                "lines": row[5],
+                "occurrences": row[6],
+                "pages": pages.get(row[0], []),
+            }
+            for row in rows
+        ]
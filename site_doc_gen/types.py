@@ -5,6 +5,7 @@ Type definitions for site-doc-gen
 from dataclasses import dataclass, field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+from pathlib import Path
 
 @dataclass
 class CodeSnippet:
@@ -35,6 +36,7 @@ class Page:
     metadata: Dict[str, Any] = field(default_factory=dict)
     last_updated: Optional[datetime] = None
     parent_url: Optional[str] = None  # For maintaining hierarchy
+    content_format: str = "html"  # 'html', 'markdown' (raw markdown) or 'text' (code in code_snippets)
 
 @dataclass
 class Documentation:
@@ -44,10 +46,10 @@ class Documentation:
     generated_at: datetime = field(default_factory=datetime.now)
     metadata: Dict[str, Any] = field(default_factory=dict)
 
-    def to_markdown(self) -> str:
+    def to_markdown(self, workers: int = 1, cache_dir: Optional[Path] = None) -> str:
         """Convert documentation to markdown format"""
         from .markdown import MarkdownConverter
-        converter = MarkdownConverter(self)
+        converter = MarkdownConverter(self, workers=workers, cache_dir=cache_dir)
         return converter.convert()
 
     def to_json(self) -> Dict[str, Any]:
@@ -61,6 +63,7 @@ class Documentation:
                     "url": page.url,
                     "title": page.title,
                     "content": page.content,
+                    "content_format": page.content_format,
                     "code_snippets": [
                         {
                             "language": snippet.language,
@@ -3,18 +3,17 @@ Utility functions for site-doc-gen
 """
 
 from fnmatch import fnmatch
-from typing import Union, List, TypeVar, Any, Dict, Set
+from typing import Union, List, TypeVar, Any, Callable, Dict, Optional, Set
 from pathlib import Path
-from urllib.parse import urlparse, urljoin
-import asyncio
-import aiohttp
-from bs4 import BeautifulSoup
+from urllib.parse import urldefrag, urlparse, urljoin
 from collections import defaultdict
 import re
 import os
 
 T = TypeVar('T')
 
+UUID_SEGMENT_RE = re.compile(r'^[0-9a-f]{8}(-[0-9a-f]{4}){3}-[0-9a-f]{12}$')
+
 def format_number(num: int) -> str:
     """Format large numbers with K/M suffixes"""
     if num > 1_000_000:
@@ -62,149 +61,187 @@ def ensure_array(input_value: Union[T, List[T]]) -> List[T]:
         return input_value
     return [input_value]
 
-async def discover_github_patterns(owner: str, repo: str) -> Dict[str, Set[str]]:
+async def discover_github_patterns(
+    owner: str,
+    repo: str,
+    ref: Optional[str] = None,
+    api_url: Optional[str] = None
+) -> Dict[str, Set[str]]:
     """
     Discover URL patterns in a GitHub repository using the GitHub API.
+    
+    The whole tree is listed with the git Trees API (one request, or a
+    level-by-level walk if GitHub truncates it) and patterns are built in a
+    single pass over it.
     """
+    import aiohttp
+
+    from .filetypes import is_binary_path
+    from .github import GITHUB_API_URL, GitHubClient, fetch_tree
+    
     patterns = defaultdict(set)
-    github_token = os.environ.get("GITHUB_TOKEN")
-    headers = {}
-    if github_token:
-        headers["Authorization"] = f"token {github_token}"
+    print(f"\nFetching GitHub tree: {owner}/{repo} ({ref or 'default branch'})")
+    async with aiohttp.ClientSession() as session:
+        client = GitHubClient(session, api_url=api_url or GITHUB_API_URL)
+        tree = await fetch_tree(client, owner, repo, ref)
     
-    async def fetch_contents(path: str = ""):
-        url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}"
-        print(f"\nFetching GitHub contents: {path or '/'}")
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    contents = await response.json()
-                    files_found = 0
-                    dirs_found = 0
-                    
-                    for item in contents:
-                        if item["type"] == "file":
-                            # Skip binary files and catch all text-based files
-                            if not any(item["name"].endswith(ext) for ext in [
-                                # Binary files to skip
-                                ".exe", ".dll", ".so", ".dylib", ".pyc", ".pyo",
-                                ".jpg", ".jpeg", ".png", ".gif", ".bmp", ".ico",
-                                ".mp3", ".mp4", ".avi", ".mov", ".wav",
-                                ".zip", ".tar", ".gz", ".7z", ".rar",
-                                ".pdf", ".doc", ".docx", ".xls", ".xlsx",
-                                ".db", ".sqlite", ".sqlite3",
-                                ".bin", ".dat"
-                            ]):
-                                file_path = item["path"]
-                                patterns[file_path].add(file_path)
-                                # Add directory pattern
-                                dir_path = os.path.dirname(file_path)
-                                if dir_path:
-                                    patterns[f"{dir_path}/*"].add(file_path)
-                                files_found += 1
-                        elif item["type"] == "dir":
-                            dir_path = item["path"]
-                            patterns[f"{dir_path}/*"].add(dir_path)
-                            dirs_found += 1
-                            await fetch_contents(dir_path)
-                    
-                    if files_found or dirs_found:
-                        print(f"✓ Found {files_found} files and {dirs_found} directories in {path or '/'}")
+    files_found = 0
+    dirs_found = 0
+    for item in tree:
+        if item["type"] == "blob":
+            # Skip binary files and catch all text-based files
+            if not is_binary_path(item["path"]):
+                file_path = item["path"]
+                patterns[file_path].add(file_path)
+                # Add directory pattern
+                dir_path = os.path.dirname(file_path)
+                if dir_path:
+                    patterns[f"{dir_path}/*"].add(file_path)
+                files_found += 1
+        elif item["type"] == "tree":
+            dir_path = item["path"]
+            patterns[f"{dir_path}/*"].add(dir_path)
+            dirs_found += 1
     
-    await fetch_contents()
+    if files_found or dirs_found:
+        print(f"✓ Found {files_found} files and {dirs_found} directories")
     return dict(patterns)
 
-async def discover_url_patterns(base_url: str, max_depth: int = 2, max_urls: int = 100) -> Dict[str, Set[str]]:
+def url_path_pattern(path: str) -> str:
+    """Generate a pattern for a URL path by replacing numeric segments and UUIDs"""
+    pattern_segments = []
+    for segment in path.split('/'):
+        if segment.isdigit() or UUID_SEGMENT_RE.match(segment.lower()):
+            pattern_segments.append('*')
+        else:
+            pattern_segments.append(segment)
+    
+    pattern = '/'.join(pattern_segments)
+    if pattern.startswith('/'):
+        pattern = pattern[1:]
+    return pattern
+
+async def discover_url_patterns(
+    base_url: str,
+    max_depth: int = 2,
+    max_urls: int = 100,
+    concurrency: int = 8,
+    timeout: Optional[float] = None,
+    on_pattern: Optional[Callable[[str, str], None]] = None
+) -> Dict[str, Set[str]]:
     """
     Perform a quick crawl of a site to discover URL patterns.
     Returns a dictionary of patterns to sets of example URLs.
     
+    The site is crawled breadth-first by a bounded pool of workers sharing one
+    HTTP session. If the deadline passes, the crawl stops and the patterns
+    found so far are returned.
+    
     Args:
         base_url: The starting URL to crawl
         max_depth: Maximum depth to crawl (default: 2)
         max_urls: Maximum number of URLs to process (default: 100)
+        concurrency: Maximum number of concurrent requests (default: 8)
+        timeout: Wall-clock deadline in seconds for the whole crawl (default: none)
+        on_pattern: Called with (pattern, example path) whenever a new pattern
+            is found, for streaming results as they appear
     
     Returns:
         Dict[str, Set[str]]: Mapping of patterns to example URLs
     """
     # Check if this is a GitHub repository
-    github_pattern = r"https?://github\.com/([^/]+)/([^/]+)(?:/tree/[^/]+)?"
+    github_pattern = r"https?://github\.com/([^/]+)/([^/]+)(?:/tree/([^/]+))?"
     github_match = re.match(github_pattern, base_url)
     if github_match:
-        owner, repo = github_match.group(1), github_match.group(2)
+        owner, repo, ref = github_match.group(1), github_match.group(2), github_match.group(3)
         print(f"\nDiscovering patterns for GitHub repository: {owner}/{repo}")
-        return await discover_github_patterns(owner, repo)
+        return await discover_github_patterns(owner, repo, ref)
     
     # Regular website pattern discovery
+    import asyncio
+    import aiohttp
+    from bs4 import BeautifulSoup
+
+    base_url = urldefrag(base_url)[0]
     base_domain = urlparse(base_url).netloc
-    visited = set()
+    visited = {base_url}
     patterns = defaultdict(set)
+    queue: asyncio.Queue = asyncio.Queue()
+    if max_depth > 0:
+        queue.put_nowait((base_url, 0))
     
-    async def fetch_urls(url: str, depth: int = 0):
-        if depth >= max_depth or len(visited) >= max_urls or url in visited:
-            return
-        
-        visited.add(url)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout else None
+    
+    async def fetch_urls(session: aiohttp.ClientSession, url: str, depth: int):
         print(f"\nDiscovering patterns at depth {depth}: {url}")
+        async with session.get(url) as response:
+            if response.status != 200:
+                return
+            if "html" not in response.headers.get("content-type", "html").lower():
+                return
+            html = await response.text()
         
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        return
-                    
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    # Extract all links
-                    links = soup.find_all('a', href=True)
-                    new_patterns = set()
-                    
-                    for link in links:
-                        href = link['href']
-                        full_url = urljoin(url, href)
-                        
-                        # Skip external links and non-HTTP(S) URLs
-                        if not full_url.startswith(('http://', 'https://')):
-                            continue
-                        parsed = urlparse(full_url)
-                        if parsed.netloc != base_domain:
-                            continue
-                        
-                        # Extract path and create pattern
-                        path = parsed.path.rstrip('/')
-                        if not path:
-                            continue
-                            
-                        # Generate pattern by replacing numeric segments and UUIDs
-                        segments = path.split('/')
-                        pattern_segments = []
-                        for segment in segments:
-                            if segment.isdigit() or re.match(r'^[0-9a-f]{8}(-[0-9a-f]{4}){3}-[0-9a-f]{12}$', segment.lower()):
-                                pattern_segments.append('*')
-                            else:
-                                pattern_segments.append(segment)
-                        
-                        pattern = '/'.join(pattern_segments)
-                        if pattern.startswith('/'):
-                            pattern = pattern[1:]
-                        
-                        # Store pattern with example
-                        if pattern not in patterns:
-                            new_patterns.add(pattern)
-                        patterns[pattern].add(path)
-                        
-                        # Continue crawling if within limits
-                        if len(visited) < max_urls:
-                            await fetch_urls(full_url, depth + 1)
-                    
-                    if new_patterns:
-                        print(f"Found {len(new_patterns)} new patterns")
+        soup = BeautifulSoup(html, 'html.parser')
+        new_patterns = set()
+        
+        for link in soup.find_all('a', href=True):
+            full_url = urldefrag(urljoin(url, link['href']))[0]
+            
+            # Skip external links and non-HTTP(S) URLs
+            if not full_url.startswith(('http://', 'https://')):
+                continue
+            parsed = urlparse(full_url)
+            if parsed.netloc != base_domain:
+                continue
+            
+            # Extract path and create pattern
+            path = parsed.path.rstrip('/')
+            if not path:
+                continue
+            
+            # Store pattern with example
+            pattern = url_path_pattern(path)
+            if pattern not in patterns:
+                new_patterns.add(pattern)
+                if on_pattern:
+                    on_pattern(pattern, path)
+            patterns[pattern].add(path)
+            
+            # Queue the next level if within limits
+            if (
+                depth + 1 < max_depth
+                and len(visited) < max_urls
+                and full_url not in visited
+            ):
+                visited.add(full_url)
+                queue.put_nowait((full_url, depth + 1))
         
-        except Exception as e:
-            print(f"Error fetching {url}: {str(e)}")
+        if new_patterns:
+            print(f"Found {len(new_patterns)} new patterns")
     
-    await fetch_urls(base_url)
+    async def worker(session: aiohttp.ClientSession):
+        while True:
+            url, depth = await queue.get()
+            try:
+                await fetch_urls(session, url, depth)
+            except Exception as e:
+                print(f"Error fetching {url}: {str(e)}")
+            finally:
+                queue.task_done()
+    
+    request_timeout = aiohttp.ClientTimeout(total=min(timeout, 30) if timeout else 30)
+    async with aiohttp.ClientSession(timeout=request_timeout) as session:
+        workers = [asyncio.create_task(worker(session)) for _ in range(max(1, concurrency))]
+        try:
+            remaining = deadline - loop.time() if deadline else None
+            await asyncio.wait_for(queue.join(), timeout=remaining)
+        except asyncio.TimeoutError:
+            print(f"Pattern discovery deadline reached after {len(visited)} URLs; returning partial results")
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
     
     # Group and analyze patterns
     grouped_patterns = defaultdict(set)
@@ -238,6 +275,8 @@ def suggest_content_selector(html: str) -> str:
     Returns:
         str: Suggested CSS selector for main content
     """
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(html, 'html.parser')
     
     # Common documentation content selectors
@@ -0,0 +1,449 @@
+"""
+Recording fetches to a WARC archive and replaying them without the network
+"""
+
+import asyncio
+import base64
+import contextlib
+import gzip
+import hashlib
+import io
+import logging
+import mmap
+import shutil
+import tempfile
+import threading
+import uuid
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urlencode
+
+from multidict import CIMultiDict, CIMultiDictProxy
+
+from . import __version__
+
+logger = logging.getLogger(__name__)
+
+WARC_VERSION = "WARC/1.1"
+
+# Bytes of a record decompressed while indexing; enough for its WARC headers
+HEADER_PEEK_BYTES = 8 * 1024
+
+# Compressed bytes fed to the decompressor at a time while indexing
+SCAN_CHUNK_SIZE = 256 * 1024
+
+# Request headers never written to an archive
+REDACTED_HEADERS = {"authorization", "cookie", "proxy-authorization"}
+
+# Response headers describing the wire encoding; bodies are stored decoded
+WIRE_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+
+# Bodies being recorded are kept in memory up to this size, then spooled to disk
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+# Bytes copied at a time while spooling, hashing and compressing a body
+COPY_CHUNK_SIZE = 64 * 1024
+
+def request_url(url: str, params: Optional[Dict[str, str]] = None) -> str:
+    """The URL a request with query parameters is recorded and looked up under"""
+    if not params:
+        return url
+    return f"{url}{'&' if '?' in url else '?'}{urlencode(params)}"
+
+def _warc_date() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _record_id() -> str:
+    return f"<urn:uuid:{uuid.uuid4()}>"
+
+def _http_headers(lines: List[str], headers) -> bytes:
+    return ("\r\n".join(lines + [f"{name}: {value}" for name, value in headers]) + "\r\n\r\n").encode("utf-8")
+
+class ArchivedStream:
+    """The parts of aiohttp's StreamReader used on response.content, over a file"""
+
+    def __init__(self, body: BinaryIO):
+        self._body = body
+        start = body.tell()
+        self._size = body.seek(0, io.SEEK_END)
+        body.seek(start)
+
+    async def iter_chunked(self, size: int) -> AsyncIterator[bytes]:
+        while True:
+            chunk = await self.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._body.read(size)
+
+    def at_eof(self) -> bool:
+        return self._body.tell() >= self._size
+
+class ArchivedResponse:
+    """A recorded response, standing in for aiohttp.ClientResponse.
+
+    The body is bytes, or a binary file positioned at its start (e.g. a
+    spooled download too large to keep in memory).
+    """
+
+    def __init__(self, url: str, status: int, reason: str, headers: CIMultiDict, body: Union[bytes, BinaryIO]):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = CIMultiDictProxy(headers)
+        self._body = io.BytesIO(body) if isinstance(body, (bytes, bytearray)) else body
+        self.content = ArchivedStream(self._body)
+
+    @property
+    def charset(self) -> Optional[str]:
+        for param in self.headers.get("Content-Type", "").split(";")[1:]:
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "charset" and value:
+                return value.strip("\"'")
+        return None
+
+    async def read(self) -> bytes:
+        self._body.seek(0)
+        return self._body.read()
+
+    async def text(self, encoding: Optional[str] = None, errors: str = "replace") -> str:
+        body = await self.read()
+        try:
+            return body.decode(encoding or self.charset or "utf-8", errors)
+        except LookupError:
+            return body.decode("utf-8", errors)
+
+class WarcWriter:
+    """Append gzip-compressed WARC records to a file.
+
+    Each record is a separate gzip member, as in standard .warc.gz files,
+    so a record can be read back from its offset without the ones before it.
+    Writes may come from several threads.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "wb")
+        self._lock = threading.Lock()
+        self.records = 0
+        self._write_record(
+            "warcinfo",
+            {"Content-Type": "application/warc-fields"},
+            f"software: site-doc-gen/{__version__}\r\nformat: WARC File Format 1.1\r\n".encode("utf-8")
+        )
+
+    def _write_record(
+        self,
+        warc_type: str,
+        fields: Dict[str, str],
+        block: bytes,
+        payload: Optional[BinaryIO] = None,
+        payload_length: int = 0
+    ) -> str:
+        """Write a record whose block is block followed by the payload file, if any.
+
+        The payload is compressed as it is copied, so it is never held in
+        memory as a whole.
+        """
+        record_id = _record_id()
+        head = [
+            WARC_VERSION,
+            f"WARC-Type: {warc_type}",
+            f"WARC-Record-ID: {record_id}",
+            f"WARC-Date: {_warc_date()}",
+        ]
+        head += [f"{name}: {value}" for name, value in fields.items()]
+        head.append(f"Content-Length: {len(block) + payload_length}")
+        with self._lock:
+            # One gzip member per record
+            with gzip.GzipFile(fileobj=self._file, mode="wb", mtime=0) as member:
+                member.write(("\r\n".join(head) + "\r\n\r\n").encode("utf-8") + block)
+                if payload is not None:
+                    shutil.copyfileobj(payload, member, COPY_CHUNK_SIZE)
+                member.write(b"\r\n\r\n")
+            self.records += 1
+        return record_id
+
+    def write_exchange(
+        self,
+        url: str,
+        request_headers,
+        status: int,
+        reason: str,
+        response_headers,
+        body: Union[bytes, BinaryIO]
+    ) -> None:
+        """Write a GET and its response as a response record and a request record.
+
+        Credentials are dropped from the request headers, and the response is
+        stored with its body decoded (without Content-Encoding). The body may
+        be a binary file positioned at its start.
+        """
+        if isinstance(body, (bytes, bytearray)):
+            body = io.BytesIO(body)
+        start = body.tell()
+        digest = hashlib.sha1()
+        for chunk in iter(lambda: body.read(COPY_CHUNK_SIZE), b""):
+            digest.update(chunk)
+        length = body.tell() - start
+        body.seek(start)
+
+        headers = [(name, value) for name, value in response_headers.items() if name.lower() not in WIRE_HEADERS]
+        headers.append(("Content-Length", str(length)))
+        payload_digest = base64.b32encode(digest.digest()).decode("ascii")
+        response_id = self._write_record("response", {
+            "WARC-Target-URI": url,
+            "WARC-Payload-Digest": f"sha1:{payload_digest}",
+            "Content-Type": "application/http; msgtype=response",
+        }, _http_headers([f"HTTP/1.1 {status} {reason}"], headers), body, length)
+
+        headers = [(name, value) for name, value in request_headers.items() if name.lower() not in REDACTED_HEADERS]
+        self._write_record("request", {
+            "WARC-Target-URI": url,
+            "WARC-Concurrent-To": response_id,
+            "Content-Type": "application/http; msgtype=request",
+        }, _http_headers([f"GET {url} HTTP/1.1"], headers))
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+def _read_head(stream: BinaryIO) -> bytes:
+    """Read header lines up to the blank line ending them, which is consumed but not returned"""
+    lines = []
+    while True:
+        line = stream.readline(HEADER_PEEK_BYTES)
+        if line in (b"\r\n", b"\n", b""):
+            return b"".join(lines).rstrip(b"\r\n")
+        lines.append(line)
+
+class _MapSlice(io.RawIOBase):
+    """A read-only file over part of a memory map, without copying it"""
+
+    def __init__(self, view: mmap.mmap, start: int, length: int):
+        self._view = view
+        self._start = start
+        self._end = start + length
+        self._position = start
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position - self._start
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: self._start, io.SEEK_CUR: self._position, io.SEEK_END: self._end}[whence]
+        self._position = min(max(base + offset, self._start), self._end)
+        return self.tell()
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self._end - self._position)
+        buffer[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+
+class _RecordBody(io.RawIOBase):
+    """The payload of a compressed record, decompressed as it is read.
+
+    Seeking backwards restarts decompression from the start of the record.
+    """
+
+    def __init__(self, record: gzip.GzipFile, start: int, length: int):
+        self._record = record
+        self._start = start
+        self._length = length
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: self._length}[whence]
+        self._position = min(max(base + offset, 0), self._length)
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self._length - self._position)
+        if size <= 0:
+            return 0
+        if self._record.tell() != self._start + self._position:
+            self._record.seek(self._start + self._position)
+        data = self._record.read(size)
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def close(self) -> None:
+        self._record.close()
+        super().close()
+
+class WarcArchive:
+    """Read-only view of a .warc.gz file with an in-memory index of its responses.
+
+    Opening the archive scans it once, keeping only the WARC headers of each
+    record as it is decompressed, and indexes the offset and length of every
+    response record by URL. Responses are then read by decompressing only
+    their own record from a memory map of the file, as the caller reads
+    them, so replaying a large body (e.g. a tarball) doesn't buffer it.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{self.path} is empty, not a WARC archive") from None
+        self.index: Dict[str, List[Tuple[int, int]]] = {}
+        for offset, length, head in self._scan():
+            fields = self._parse_fields(head)
+            if fields.get("warc-type") == "response" and "warc-target-uri" in fields:
+                self.index.setdefault(fields["warc-target-uri"], []).append((offset, length))
+        self._served: Dict[str, int] = {}
+
+    def _scan(self) -> Iterator[Tuple[int, int, bytes]]:
+        """Yield the offset, compressed length and first bytes of every record"""
+        offset = 0
+        size = len(self._map)
+        while offset < size:
+            decompressor = zlib.decompressobj(wbits=31)
+            head = b""
+            position = offset
+            while not decompressor.eof:
+                if position >= size:
+                    raise ValueError(f"{self.path} ends in the middle of a record at offset {offset}")
+                chunk = self._map[position:position + SCAN_CHUNK_SIZE]
+                position += len(chunk)
+                data = decompressor.decompress(chunk)
+                if len(head) < HEADER_PEEK_BYTES:
+                    head += data[:HEADER_PEEK_BYTES - len(head)]
+            end = position - len(decompressor.unused_data)
+            yield offset, end - offset, head
+            offset = end
+
+    @staticmethod
+    def _parse_fields(head: bytes) -> Dict[str, str]:
+        """WARC header fields of a record, with lowercased names"""
+        fields = {}
+        for line in head.split(b"\r\n\r\n", 1)[0].split(b"\r\n")[1:]:
+            name, _, value = line.decode("utf-8", errors="replace").partition(":")
+            fields[name.strip().lower()] = value.strip()
+        return fields
+
+    def _read(self, offset: int, length: int, url: str) -> ArchivedResponse:
+        """Open a response record; its body is decompressed only as it is read"""
+        record = gzip.GzipFile(fileobj=_MapSlice(self._map, offset, length), mode="rb")
+        fields = self._parse_fields(_read_head(record))
+        block_start = record.tell()
+        http_head = _read_head(record)
+        body_start = record.tell()
+        body_length = max(0, int(fields.get("content-length", 0)) - (body_start - block_start))
+        status_line, *header_lines = http_head.decode("iso-8859-1").split("\r\n")
+        _, status, reason = (status_line.split(" ", 2) + [""])[:3]
+        headers = CIMultiDict()
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            headers.add(name.strip(), value.strip())
+        return ArchivedResponse(url, int(status), reason, headers, _RecordBody(record, body_start, body_length))
+
+    def get(self, url: str) -> Optional[ArchivedResponse]:
+        """The next recorded response for a URL, or None if it was never fetched.
+
+        A URL fetched several times (e.g. retried after a rate limit) replays
+        its responses in recorded order, then keeps returning the last one.
+        """
+        records = self.index.get(url)
+        if not records:
+            return None
+        served = self._served.get(url, 0)
+        self._served[url] = served + 1
+        return self._read(*records[min(served, len(records) - 1)], url)
+
+    def __len__(self) -> int:
+        return sum(len(records) for records in self.index.values())
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+class RecordingSession:
+    """Wraps an aiohttp.ClientSession, writing every GET to a WARC file.
+
+    Each body is read in full and written before the caller sees the
+    response, so an archive holds complete responses even when the caller
+    would have stopped reading early. Bodies are spooled to a temporary
+    file past SPOOL_MAX_BYTES, so large downloads (e.g. repository
+    tarballs) are recorded without holding them in memory. The caller gets
+    an ArchivedResponse reading from the spool.
+    """
+
+    def __init__(self, session, writer: WarcWriter):
+        self.session = session
+        self.writer = writer
+
+    @contextlib.asynccontextmanager
+    async def get(self, url: str, params: Optional[Dict[str, str]] = None, **kwargs):
+        async with self.session.get(url, params=params, **kwargs) as response:
+            with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+                async for chunk in response.content.iter_chunked(COPY_CHUNK_SIZE):
+                    spool.write(chunk)
+                spool.seek(0)
+                target = request_url(url, params)
+                # Compressing a large body (e.g. a tarball) would stall the event loop
+                await asyncio.get_running_loop().run_in_executor(
+                    None,
+                    self.writer.write_exchange,
+                    target,
+                    response.request_info.headers,
+                    response.status,
+                    response.reason or "",
+                    response.headers,
+                    spool
+                )
+                spool.seek(0)
+                yield ArchivedResponse(target, response.status, response.reason or "", CIMultiDict(response.headers), spool)
+
+    async def close(self) -> None:
+        await self.session.close()
+        self.writer.close()
+
+class ReplaySession:
+    """Serves GETs from a WARC archive in place of an aiohttp.ClientSession.
+
+    Nothing goes to the network. A URL missing from the archive gets a 404,
+    logged as a warning, so a replayed crawl can follow different links
+    than the recorded one without failing.
+    """
+
+    def __init__(self, archive: WarcArchive):
+        self.archive = archive
+        self.misses = 0
+
+    @contextlib.asynccontextmanager
+    async def get(self, url: str, params: Optional[Dict[str, str]] = None, **kwargs):
+        target = request_url(url, params)
+        response = self.archive.get(target)
+        if response is None:
+            self.misses += 1
+            logger.warning(f"Not in the replay archive: {target}")
+            response = ArchivedResponse(target, 404, "Not Found", CIMultiDict(), b"")
+        yield response
+
+    async def close(self) -> None:
+        self.archive.close()
@@ -0,0 +1,14 @@
+"""
+Shared test setup
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# benchmarks is a top-level package next to site_doc_gen
+sys.path.insert(0, str(ROOT))
+
+# The web interface modules are imported as top-level modules, as app.py does
+sys.path.insert(0, str(ROOT / "web_interface"))
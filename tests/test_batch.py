@@ -0,0 +1,225 @@
+"""
+Tests for batch mode: fair scheduling, the shared budget and batch runs
+"""
+
+import asyncio
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+from site_doc_gen import Config
+from site_doc_gen.batch import BatchManifest, BatchSite, Budget, FairScheduler, load_manifest, run_batch
+from site_doc_gen.core import DocGen
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+def test_free_slots_are_granted_immediately():
+    async def main():
+        scheduler = FairScheduler(2)
+        await scheduler.acquire("a")
+        await scheduler.acquire("a")
+        assert scheduler.in_use == 2
+        scheduler.release("a")
+        scheduler.release("a")
+        return scheduler
+
+    scheduler = asyncio.run(main())
+    assert scheduler.in_use == 0
+    assert scheduler.granted["a"] == 2
+
+def test_freed_slots_go_to_the_client_holding_fewest():
+    async def main():
+        scheduler = FairScheduler(2)
+        order = []
+
+        async def request(key):
+            await scheduler.acquire(key)
+            order.append(key)
+
+        await scheduler.acquire("big")
+        await scheduler.acquire("big")
+        # A large site queues many requests before a small one queues any
+        waiting = [asyncio.create_task(request("big")) for _ in range(4)]
+        await settle()
+        waiting.append(asyncio.create_task(request("small")))
+        await settle()
+        assert order == []
+
+        scheduler.release("big")
+        await settle()
+        assert order == ["small"]
+        scheduler.release("big")
+        scheduler.release("small")
+        await settle()
+        assert order == ["small", "big", "big"]
+        for _ in range(2):
+            scheduler.release("big")
+        await asyncio.gather(*waiting)
+        assert order == ["small"] + ["big"] * 4
+        return scheduler
+
+    scheduler = asyncio.run(main())
+    assert scheduler.in_use == 2
+    assert (scheduler.granted["big"], scheduler.granted["small"]) == (6, 1)
+
+def test_ties_go_to_the_client_served_longest_ago():
+    async def main():
+        scheduler = FairScheduler(1)
+        order = []
+
+        async def request(key):
+            await scheduler.acquire(key)
+            order.append(key)
+            scheduler.release(key)
+
+        await scheduler.acquire("a")
+        tasks = [asyncio.create_task(request(key)) for key in ("a", "a", "b", "c")]
+        await settle()
+        scheduler.release("a")
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(main()) == ["b", "c", "a", "a"]
+
+def test_cancelled_waiters_give_up_their_place():
+    async def main():
+        scheduler = FairScheduler(1)
+        await scheduler.acquire("a")
+        cancelled = asyncio.create_task(scheduler.acquire("b"))
+        waiting = asyncio.create_task(scheduler.acquire("c"))
+        await settle()
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        assert scheduler._queued == 1 and "b" not in scheduler._waiters
+
+        scheduler.release("a")
+        await waiting
+        assert scheduler._held == {"c": 1}
+        scheduler.release("c")
+        return scheduler
+
+    scheduler = asyncio.run(main())
+    assert scheduler.in_use == 0
+    assert scheduler._queued == 0
+    assert "b" not in scheduler.granted
+
+def test_a_slot_granted_as_its_waiter_is_cancelled_is_returned():
+    async def main():
+        scheduler = FairScheduler(1)
+        await scheduler.acquire("a")
+        waiter = asyncio.create_task(scheduler.acquire("b"))
+        await settle()
+        # The slot is handed over, then the waiter is cancelled before it resumes
+        scheduler.release("a")
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return scheduler
+
+    scheduler = asyncio.run(main())
+    assert scheduler.in_use == 0
+    assert scheduler._held == {}
+
+def test_budget_bounds_requests_per_site_and_overall():
+    async def main():
+        async with Budget(connections=3, workers=2) as budget:
+            active = {"a": 0, "b": 0}
+            peaks = {"a": 0, "b": 0, "total": 0}
+
+            async def request(key, limiter):
+                async with limiter:
+                    active[key] += 1
+                    peaks[key] = max(peaks[key], active[key])
+                    peaks["total"] = max(peaks["total"], sum(active.values()))
+                    await asyncio.sleep(0.001)
+                    active[key] -= 1
+
+            limiters = {"a": budget.limiter("a", 2), "b": budget.limiter("b", 5)}
+            await asyncio.gather(*(
+                request(key, limiters[key]) for key in ("a", "b") for _ in range(20)
+            ))
+            assert budget.connector is not None
+            return budget.scheduler, peaks
+
+    scheduler, peaks = asyncio.run(main())
+    assert peaks["a"] <= 2
+    assert peaks["total"] == 3
+    assert scheduler.granted == {"a": 20, "b": 20}
+    assert scheduler.in_use == 0
+    assert scheduler.waited["a"] > 0
+
+def test_batch_extraction_runs_on_the_budget_workers(tmp_path):
+    threads = []
+
+    async def main():
+        async with Budget(workers=1) as budget:
+            doc_gen = DocGen(Config(output_dir=tmp_path, quiet=True), budget=budget)
+            extract = doc_gen._extract_page
+
+            def spy(url, html):
+                threads.append(threading.current_thread().name)
+                return extract(url, html)
+
+            async def fetch(url):
+                return "<html><body><main><h1>Hi</h1><p>Text</p></main></body></html>"
+
+            doc_gen._extract_page = spy
+            doc_gen._fetch_page = fetch
+            return await doc_gen._process_page("https://example.com/")
+
+    page = asyncio.run(main())
+    assert page.url == "https://example.com/"
+    assert threads and threads[0].startswith("site-doc-gen")
+
+@pytest.fixture
+def sources(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "guide.md").write_text("# Guide\n\nText.\n")
+    (docs / "api.md").write_text("# API\n\nMore.\n")
+    empty = tmp_path / "empty"
+    empty.mkdir()
+    (empty / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+    return docs, empty
+
+def test_batch_summary_reports_empty_sites_separately(tmp_path, sources):
+    docs, empty = sources
+    manifest = BatchManifest(sites=[
+        BatchSite(url=str(docs)),
+        BatchSite(url=str(empty)),
+        # Invalid options fail that site only
+        BatchSite(url=str(docs), options={"record_warc": "a.warc.gz", "replay_warc": "b.warc.gz"}),
+    ])
+    base = {"output_dir": tmp_path / "output", "quiet": True, "snippet_index": False}
+    summary = asyncio.run(run_batch(manifest, base, summary_path=tmp_path / "summary.json"))
+    assert [site["status"] for site in summary["sites"]] == ["ok", "empty", "error"]
+    assert (summary["succeeded"], summary["empty"], summary["failed"]) == (1, 1, 1)
+    assert summary["total_pages"] == 2
+    assert json.loads((tmp_path / "summary.json").read_text())["empty"] == 1
+
+def test_batch_honours_output_format_and_paths(tmp_path, sources, monkeypatch):
+    docs, _ = sources
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "sites.json").write_text(json.dumps({
+        "defaults": {"output_dir": "output", "quiet": True, "snippet_index": False},
+        "sites": [
+            {"url": str(docs), "output": "combined/docs.md"},
+            {"url": str(docs), "output_format": "json", "output_dir": "json-output"},
+        ],
+    }))
+    manifest = load_manifest(tmp_path / "sites.json")
+    assert manifest.sites[0].output.as_posix() == "combined/docs.md"
+    summary = asyncio.run(run_batch(manifest))
+
+    markdown_site, json_site = summary["sites"]
+    assert markdown_site["output_file"] == "combined/docs.md"
+    assert "# Guide" in (tmp_path / "combined" / "docs.md").read_text()
+    assert not (tmp_path / "output" / markdown_site["output"]["site_name"] / "documentation.json").exists()
+    output_file = tmp_path / "json-output" / json_site["output"]["site_name"] / "documentation.json"
+    assert json_site["output_file"] == str(Path("json-output") / json_site["output"]["site_name"] / "documentation.json")
+    assert len(json.loads(output_file.read_text())["pages"]) == 2
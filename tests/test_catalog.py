@@ -0,0 +1,101 @@
+"""
+Tests for the site catalog behind the /docs listing
+"""
+
+import json
+import os
+import shutil
+
+import pytest
+
+from catalog import SiteCatalog
+
+def write_site(output_dir, name, pages=3, base_url="https://example.com/", metadata=None):
+    site_dir = output_dir / name
+    site_dir.mkdir()
+    (site_dir / "documentation.md").write_text("# Documentation\n")
+    (site_dir / "manifest.json").write_text(json.dumps({
+        "base_url": base_url,
+        "generated_at": "2026-01-01T00:00:00",
+        "total_pages": pages,
+        "files": {"documentation.md": {"size": 16, "sha256": "0" * 64, "encodings": []}},
+    }))
+    if metadata is not None:
+        (site_dir / "metadata.json").write_text(json.dumps(metadata))
+    return site_dir
+
+@pytest.fixture
+def output_dir(tmp_path):
+    path = tmp_path / "output"
+    path.mkdir()
+    return path
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = SiteCatalog(tmp_path / "catalog.db")
+    yield catalog
+    catalog._conn.close()
+
+def names(catalog):
+    sites, _ = catalog.query(sort_by="name", per_page=100)
+    return [site["name"] for site in sites]
+
+def test_sites_written_after_startup_are_listed(catalog, output_dir):
+    catalog.sync(output_dir, force=True)
+    assert names(catalog) == []
+
+    write_site(output_dir, "example_com", pages=7)
+    catalog.sync(output_dir, force=True)
+    sites, total = catalog.query()
+    assert total == 1
+    assert sites[0]["path"] == "example_com/documentation.md"
+    assert sites[0]["source_url"] == "https://example.com/"
+    assert sites[0]["total_pages"] == 7
+    assert sites[0]["total_size"] == 16
+
+def test_removed_site_dirs_are_dropped(catalog, output_dir):
+    write_site(output_dir, "a_com")
+    write_site(output_dir, "b_com")
+    catalog.sync(output_dir, force=True)
+    assert names(catalog) == ["a_com", "b_com"]
+
+    shutil.rmtree(output_dir / "a_com")
+    assert catalog.sync(output_dir, force=True) == 1
+    assert names(catalog) == ["b_com"]
+
+def test_metadata_json_takes_precedence(catalog, output_dir):
+    write_site(output_dir, "site", metadata={
+        "source_url": "https://docs.example.com/",
+        "stats": {"total_pages": 42, "total_size_bytes": 1000},
+    })
+    catalog.sync(output_dir, force=True)
+    site = catalog.query()[0][0]
+    assert (site["source_url"], site["total_pages"], site["total_size"]) == ("https://docs.example.com/", 42, 1000)
+
+def test_unchanged_sites_are_not_reread(catalog, output_dir):
+    write_site(output_dir, "site")
+    assert catalog.sync(output_dir, force=True) == 1
+    assert catalog.sync(output_dir, force=True) == 0
+
+def test_regenerated_site_is_refreshed(catalog, output_dir):
+    site_dir = write_site(output_dir, "site", pages=1)
+    catalog.sync(output_dir, force=True)
+    manifest = json.loads((site_dir / "manifest.json").read_text())
+    manifest["total_pages"] = 5
+    (site_dir / "manifest.json").write_text(json.dumps(manifest))
+    stat = (site_dir / "manifest.json").stat()
+    os.utime(site_dir / "manifest.json", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    catalog.sync(output_dir, force=True)
+    assert catalog.query()[0][0]["total_pages"] == 5
+
+def test_sync_is_throttled(catalog, output_dir):
+    catalog.sync(output_dir)
+    write_site(output_dir, "site")
+    assert catalog.sync(output_dir) == 0
+    assert catalog.sync(output_dir, force=True) == 1
+
+def test_directories_without_output_are_ignored(catalog, output_dir):
+    (output_dir / "empty").mkdir()
+    (output_dir / ".cache").mkdir()
+    catalog.sync(output_dir, force=True)
+    assert names(catalog) == []
@@ -0,0 +1,140 @@
+"""
+Tests for chunking extracted pages for retrieval
+"""
+
+import json
+
+import pytest
+
+from site_doc_gen.chunks import Chunker, approx_tokens, export_chunks
+from site_doc_gen.types import CodeSnippet, Page
+
+def prose(sentences: int, word: str = "word") -> str:
+    return " ".join(f"Sentence {i} has a {word} or two." for i in range(sentences))
+
+def markdown_page(url: str = "https://example.com/guide", sentences: int = 60) -> Page:
+    code = "\n".join(f"value_{i} = compute({i})" for i in range(80))
+    content = f"# Guide\n\n{prose(sentences)}\n\n## Code\n\n```python\n{code}\n```\n\n## End\n\nShort.\n"
+    return Page(url=url, title="Guide", content=content, content_format="markdown")
+
+@pytest.mark.parametrize("unit", ["chars", "tokens"])
+@pytest.mark.parametrize("size, overlap", [(200, 0), (200, 50), (1000, 150)])
+def test_chunks_stay_within_the_size(unit, size, overlap):
+    chunker = Chunker(size=size, overlap=overlap, unit=unit)
+    chunks = list(chunker.chunk_page(markdown_page()))
+    assert len(chunks) > 2
+    for chunk in chunks:
+        measured = chunk["chars"] if unit == "chars" else chunk["tokens"]
+        assert 0 < measured <= size
+    assert [chunk["position"] for chunk in chunks] == list(range(len(chunks)))
+
+def test_chunks_do_not_span_sections_or_kinds():
+    chunks = list(Chunker(size=300, overlap=0).chunk_page(markdown_page()))
+    by_path = {}
+    for chunk in chunks:
+        by_path.setdefault((tuple(chunk["heading_path"]), chunk["kind"]), []).append(chunk)
+    assert set(by_path) == {
+        (("Guide",), "prose"),
+        (("Guide", "Code"), "code"),
+        (("Guide", "End"), "prose"),
+    }
+    assert all(chunk["language"] == "python" for chunk in by_path[(("Guide", "Code"), "code")])
+    assert [chunk["text"] for chunk in by_path[(("Guide", "End"), "prose")]] == ["Short."]
+
+def test_code_is_split_at_lines_and_overlaps_in_whole_lines():
+    chunks = [
+        chunk for chunk in Chunker(size=200, overlap=60).chunk_page(markdown_page())
+        if chunk["kind"] == "code"
+    ]
+    for chunk in chunks:
+        assert all(line.startswith("value_") and line.endswith(")") for line in chunk["text"].splitlines())
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk["text"].splitlines()[0] in previous["text"].splitlines()
+
+def test_oversized_words_are_cut():
+    page = Page(url="https://example.com/", title="Long", content="x" * 250, content_format="markdown")
+    chunks = list(Chunker(size=100, overlap=0).chunk_page(page))
+    assert [chunk["chars"] for chunk in chunks] == [100, 100, 50]
+
+def test_text_pages_use_their_snippets():
+    page = Page(
+        url="https://example.com/main.rs",
+        title="main.rs",
+        content="",
+        code_snippets=[CodeSnippet(language="rust", code="fn main() {}\n", context="main.rs", type="source")],
+        content_format="text"
+    )
+    (chunk,) = Chunker().chunk_page(page)
+    assert (chunk["kind"], chunk["language"], chunk["text"]) == ("code", "rust", "fn main() {}")
+
+def test_html_pages_use_snippet_languages():
+    page = Page(
+        url="https://example.com/",
+        title="Example",
+        content="<h2>Setup</h2><p>Install it.</p><pre><code>pip install pkg</code></pre>",
+        code_snippets=[CodeSnippet(language="bash", code="pip install pkg", context="", type="example")]
+    )
+    chunks = list(Chunker().chunk_page(page))
+    assert [(chunk["heading_path"], chunk["kind"], chunk["language"]) for chunk in chunks] == [
+        (["Setup"], "prose", None),
+        (["Setup"], "code", "bash"),
+    ]
+
+def test_chunk_ids_are_stable_across_edits_elsewhere():
+    chunker = Chunker(size=300, overlap=0)
+    before = {chunk["id"]: chunk["kind"] for chunk in chunker.chunk_page(markdown_page())}
+    after = {chunk["id"] for chunk in chunker.chunk_page(markdown_page(sentences=61))}
+    assert {id for id, kind in before.items() if kind == "code"} <= after
+    assert set(before) != after
+
+@pytest.mark.parametrize("options", [
+    {"unit": "words"},
+    {"size": 0},
+    {"size": 100, "overlap": 100},
+    {"overlap": -1},
+])
+def test_invalid_options(options):
+    with pytest.raises(ValueError):
+        Chunker(**options)
+
+def test_approx_tokens():
+    assert approx_tokens("Hello, world!") == 4
+    assert approx_tokens("") == 0
+
+def read_lines(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+def test_export_reuses_unchanged_pages(tmp_path):
+    path = tmp_path / "chunks.jsonl"
+    chunker = Chunker(size=300, overlap=30)
+    pages = [markdown_page("https://example.com/a"), markdown_page("https://example.com/b")]
+    first = export_chunks(pages, path, chunker)
+    assert first["reused_pages"] == 0
+    assert first["size"] == path.stat().st_size
+    original = read_lines(path)
+
+    second = export_chunks(pages, path, chunker)
+    assert (second["reused_pages"], second["reused_chunks"]) == (2, first["chunks"])
+    assert second["sha256"] == first["sha256"]
+    assert read_lines(path) == original
+
+    pages[1] = markdown_page("https://example.com/b", sentences=61)
+    third = export_chunks(pages, path, chunker)
+    assert third["reused_pages"] == 1
+    assert third["reused_chunks"] == sum(1 for chunk in original if chunk["url"] == "https://example.com/a")
+    assert not (tmp_path / "chunks.jsonl.tmp").exists()
+
+def test_export_rechunks_when_options_change(tmp_path):
+    path = tmp_path / "chunks.jsonl"
+    pages = [markdown_page()]
+    export_chunks(pages, path, Chunker(size=300))
+    stats = export_chunks(pages, path, Chunker(size=400))
+    assert stats["reused_pages"] == 0
+    assert all(chunk["chars"] <= 400 for chunk in read_lines(path))
+
+def test_export_ignores_foreign_files(tmp_path):
+    path = tmp_path / "chunks.jsonl"
+    path.write_text('{"something": "else"}\n')
+    stats = export_chunks([markdown_page()], path, Chunker())
+    assert stats["reused_pages"] == 0
+    assert all("page_hash" in chunk for chunk in read_lines(path))
@@ -0,0 +1,41 @@
+"""
+Tests for the command line interface
+"""
+
+import asyncio
+
+import pytest
+
+from site_doc_gen import Config
+from site_doc_gen.cli import main
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    source = tmp_path / "src"
+    source.mkdir()
+    (source / "guide.md").write_text("# Guide\n\nSome text.\n")
+    return source
+
+@pytest.mark.parametrize("options", [
+    ["--chunk-size", "100"],
+    ["--chunk-size", "100", "--chunks"],
+    ["--chunk-size", "40", "--chunk-unit", "tokens", "--chunks"],
+])
+def test_small_chunk_sizes_run(source, tmp_path, options):
+    assert asyncio.run(main([str(source), "-o", str(tmp_path / "out.md"), *options])) == 0
+
+@pytest.mark.parametrize("options", [
+    ["--chunk-size", "0"],
+    ["--chunk-size", "100", "--chunk-overlap", "100"],
+    ["--chunk-overlap", "-1"],
+])
+def test_invalid_chunk_options_are_usage_errors(source, options, capsys):
+    with pytest.raises(SystemExit) as exit:
+        asyncio.run(main([str(source), *options]))
+    assert exit.value.code == 2
+    assert "--chunk-" in capsys.readouterr().err
+
+@pytest.mark.parametrize("size, overlap", [(1500, 150), (1000, 100), (100, 10), (5, 0)])
+def test_default_overlap_follows_the_chunk_size(tmp_path, size, overlap):
+    assert Config(output_dir=tmp_path, chunk_size=size).chunk_overlap == overlap
@@ -0,0 +1,89 @@
+"""
+Tests for URL pattern discovery: the breadth-first crawl and its deadline
+"""
+
+import asyncio
+import contextlib
+import time
+
+import aiohttp
+import pytest
+
+from site_doc_gen.utils import discover_url_patterns
+
+PAGES = {
+    "https://docs.test/": '<a href="/guide/start">Start</a><a href="/slow">Slow</a><a href="https://other.test/x">x</a>',
+    "https://docs.test/guide/start": '<a href="/api/client">Client</a><a href="#top">Top</a>',
+    "https://docs.test/api/client": '<a href="/api/server">Server</a>',
+}
+
+class StubResponse:
+    def __init__(self, url):
+        self.status = 200 if url in PAGES else 404
+        self.headers = {"content-type": "text/html; charset=utf-8"}
+        self.url = url
+
+    async def text(self):
+        return PAGES[self.url]
+
+class StubSession:
+    """Serves PAGES; /slow never answers"""
+    requested = []
+    cancelled = []
+
+    def __init__(self, timeout=None):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    @contextlib.asynccontextmanager
+    async def get(self, url):
+        self.requested.append(url)
+        if url.endswith("/slow"):
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                self.cancelled.append(url)
+                raise
+        yield StubResponse(url)
+
+@pytest.fixture
+def session(monkeypatch):
+    StubSession.requested, StubSession.cancelled = [], []
+    monkeypatch.setattr(aiohttp, "ClientSession", StubSession)
+    return StubSession
+
+def test_deadline_returns_partial_patterns(session):
+    found = []
+
+    async def main():
+        return await discover_url_patterns(
+            "https://docs.test/", max_depth=3, timeout=0.5,
+            on_pattern=lambda pattern, path: found.append(pattern)
+        )
+
+    start = time.monotonic()
+    patterns = asyncio.run(main())
+    assert time.monotonic() - start < 5
+    # Everything reachable without the stalled page was crawled
+    assert patterns["guide/start"] == {"/guide/start"}
+    assert patterns["api/client"] == {"/api/client"}
+    assert patterns["*/api/*"] == {"/api/client", "/api/server"}
+    assert patterns["/"] == {"/"}
+    assert "x" not in patterns
+    assert found == ["guide/start", "slow", "api/client", "api/server"]
+    # The stalled request was abandoned at the deadline
+    assert session.cancelled == ["https://docs.test/slow"]
+
+def test_depth_and_url_limits(session):
+    async def main():
+        return await discover_url_patterns("https://docs.test/", max_depth=2, max_urls=2, timeout=0.5)
+
+    patterns = asyncio.run(main())
+    # The root plus one more page: /slow was never queued
+    assert session.requested == ["https://docs.test/", "https://docs.test/guide/start"]
+    assert "api/client" in patterns and "api/server" not in patterns
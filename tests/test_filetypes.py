@@ -0,0 +1,68 @@
+"""
+Tests for classifying source files as text or binary
+"""
+
+import pytest
+
+from site_doc_gen import Config
+from site_doc_gen.core import DocGen
+from site_doc_gen.filetypes import SNIFF_BYTES, FileClassifier, is_binary_content, is_binary_path
+
+@pytest.mark.parametrize("path, binary", [
+    ("logo.png", True),
+    ("assets/Logo.PNG", True),
+    ("dist/pkg-1.0-py3-none-any.whl", True),
+    ("model.safetensors", True),
+    ("archive.tar.gz", True),
+    ("README.md", False),
+    ("src/main.py", False),
+    ("png.py", False),
+    ("Makefile", False),
+    ("docs/binary.md", False),
+])
+def test_is_binary_path(path, binary):
+    assert is_binary_path(path) is binary
+
+@pytest.mark.parametrize("data, binary", [
+    (b"# Title\n", False),
+    ("naïve text ✓\n".encode("utf-8"), False),
+    (b"", False),
+    (b"text\x00more", True),
+    (b"\x89PNG\r\n\x1a\n", True),
+    (b"%PDF-1.7\n", True),
+    (b"\x1f\x8b\x08", True),
+    (b"SQLite format 3\x00", True),
+    # Magic bytes only count at the start
+    (b"see %PDF-1.7", False),
+])
+def test_is_binary_content(data, binary):
+    assert is_binary_content(data) is binary
+
+def test_only_the_sniffed_prefix_is_inspected():
+    assert not is_binary_content(b"a" * SNIFF_BYTES + b"\x00")
+    assert is_binary_content(b"a" * (SNIFF_BYTES - 1) + b"\x00")
+
+def test_size_cap():
+    classifier = FileClassifier(max_bytes=100)
+    assert classifier.accepts_size(100)
+    assert not classifier.accepts_size(101)
+    # Sizes missing from a listing are checked once the file is read
+    assert classifier.accepts_size(None)
+
+def test_truncating_classifier_accepts_any_size():
+    classifier = FileClassifier(max_bytes=100, truncate=True)
+    assert classifier.accepts_size(10 ** 9)
+    assert classifier.max_bytes == 100
+
+def test_uncapped_classifier():
+    classifier = FileClassifier()
+    assert classifier.accepts_size(10 ** 12)
+    assert classifier.accepts_path("guide.md")
+    assert not classifier.accepts_path("image.jpeg")
+    assert classifier.accepts_content(b"plain text")
+    assert not classifier.accepts_content(b"PK\x03\x04zip")
+
+def test_files_are_not_capped_by_default(tmp_path):
+    doc_gen = DocGen(Config(output_dir=tmp_path, quiet=True))
+    assert doc_gen.classifier.max_bytes is None
+    assert doc_gen._source_path_filter()("docs/large.md", 10 * 1024 * 1024)
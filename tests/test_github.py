@@ -0,0 +1,217 @@
+"""
+Tests for fetching GitHub repositories
+"""
+
+import asyncio
+import contextlib
+
+import pytest
+from multidict import CIMultiDict
+
+from site_doc_gen import Config, core, github
+from site_doc_gen.core import DocGen
+from site_doc_gen.github import ETagCache, GitHubClient, NullRateLimiter, RateLimiter, TokenBucket
+from site_doc_gen.warc import ArchivedResponse
+
+PATHS = ["docs/a file#1.md", "docs/100%.md", "docs/naïve?.md"]
+
+@pytest.fixture
+def generator(tmp_path):
+    generator = DocGen(Config(output_dir=tmp_path, quiet=True))
+    generator.github = None
+    return generator
+
+def test_raw_and_blob_urls_are_quoted(generator, monkeypatch):
+    async def fetch_tree(client, owner, repo, branch):
+        return [{"type": "blob", "path": path, "size": 10} for path in PATHS]
+
+    fetched = []
+
+    async def fetch_file(url):
+        fetched.append(url)
+        return "# Title\n"
+
+    monkeypatch.setattr(core, "fetch_tree", fetch_tree)
+    monkeypatch.setattr(generator, "_fetch_github_file", fetch_file)
+    pages = asyncio.run(generator._fetch_github_files("owner", "repo", "release/1.0"))
+
+    raw = f"{generator.config.github_raw_url}/owner/repo/release/1.0"
+    assert fetched == [
+        f"{raw}/docs/a%20file%231.md",
+        f"{raw}/docs/100%25.md",
+        f"{raw}/docs/na%C3%AFve%3F.md",
+    ]
+    assert [page.url for page in pages] == [
+        "https://github.com/owner/repo/blob/release/1.0/docs/a%20file%231.md",
+        "https://github.com/owner/repo/blob/release/1.0/docs/100%25.md",
+        "https://github.com/owner/repo/blob/release/1.0/docs/na%C3%AFve%3F.md",
+    ]
+
+def test_archive_blob_urls_are_quoted(generator, monkeypatch):
+    async def stream_tarball(client, owner, repo, select, handle, **kwargs):
+        for path in PATHS:
+            handle(path, b"# Title\n")
+        return len(PATHS)
+
+    monkeypatch.setattr(core, "stream_tarball", stream_tarball)
+    pages = asyncio.run(generator._fetch_github_archive("owner", "repo", None))
+    assert [page.url for page in pages] == [
+        "https://github.com/owner/repo/blob/HEAD/docs/100%25.md",
+        "https://github.com/owner/repo/blob/HEAD/docs/a%20file%231.md",
+        "https://github.com/owner/repo/blob/HEAD/docs/na%C3%AFve%3F.md",
+    ]
+
+class Clock:
+    """Stands in for the time module in site_doc_gen.github"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(github, "time", clock)
+    return clock
+
+def test_token_bucket_allows_a_burst_then_paces(clock):
+    bucket = TokenBucket(rate=2.0, capacity=3)
+    assert [bucket._reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Reservations queue up behind each other at the bucket's rate
+    assert [bucket._reserve() for _ in range(3)] == [0.5, 1.0, 1.5]
+
+def test_token_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(rate=2.0, capacity=3)
+    for _ in range(3):
+        bucket._reserve()
+    clock.now += 1.0
+    assert [bucket._reserve() for _ in range(3)] == [0.0, 0.0, 0.5]
+    clock.now += 3600
+    assert [bucket._reserve() for _ in range(4)] == [0.0, 0.0, 0.0, 0.5]
+
+def test_rate_limiter_paces_a_low_quota(clock):
+    limiter = RateLimiter(rate=10.0, capacity=1)
+    limiter.update({"X-RateLimit-Remaining": "100", "X-RateLimit-Limit": "5000", "X-RateLimit-Reset": str(clock.now + 50)})
+    assert limiter.rate == 2.0
+    limiter.update({"X-RateLimit-Remaining": "4000", "X-RateLimit-Limit": "5000", "X-RateLimit-Reset": str(clock.now + 50)})
+    assert limiter.rate == 10.0
+
+def test_rate_limiter_waits_for_the_reset(clock):
+    limiter = RateLimiter(rate=10.0, capacity=5)
+    limiter.update({"X-RateLimit-Remaining": "0", "X-RateLimit-Limit": "5000", "X-RateLimit-Reset": str(clock.now + 30)})
+    assert limiter._reserve() == 30.0
+    assert limiter.backoff({"Retry-After": "90"}) == 90.0
+    assert limiter._reserve() == 90.0
+
+def test_etag_cache_round_trip(tmp_path):
+    cache = ETagCache(tmp_path / "cache")
+    assert cache.get("https://api.github.test/a") is None
+    cache.put("https://api.github.test/a", '"v1"', b"body")
+    cache.put("https://api.github.test/b", '"v2"', b"other")
+    assert cache.get("https://api.github.test/a") == ('"v1"', b"body")
+    cache.put("https://api.github.test/a", '"v3"', b"new")
+    assert cache.get("https://api.github.test/a") == ('"v3"', b"new")
+    assert not list((tmp_path / "cache").rglob("*.tmp"))
+
+def test_etag_cache_write_errors_are_not_fatal(tmp_path):
+    blocker = tmp_path / "cache"
+    blocker.write_text("not a directory")
+    cache = ETagCache(blocker)
+    cache.put("https://api.github.test/a", '"v1"', b"body")
+    assert cache.get("https://api.github.test/a") is None
+
+class CachingServer:
+    """A session answering with an ETag, and 304 when it is sent back"""
+
+    def __init__(self, body: bytes, etag: str = '"abc"'):
+        self.body = body
+        self.etag = etag
+        self.requests = []
+
+    @contextlib.asynccontextmanager
+    async def get(self, url, headers=None, params=None):
+        self.requests.append(dict(headers or {}))
+        if (headers or {}).get("If-None-Match") == self.etag:
+            yield ArchivedResponse(url, 304, "Not Modified", CIMultiDict(), b"")
+        else:
+            yield ArchivedResponse(url, 200, "OK", CIMultiDict({"ETag": self.etag}), self.body)
+
+def test_client_revalidates_cached_responses(tmp_path):
+    server = CachingServer(b'{"tree": []}')
+    client = GitHubClient(server, api_url="https://api.github.test", cache_dir=tmp_path, limiter=NullRateLimiter())
+    url = "https://api.github.test/repos/owner/repo/git/trees/HEAD"
+
+    async def main():
+        return [await client.get(url, {"recursive": "1"}) for _ in range(2)]
+
+    assert asyncio.run(main()) == [(200, b'{"tree": []}')] * 2
+    assert "If-None-Match" not in server.requests[0]
+    assert server.requests[1]["If-None-Match"] == '"abc"'
+    assert client.not_modified == 1
+
+def test_client_does_not_cache_truncated_bodies(tmp_path):
+    server = CachingServer(b"x" * 100)
+    client = GitHubClient(server, api_url="https://api.github.test", cache_dir=tmp_path, limiter=NullRateLimiter())
+    url = "https://raw.github.test/owner/repo/HEAD/big.txt"
+
+    async def main():
+        return [await client.get(url, max_bytes=size) for size in (10, 100)]
+
+    assert asyncio.run(main()) == [(200, b"x" * 10), (200, b"x" * 100)]
+    assert "If-None-Match" not in server.requests[1]
+    assert client.cache.get(f"{url}? ") is not None
+
+class RateLimitedServer:
+    """A session answering the first requests with 429 and Retry-After"""
+
+    def __init__(self, limited: int, retry_after: str = "3"):
+        self.limited = limited
+        self.retry_after = retry_after
+        self.requests = 0
+
+    @contextlib.asynccontextmanager
+    async def get(self, url, headers=None, params=None):
+        self.requests += 1
+        if self.requests <= self.limited:
+            yield ArchivedResponse(url, 429, "Too Many Requests", CIMultiDict({"Retry-After": self.retry_after}), b"")
+        else:
+            yield ArchivedResponse(url, 200, "OK", CIMultiDict(), b"body")
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(github.asyncio, "sleep", sleep)
+    return delays
+
+def test_raw_requests_wait_out_rate_limits(sleeps):
+    server = RateLimitedServer(limited=2)
+    client = GitHubClient(server, api_url="https://api.github.test", limiter=RateLimiter())
+    status, body = asyncio.run(client.get("https://raw.github.test/owner/repo/HEAD/README.md"))
+    assert (status, body, server.requests) == (200, b"body", 3)
+    assert sleeps == [3.0, 3.0]
+
+def test_api_requests_wait_on_the_limiter(sleeps):
+    server = RateLimitedServer(limited=1, retry_after="5")
+    client = GitHubClient(server, api_url="https://api.github.test", limiter=RateLimiter())
+    status, _ = asyncio.run(client.get("https://api.github.test/repos/owner/repo/git/trees/HEAD"))
+    assert (status, server.requests) == (200, 2)
+    assert len(sleeps) == 1 and 4.0 < sleeps[0] <= 5.0
+
+def test_rate_limit_retries_are_bounded(sleeps):
+    server = RateLimitedServer(limited=100, retry_after="1")
+    client = GitHubClient(server, api_url="https://api.github.test", limiter=RateLimiter())
+    status, _ = asyncio.run(client.get("https://raw.github.test/owner/repo/HEAD/README.md"))
+    assert (status, server.requests) == (429, github.MAX_RATE_LIMIT_RETRIES + 1)
+    assert sleeps == [1.0] * github.MAX_RATE_LIMIT_RETRIES
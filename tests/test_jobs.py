@@ -0,0 +1,142 @@
+"""
+Tests for the background job queue of the web interface
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+import jobs
+from jobs import CANCELLED, COMPLETED, FAILED, QUEUED, RUNNING, Job, JobManager
+
+TIMEOUT = 10
+
+@pytest.fixture
+def history(monkeypatch):
+    """Record every status each job moves through"""
+    statuses = {}
+    update = Job.update
+
+    def record(self, **fields):
+        if "status" in fields:
+            statuses.setdefault(self.id, []).append(fields["status"])
+        update(self, **fields)
+
+    monkeypatch.setattr(jobs.Job, "update", record)
+    return statuses
+
+class Gate:
+    """A runner that blocks each job until released"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.ran = []
+
+    async def __call__(self, job):
+        self.ran.append(job.url)
+        self.started.set()
+        while not self.release.is_set():
+            await asyncio.sleep(0.01)
+        return job.url.upper()
+
+def wait_finished(job):
+    version = job.version
+    while not job.finished:
+        version = job.wait_for_change(version, TIMEOUT)
+    return job
+
+@pytest.fixture
+def gate():
+    return Gate()
+
+@pytest.fixture
+def manager(gate):
+    manager = JobManager(gate, max_concurrent=1)
+    yield manager
+    gate.release.set()
+    manager._executor.shutdown(wait=True)
+
+def test_jobs_run_to_completion(manager, gate, history):
+    gate.release.set()
+    job, created = manager.submit("https://example.com/")
+    assert created
+    wait_finished(job)
+    assert (job.status, job.result) == (COMPLETED, "HTTPS://EXAMPLE.COM/")
+    assert history[job.id] == [RUNNING, COMPLETED]
+    assert job.started_at and job.finished_at
+
+def test_requests_for_an_active_url_are_coalesced(manager, gate):
+    first, _ = manager.submit("https://example.com/")
+    assert gate.started.wait(TIMEOUT)
+    second, created = manager.submit("https://example.com/")
+    assert second is first and not created
+    other, created = manager.submit("https://other.example.com/")
+    assert other is not first and created
+
+    gate.release.set()
+    wait_finished(first)
+    wait_finished(other)
+    again, created = manager.submit("https://example.com/")
+    assert created and again is not first
+    wait_finished(again)
+
+def test_cancelled_queued_jobs_never_run(manager, gate, history):
+    running, _ = manager.submit("https://example.com/")
+    assert gate.started.wait(TIMEOUT)
+    queued, _ = manager.submit("https://other.example.com/")
+    assert queued.status == QUEUED
+
+    manager.cancel(queued.id)
+    assert queued.status == CANCELLED
+    gate.release.set()
+    wait_finished(running)
+    manager._executor.shutdown(wait=True)
+    assert history[queued.id] == [CANCELLED]
+    assert gate.ran == ["https://example.com/"]
+
+def test_cancel_before_start_is_not_reported_as_running(gate, history):
+    manager = JobManager(gate)
+    job = Job("https://example.com/")
+    manager._jobs[job.id] = job
+    manager._active_by_url[job.url] = job
+    # The worker picks the job up only after the cancel went through
+    manager.cancel(job.id)
+    manager._run(job)
+    assert history[job.id] == [CANCELLED]
+    assert job.start() is False
+    assert gate.ran == []
+
+def test_running_jobs_can_be_cancelled(manager, gate, history):
+    job, _ = manager.submit("https://example.com/")
+    assert gate.started.wait(TIMEOUT)
+    manager.cancel(job.id)
+    wait_finished(job)
+    assert history[job.id] == [RUNNING, CANCELLED]
+    # The URL can be queued again
+    assert manager.submit("https://example.com/")[1]
+
+def test_failures_are_recorded(history):
+    async def fail(job):
+        raise RuntimeError("boom")
+
+    manager = JobManager(fail)
+    job, _ = manager.submit("https://example.com/")
+    wait_finished(job)
+    manager._executor.shutdown(wait=True)
+    assert (job.status, job.error) == (FAILED, "boom")
+    assert history[job.id] == [RUNNING, FAILED]
+
+def test_finished_jobs_are_pruned(gate):
+    gate.release.set()
+    manager = JobManager(gate, keep_finished=2)
+    submitted = []
+    for i in range(4):
+        job, _ = manager.submit(f"https://example.com/{i}")
+        submitted.append(wait_finished(job))
+    manager.submit("https://example.com/last")
+    manager._executor.shutdown(wait=True)
+    kept = {job.url for job in manager.list()}
+    assert "https://example.com/0" not in kept
+    assert {"https://example.com/3", "https://example.com/last"} <= kept
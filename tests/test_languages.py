@@ -0,0 +1,72 @@
+"""
+Tests for code snippet language detection
+"""
+
+import pytest
+
+from site_doc_gen import Config
+from site_doc_gen.core import DocGen
+from site_doc_gen.languages import detect_language, language_from_classes, language_from_shebang
+from site_doc_gen.types import Page
+
+@pytest.mark.parametrize("classes, language", [
+    (["language-python"], "python"),
+    (["lang-js"], "javascript"),
+    (["highlight-python3"], "python"),
+    (["highlight-default", "language-python"], "python"),
+    (["language-auto", "lang-rust"], "rust"),
+    (["highlight-default"], None),
+    (["notranslate", "sourceCode"], None),
+])
+def test_language_from_classes(classes, language):
+    assert language_from_classes(classes) == language
+
+@pytest.mark.parametrize("code, language", [
+    ("#!/usr/bin/env python3\nprint(1)\n", "python"),
+    ("#!/bin/bash\necho hi\n", "bash"),
+    ("#!/usr/bin/env -S node --no-warnings\n", "javascript"),
+    ("print(1)\n", None),
+])
+def test_language_from_shebang(code, language):
+    assert language_from_shebang(code) == language
+
+def test_detect_language_prefers_class_hints_over_paths():
+    assert detect_language("x = 1", ["language-ruby"], path="script.py") == "ruby"
+    assert detect_language("x = 1", path="script.py") == "python"
+    assert detect_language("", default="text") == "text"
+
+@pytest.fixture
+def doc_gen(tmp_path):
+    def make(**options):
+        return DocGen(Config(output_dir=tmp_path, quiet=True, **options))
+    return make
+
+HTML = """
+<h2>Example</h2>
+<div class="highlight-default notranslate"><pre><code class="language-py">import os
+print(os.getcwd())
+</code></pre></div>
+<pre><code>#!/bin/sh
+echo hello
+</code></pre>
+"""
+
+def fences(lines):
+    return [line for line in lines if line.startswith("```")]
+
+def test_saved_fences_use_detected_languages(doc_gen):
+    generator = doc_gen()
+    page = Page(url="https://example.com/", title="Example", content=HTML)
+    assert fences(generator._page_body_lines(page)) == ["```python", "```", "```bash", "```"]
+
+def test_saved_fences_use_extracted_snippet_languages(doc_gen):
+    generator = doc_gen()
+    page = generator._extract_page("https://example.com/", f"<html><body><main>{HTML}</main></body></html>")
+    languages = [snippet.language for snippet in page.code_snippets]
+    assert languages and languages[0] == "python"
+    assert fences(generator._page_body_lines(page))[::2] == [f"```{language}" for language in languages]
+
+def test_saved_fences_without_detection_use_class_hints_only(doc_gen):
+    generator = doc_gen(detect_languages=False)
+    page = Page(url="https://example.com/", title="Example", content=HTML)
+    assert fences(generator._page_body_lines(page))[::2] == ["```python", "```text"]
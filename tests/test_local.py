@@ -0,0 +1,49 @@
+"""
+Tests for reading local source files
+"""
+
+import pytest
+
+from site_doc_gen import local
+from site_doc_gen.filetypes import FileClassifier
+from site_doc_gen.local import MMAP_MIN_BYTES, read_text
+
+@pytest.fixture
+def mapped(monkeypatch):
+    """Count the files read through mmap"""
+    calls = []
+    mmap = local.mmap.mmap
+
+    def spy(*args, **kwargs):
+        calls.append(args)
+        return mmap(*args, **kwargs)
+
+    monkeypatch.setattr(local.mmap, "mmap", spy)
+    return calls
+
+def test_files_under_the_default_cap_are_mapped(tmp_path, mapped):
+    text = "línea\n" * (MMAP_MIN_BYTES // 6)
+    path = tmp_path / "big.md"
+    path.write_text(text, encoding="utf-8")
+    classifier = FileClassifier(max_bytes=1024 * 1024)
+    assert classifier.accepts_size(path.stat().st_size)
+    assert read_text(path, classifier) == text
+    assert len(mapped) == 1
+
+def test_small_files_are_read_without_mmap(tmp_path, mapped):
+    path = tmp_path / "small.md"
+    path.write_text("# Title\n")
+    assert read_text(path, FileClassifier(max_bytes=1024)) == "# Title\n"
+    assert read_text(tmp_path / "small.md") == "# Title\n"
+    assert mapped == []
+
+def test_mapped_files_are_truncated_and_sniffed(tmp_path, mapped):
+    path = tmp_path / "big.txt"
+    path.write_bytes(b"a" * (2 * MMAP_MIN_BYTES))
+    assert read_text(path, FileClassifier(max_bytes=MMAP_MIN_BYTES)) is None
+    assert read_text(path, FileClassifier(max_bytes=10, truncate=True)) == "a" * 10
+
+    binary = tmp_path / "big.dat"
+    binary.write_bytes(b"\0" * (2 * MMAP_MIN_BYTES))
+    assert read_text(binary, FileClassifier()) is None
+    assert len(mapped) == 2
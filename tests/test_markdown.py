@@ -0,0 +1,85 @@
+"""
+Tests for converting documentation to markdown: worker results and the conversion cache
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from site_doc_gen import markdown
+from site_doc_gen.markdown import MarkdownConverter
+from site_doc_gen.types import Documentation, Page
+
+def make_docs(count=6):
+    return Documentation(
+        pages=[
+            Page(
+                url=f"https://example.com/{i}",
+                title=f"Page {i}",
+                content=f"<p>Body {i}</p><ul><li>item {i}</li></ul>",
+            )
+            for i in range(count)
+        ],
+        base_url="https://example.com/",
+    )
+
+def test_pages_keep_their_order_when_workers_finish_out_of_order(monkeypatch):
+    docs = make_docs()
+    finished = []
+    lock = threading.Lock()
+    convert = markdown._html_to_markdown
+
+    def slow_first(html):
+        # Earlier pages take longest, so results complete in reverse
+        index = int(html.split("Body ")[1].split("<")[0])
+        time.sleep(0.05 * (len(docs.pages) - index))
+        with lock:
+            finished.append(index)
+        return convert(html)
+
+    monkeypatch.setattr(markdown, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(markdown, "_html_to_markdown", slow_first)
+    output = MarkdownConverter(docs, workers=len(docs.pages)).convert()
+
+    assert finished == sorted(finished, reverse=True)
+    positions = [output.index(f"Body {i}") for i in range(len(docs.pages))]
+    assert positions == sorted(positions)
+    for i in range(len(docs.pages)):
+        # Each page's title is followed by its own converted body
+        assert output.index(f"# Page {i}") < positions[i]
+        assert f"- item {i}" in output
+
+def test_parallel_conversion_matches_serial():
+    docs = make_docs()
+    assert MarkdownConverter(docs, workers=2).convert() == MarkdownConverter(docs).convert()
+
+def test_converted_pages_are_cached(tmp_path):
+    docs = make_docs(3)
+    first = MarkdownConverter(docs, cache_dir=tmp_path)
+    output = first.convert()
+    assert (first.cache_hits, first.cache_misses) == (0, 3)
+
+    second = MarkdownConverter(docs, cache_dir=tmp_path)
+    assert second.convert() == output
+    assert (second.cache_hits, second.cache_misses) == (3, 0)
+
+def test_option_changes_invalidate_the_cache(tmp_path, monkeypatch):
+    docs = make_docs(2)
+    MarkdownConverter(docs, cache_dir=tmp_path).convert()
+
+    monkeypatch.setattr(markdown, "MARKDOWNIFY_OPTIONS", {**markdown.MARKDOWNIFY_OPTIONS, "bullets": "*"})
+    converter = MarkdownConverter(docs, cache_dir=tmp_path)
+    output = converter.convert()
+    assert (converter.cache_hits, converter.cache_misses) == (0, 2)
+    assert "* item 0" in output and "- item 0" not in output
+
+@pytest.mark.parametrize("edit", ["<p>Body 0 edited</p>", "<p>Body 0</p>"])
+def test_only_changed_pages_miss_the_cache(tmp_path, edit):
+    docs = make_docs(2)
+    MarkdownConverter(docs, cache_dir=tmp_path).convert()
+    docs.pages[0].content = edit
+    converter = MarkdownConverter(docs, cache_dir=tmp_path)
+    converter.convert()
+    assert (converter.cache_hits, converter.cache_misses) == (1, 1)
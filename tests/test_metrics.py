@@ -0,0 +1,113 @@
+"""
+Tests for latency histograms and the Prometheus exposition of run metrics
+"""
+
+import re
+
+import pytest
+
+from site_doc_gen.metrics import Histogram, Metrics
+
+def test_bucket_bounds_are_inclusive():
+    histogram = Histogram((1.0, 2.0))
+    for value in (0.0, 1.0, 1.0000001, 2.0, 2.5):
+        histogram.observe(value)
+    # le="1.0" holds values up to and including 1.0; the last slot is +Inf
+    assert histogram.counts == [2, 2, 1]
+    assert histogram.count == 5
+    assert histogram.sum == pytest.approx(6.5000001)
+    assert histogram.max == 2.5
+
+def test_quantiles_interpolate_within_buckets():
+    histogram = Histogram((1.0, 2.0, 4.0))
+    for value in (0.5, 1.5, 1.5, 3.0):
+        histogram.observe(value)
+    assert histogram.quantile(0.25) == pytest.approx(1.0)
+    assert histogram.quantile(0.5) == pytest.approx(1.5)
+    # Capped at the largest value seen rather than the bucket's bound
+    assert histogram.quantile(1.0) == 3.0
+    assert Histogram().quantile(0.5) == 0.0
+
+def test_overflow_quantiles_use_the_maximum():
+    histogram = Histogram((1.0,))
+    for value in (5.0, 7.0):
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == pytest.approx(4.0)
+    assert histogram.quantile(0.99) <= 7.0
+    assert histogram.summary()["max_ms"] == 7000.0
+
+def test_summary():
+    metrics = Metrics()
+    metrics.observe("render", 0.002)
+    metrics.observe("connect", 0.004)
+    metrics.observe("custom", 1.0)
+    summary = metrics.summary()
+    # Known stages in pipeline order, then any others
+    assert list(summary["stages"]) == ["connect", "render", "custom"]
+    assert summary["stages"]["render"] == {
+        "count": 1, "total_seconds": 0.002, "mean_ms": 2.0, "p50_ms": 2.0, "p95_ms": 2.0, "max_ms": 2.0
+    }
+
+def test_parents_receive_totals_and_keep_them_on_reset():
+    parent = Metrics()
+    child = Metrics(parent=parent)
+    child.observe_request("example.com", 0.1)
+    child.add_bytes(received=10, written=5)
+    child.add_error()
+    child.reset()
+    assert child.summary()["requests"] == 0
+    summary = parent.summary()
+    assert (summary["requests"], summary["errors"], summary["bytes_in"], summary["bytes_out"]) == (1, 1, 10, 5)
+
+def samples(text):
+    """Parse exposition lines into {(name, labels): value}"""
+    parsed = {}
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        match = re.fullmatch(r'(\w+)(?:\{(.*)\})? (\S+)', line)
+        assert match, line
+        parsed[match.group(1), match.group(2) or ""] = float(match.group(3))
+    return parsed
+
+def test_prometheus_histograms_are_cumulative():
+    metrics = Metrics()
+    for seconds in (0.005, 0.007, 0.3, 20.0):
+        metrics.observe("parse", seconds)
+    text = metrics.prometheus()
+    assert text.endswith("\n")
+    assert "# TYPE site_doc_gen_stage_seconds histogram" in text
+    values = samples(text)
+
+    def bucket(le):
+        return values["site_doc_gen_stage_seconds_bucket", f'stage="parse",le="{le}"']
+
+    assert bucket("0.005") == 1
+    assert bucket("0.01") == 2
+    assert bucket("0.25") == 2
+    assert bucket("0.5") == 3
+    assert bucket("10.0") == 3
+    assert bucket("+Inf") == 4
+    assert values["site_doc_gen_stage_seconds_count", 'stage="parse"'] == 4
+    assert values["site_doc_gen_stage_seconds_sum", 'stage="parse"'] == pytest.approx(20.312)
+
+def test_prometheus_counters():
+    metrics = Metrics()
+    metrics.observe_request("b.example", 0.1)
+    metrics.observe_request("a.example", 0.2)
+    metrics.observe_request("a.example", 0.2)
+    metrics.add_bytes(received=100, written=40)
+    values = samples(metrics.prometheus(prefix="docs"))
+    assert values["docs_requests_total", 'host="a.example"'] == 2
+    assert values["docs_host_latency_seconds_count", 'host="b.example"'] == 1
+    assert values["docs_bytes_received_total", ""] == 100
+    assert values["docs_bytes_written_total", ""] == 40
+    assert values["docs_request_errors_total", ""] == 0
+
+def test_prometheus_labels_are_escaped():
+    metrics = Metrics()
+    metrics.observe_request('we"ird\\host\nname', 0.1)
+    text = metrics.prometheus()
+    assert 'site_doc_gen_requests_total{host="we\\"ird\\\\host\\nname"} 1' in text
+    # Every sample stays on one line
+    assert all(line.startswith(("#", "site_doc_gen_")) for line in text.splitlines())
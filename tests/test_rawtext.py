@@ -0,0 +1,60 @@
+"""
+Tests for line-based scanning of raw markdown
+"""
+
+import pytest
+
+from site_doc_gen.rawtext import (
+    code_fence, heading_offsets, markdown_blocks, markdown_headings, markdown_sections
+)
+
+def headings(text):
+    return [(heading.level, heading.text) for heading in markdown_headings(text)]
+
+def test_headings_and_blocks():
+    text = "# Title\n\nIntro line\ncontinued.\n\n## Usage ##\n\n```python\n# not a heading\n```\nAfter.\n"
+    assert headings(text) == [(1, "Title"), (2, "Usage")]
+    assert list(markdown_blocks(text)) == [
+        ("heading", 1, "Title", ""),
+        ("prose", 0, "Intro line\ncontinued.", ""),
+        ("heading", 2, "Usage", ""),
+        ("code", 0, "# not a heading", "python"),
+        ("prose", 0, "After.", ""),
+    ]
+
+def test_unterminated_fences_run_to_the_end():
+    text = "# Title\n\n```\n# inside\n\ncode\n"
+    assert headings(text) == [(1, "Title")]
+    assert list(markdown_blocks(text)) == [
+        ("heading", 1, "Title", ""),
+        ("code", 0, "# inside\n\ncode", ""),
+    ]
+    assert markdown_sections(text) == [("Title", "title", "")]
+
+def test_tilde_fences():
+    text = "~~~ sh\n# comment\n```\n# still code\n~~~\n# Heading\n"
+    assert headings(text) == [(1, "Heading")]
+    assert list(markdown_blocks(text)) == [
+        ("code", 0, "# comment\n```\n# still code", "sh"),
+        ("heading", 1, "Heading", ""),
+    ]
+
+def test_fences_close_on_a_run_at_least_as_long():
+    text = "````md\n```\n# Nested\n```\n````\n# After\n"
+    assert headings(text) == [(1, "After")]
+    assert list(markdown_blocks(text))[0] == ("code", 0, "```\n# Nested\n```", "md")
+    # A longer closing run also closes it
+    assert headings("```\n# In\n`````\n# Out\n") == [(1, "Out")]
+
+@pytest.mark.parametrize("line", ["``` `inline` ```", "    ```"])
+def test_lines_that_are_not_fences(line):
+    text = f"{line}\n# Heading\n"
+    assert headings(text) == [(1, "Heading")]
+
+def test_heading_offsets_skip_fenced_code():
+    text = "# Ünïcode\n```\n# no\n```\n## Next\n"
+    assert heading_offsets(text) == [(1, "Ünïcode", 0), (2, "Next", text.encode().index(b"## Next"))]
+
+def test_code_fence_outlasts_backtick_runs():
+    assert code_fence("plain") == "```"
+    assert code_fence("a ```` b") == "`````"
@@ -0,0 +1,59 @@
+"""
+Tests for server-side rendering of generated markdown
+"""
+
+import pytest
+
+from site_doc_gen.render import HTMLRenderer
+from site_doc_gen.safe_markdown import is_safe_url
+
+def body(html: str) -> str:
+    return html.split("<body>", 1)[1]
+
+@pytest.fixture
+def renderer(tmp_path):
+    return HTMLRenderer(tmp_path)
+
+def test_block_html_is_escaped(renderer):
+    html = body(renderer.to_html("# Title\n\n<script>alert(1)</script>\n", "t"))
+    assert "<script>" not in html
+    assert "&lt;script&gt;alert(1)&lt;/script&gt;" in html
+
+def test_inline_html_is_escaped(renderer):
+    html = body(renderer.to_html("before <img src=x onerror=alert(1)> after", "t"))
+    assert "<img" not in html
+    assert "&lt;img src=x onerror=alert(1)&gt;" in html
+
+def test_script_urls_are_dropped(renderer):
+    html = body(renderer.to_html(
+        "[a](javascript:alert(1)) [b]( JaVa\tScript:x) [c](https://example.com) [d](../index.html)", "t"
+    ))
+    assert "javascript" not in html.lower()
+    assert '<a href="https://example.com">c</a>' in html
+    assert '<a href="../index.html">d</a>' in html
+
+def test_snippet_anchors_are_kept(renderer):
+    html = body(renderer.to_html('<a id="snippet-0123abcd"></a>\n\n```python\nx = 1\n```\n', "t"))
+    assert '<a id="snippet-0123abcd"></a>' in html
+    assert "&lt;a" not in html
+
+def test_title_is_escaped(renderer):
+    assert "<title>&lt;b&gt;</title>" in renderer.to_html("text", "<b>")
+
+def test_rendered_files_are_escaped(renderer, tmp_path):
+    source = tmp_path / "page.md"
+    source.write_text("<script>alert(1)</script>\n")
+    target = renderer.render(source)
+    assert "&lt;script&gt;" in target.read_text()
+
+@pytest.mark.parametrize("url, safe", [
+    ("https://example.com", True),
+    ("page.html#part", True),
+    ("#anchor", True),
+    ("mailto:a@example.com", True),
+    ("javascript:alert(1)", False),
+    ("data:text/html;base64,xx", False),
+    ("\x01java script:x", False),
+])
+def test_is_safe_url(url, safe):
+    assert is_safe_url(url) is safe
@@ -0,0 +1,98 @@
+"""
+Tests for the full-text search index and its incremental updates
+"""
+
+import sqlite3
+
+import pytest
+
+from site_doc_gen import Config
+from site_doc_gen.core import DocGen
+from site_doc_gen.search import SearchIndex, page_sections
+from site_doc_gen.types import Documentation, Page
+
+def page(name, body):
+    return Page(
+        url=f"https://example.com/{name}",
+        title=name.title(),
+        content=f"# {name.title()}\n\n{body}\n",
+        content_format="markdown",
+    )
+
+@pytest.fixture
+def generator(tmp_path):
+    return DocGen(Config(output_dir=tmp_path, quiet=True, snippet_index=False))
+
+def generate(generator, *pages):
+    generator._save_documentation(Documentation(pages=list(pages), base_url="https://example.com/"))
+
+def fts_rows(db_path):
+    """Every indexed section as (page url, heading, body), read back through FTS"""
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return sorted(conn.execute(
+            "SELECT pages.url, sections_fts.heading, sections_fts.body FROM sections_fts"
+            " JOIN sections ON sections.id = sections_fts.rowid"
+            " JOIN pages ON pages.id = sections.page_id"
+        ))
+    finally:
+        conn.close()
+
+def matches(db_path, term):
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return conn.execute(
+            "SELECT count(*) FROM sections_fts WHERE sections_fts MATCH ?", (term,)
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+def test_regenerated_sites_are_updated_in_place(generator, tmp_path):
+    db_path = tmp_path / "search.db"
+    generate(
+        generator,
+        page("guide", "Install with pip."),
+        page("api", "Call frobnicate."),
+        page("faq", "Ask about widgets."),
+    )
+    assert matches(db_path, "frobnicate") == 1
+    assert matches(db_path, "widgets") == 1
+
+    generate(
+        generator,
+        page("guide", "Install with pip."),
+        page("api", "Call defenestrate."),
+        page("changelog", "Version one."),
+    )
+    assert fts_rows(db_path) == [
+        ("https://example.com/api", "Api", "Call defenestrate."),
+        ("https://example.com/changelog", "Changelog", "Version one."),
+        ("https://example.com/guide", "Guide", "Install with pip."),
+    ]
+    # The FTS index itself forgot the old content, not just the sections table
+    assert matches(db_path, "frobnicate") == 0
+    assert matches(db_path, "widgets") == 0
+    assert matches(db_path, "defenestrate") == 1
+
+def test_update_counts(tmp_path):
+    guide, api, faq = page("guide", "One."), page("api", "Two."), page("faq", "Three.")
+    with SearchIndex(tmp_path / "search.db") as index:
+        assert index.update_site("site", [(guide, "a.md"), (api, "a.md"), (faq, "a.md")]) == {
+            "added": 3, "updated": 0, "unchanged": 0, "removed": 0
+        }
+        changed = page("api", "Changed.")
+        assert index.update_site("site", [(guide, "b.md"), (changed, "b.md")]) == {
+            "added": 0, "updated": 1, "unchanged": 1, "removed": 1
+        }
+        # Moving an unchanged page only updates its path
+        assert [hit["path"] for hit in index.search("one")] == ["b.md"]
+        assert index.search("three") == []
+        # Other sites are left alone
+        index.update_site("other", [(faq, "c.md")])
+        index.update_site("site", [])
+        assert [hit["site"] for hit in index.search("three")] == ["other"]
+
+def test_html_pages_are_split_at_headings():
+    html = "<h1>Title</h1><p>Intro</p><h2>Next Step</h2><ul><li><p>Nested</p></li></ul><pre>code</pre>"
+    sections = page_sections(Page(url="https://example.com/", title="T", content=html))
+    assert sections == [("Title", "title", "Intro"), ("Next Step", "next-step", "Nested\ncode")]
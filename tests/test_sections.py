@@ -0,0 +1,103 @@
+"""
+Tests for the section index of single-file documentation
+"""
+
+import pytest
+
+from site_doc_gen import Config
+from site_doc_gen.core import DocGen
+from site_doc_gen.sections import SECTIONS_FILE, SectionIndex, SectionOffsets
+from site_doc_gen.types import Documentation, Page
+
+GUIDE = """Intro to the guide.
+
+## Installation
+
+Run the installer.
+
+### Über options
+
+```bash
+# not a heading
+install --all
+```
+
+## Usage
+
+Use it.
+"""
+
+@pytest.fixture
+def index(tmp_path):
+    generator = DocGen(Config(output_dir=tmp_path, quiet=True, snippet_index=False))
+    docs = Documentation(
+        pages=[
+            Page(url="https://example.com/guide", title="Guide", content=GUIDE, content_format="markdown"),
+            Page(url="https://example.com/api", title="API", content="## Functions\n\nNone yet.\n", content_format="markdown"),
+        ],
+        base_url="https://example.com/",
+    )
+    generator._save_documentation(docs)
+    (sidecar,) = tmp_path.glob(f"*/{SECTIONS_FILE}")
+    return SectionIndex(sidecar)
+
+def text(index, section_id):
+    return index.read(section_id).decode("utf-8")
+
+def test_sections_cover_pages_and_headings(index):
+    assert [(section["kind"], section["level"], section["title"]) for section in index.sections] == [
+        ("page", 3, "Guide"),
+        ("heading", 2, "Installation"),
+        ("heading", 3, "Über options"),
+        ("heading", 2, "Usage"),
+        ("page", 3, "API"),
+        ("heading", 2, "Functions"),
+    ]
+    assert index.current
+    assert index.total() == 6
+    assert index.total(pages_only=True) == 2
+
+def test_offsets_point_at_section_starts(index):
+    document = index.document.read_bytes()
+    assert index.size == len(document)
+    for i, section in enumerate(index.sections):
+        title = text(index, i).splitlines()[0]
+        assert title == "#" * section["level"] + " " + section["title"]
+
+def test_pages_end_where_the_next_page_starts(index):
+    guide = text(index, index.find("guide"))
+    assert guide.startswith("### Guide\n\nSource: https://example.com/guide\n")
+    assert guide.rstrip().endswith("---")
+    assert "### API" not in guide
+    assert text(index, index.find("api")).rstrip().endswith("---")
+
+def test_headings_end_at_the_next_sibling_or_the_page_body(index):
+    installation = text(index, index.find("installation"))
+    assert "### Über options" in installation
+    assert "# not a heading" in installation
+    assert "## Usage" not in installation
+    usage = text(index, index.find("usage"))
+    assert usage.rstrip() == "## Usage\n\nUse it."
+
+def test_window_and_find(index):
+    assert [entry["id"] for entry in index.window(offset=1, limit=2)] == [1, 2]
+    assert [entry["title"] for entry in index.window(pages_only=True)] == ["Guide", "API"]
+    assert index.find("über-options") == 2
+    assert index.find("missing") is None
+
+def test_index_goes_stale_when_the_document_changes(index):
+    with open(index.document, "a", encoding="utf-8") as file:
+        file.write("more\n")
+    assert not index.current
+
+def test_offsets_count_encoded_bytes():
+    offsets = SectionOffsets()
+    offsets.add(["# Dокументация", ""])
+    offsets.add_page("Ünïcode", "https://example.com/", ["### Ünïcode", ""])
+    offsets.add_body(["é" * 3, "## Næxt", "body"])
+    document = "\n".join(["# Dокументация", "", "### Ünïcode", "", "é" * 3, "## Næxt", "body"]).encode("utf-8")
+    sections = offsets.to_json(len(document), "")["sections"]
+    assert [document[section["start"]:section["end"]] for section in sections] == [
+        "### Ünïcode\n\nééé\n## Næxt\nbody".encode("utf-8"),
+        "## Næxt\nbody".encode("utf-8"),
+    ]
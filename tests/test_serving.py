@@ -0,0 +1,139 @@
+"""
+Tests for serving generated output with precompressed variants, ETags and ranges
+"""
+
+import gzip
+import os
+
+import pytest
+from flask import Flask
+
+from serving import ManifestCache, content_version, send_output_file
+from site_doc_gen import Config
+from site_doc_gen.core import PRECOMPRESS_MIN_BYTES, DocGen
+from site_doc_gen.types import Documentation
+
+TEXT = "# Documentation\n\n" + "Some repeated text.\n" * 200
+
+@pytest.fixture
+def generator(tmp_path):
+    return DocGen(Config(output_dir=tmp_path / "output", quiet=True))
+
+@pytest.fixture
+def site(generator):
+    site_dir = generator.config.output_dir / "example"
+    site_dir.mkdir()
+    generator._write_output(site_dir / "documentation.md", TEXT)
+    generator._write_output(site_dir / "small.md", "# Small\n")
+    generator._write_manifest(site_dir, Documentation(pages=[], base_url="https://example.com/"))
+    return site_dir
+
+@pytest.fixture
+def client(generator, site):
+    output_dir = generator.config.output_dir
+    manifests = ManifestCache(output_dir)
+    app = Flask(__name__)
+
+    @app.route("/output/<path:filename>")
+    def serve(filename):
+        return send_output_file(output_dir, filename, manifests)
+
+    @app.route("/version/<path:filename>")
+    def version(filename):
+        return content_version(filename, manifests) or ""
+
+    return app.test_client()
+
+def entry(generator, site, name="documentation.md"):
+    return generator._written_files[site / name]
+
+def test_sidecars_are_written_for_large_files_only(generator, site):
+    assert entry(generator, site)["encodings"] == ["gzip"]
+    assert gzip.decompress((site / "documentation.md.gz").read_bytes()) == TEXT.encode()
+    assert entry(generator, site, "small.md")["encodings"] == []
+    assert not (site / "small.md.gz").exists()
+
+def test_stale_sidecars_are_removed(generator, site):
+    generator._write_output(site / "documentation.md", "x" * (PRECOMPRESS_MIN_BYTES - 1))
+    assert not (site / "documentation.md.gz").exists()
+
+def test_sidecars_are_skipped_when_disabled(tmp_path):
+    generator = DocGen(Config(output_dir=tmp_path, quiet=True, precompress=False))
+    path = tmp_path / "page.md"
+    generator._write_output(path, TEXT)
+    assert generator._written_files[path]["encodings"] == []
+    assert not (tmp_path / "page.md.gz").exists()
+
+def test_identity_response_has_the_content_etag(client, generator, site):
+    digest = entry(generator, site)["sha256"]
+    response = client.get("/output/example/documentation.md")
+    assert response.status_code == 200
+    assert response.get_etag() == (digest, False)
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert response.data == TEXT.encode()
+
+    revalidated = client.get("/output/example/documentation.md", headers={"If-None-Match": f'"{digest}"'})
+    assert revalidated.status_code == 304
+
+def test_gzip_sidecar_is_chosen(client, generator, site):
+    digest = entry(generator, site)["sha256"]
+    response = client.get("/output/example/documentation.md", headers={"Accept-Encoding": "br;q=1, gzip;q=0.5"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.get_etag() == (f"{digest}-gzip", False)
+    assert gzip.decompress(response.data) == TEXT.encode()
+
+    refused = client.get("/output/example/documentation.md", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "Content-Encoding" not in refused.headers
+
+def test_ranges_are_served_from_the_identity_file(client):
+    response = client.get(
+        "/output/example/documentation.md",
+        headers={"Range": "bytes=2-14", "Accept-Encoding": "gzip"}
+    )
+    assert response.status_code == 206
+    assert "Content-Encoding" not in response.headers
+    assert response.data == TEXT.encode()[2:15]
+
+def test_versioned_urls_are_immutable(client, generator, site):
+    digest = entry(generator, site)["sha256"]
+    assert client.get("/version/example/documentation.md").data.decode() == digest
+    response = client.get(f"/output/example/documentation.md?v={digest}")
+    assert "immutable" in response.headers["Cache-Control"]
+    stale = client.get("/output/example/documentation.md?v=0123")
+    assert stale.headers["Cache-Control"] == "no-cache"
+
+def test_same_size_edits_are_not_served_with_the_old_digest(client, generator, site):
+    digest = entry(generator, site)["sha256"]
+    path = site / "documentation.md"
+    edited = TEXT.replace("Some", "Same").encode()
+    assert len(edited) == len(TEXT.encode())
+    path.write_bytes(edited)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    response = client.get(f"/output/example/documentation.md?v={digest}", headers={"Accept-Encoding": "gzip"})
+    assert response.data == edited
+    assert response.get_etag()[0] != digest
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert client.get("/version/example/documentation.md").data == b""
+
+def test_missing_sidecar_falls_back_to_identity(client, site):
+    (site / "documentation.md.gz").unlink()
+    response = client.get("/output/example/documentation.md", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert response.data == TEXT.encode()
+
+def test_manifest_lookup_stays_in_the_output_directory(generator, site, tmp_path):
+    outside = tmp_path / "manifest.json"
+    outside.write_text('{"files": {"x": {"size": 1, "sha256": "bad"}}}')
+    manifests = ManifestCache(generator.config.output_dir)
+    assert manifests.lookup("../x") is None
+    assert manifests.lookup("example/documentation.md")["sha256"] == entry(generator, site)["sha256"]
+
+def test_unknown_files_are_not_found(client):
+    assert client.get("/output/example/missing.md").status_code == 404
+    assert client.get("/output/../secret").status_code == 404
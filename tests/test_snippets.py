@@ -0,0 +1,113 @@
+"""
+Tests for the site-wide snippet index and rendering repeated snippets once
+"""
+
+import json
+
+import pytest
+
+from site_doc_gen import Config
+from site_doc_gen.core import DocGen
+from site_doc_gen.markdown import MarkdownConverter
+from site_doc_gen.snippets import SnippetIndex, SnippetStore, snippet_hash
+from site_doc_gen.types import CodeSnippet, Documentation, Page
+
+INSTALL = "pip install site-doc-gen --upgrade --pre\nsite-doc-gen --help"
+
+def page(name, *snippets):
+    return Page(
+        url=f"https://example.com/{name}",
+        title=name.title(),
+        content=f"<p>{name}</p>",
+        code_snippets=list(snippets),
+    )
+
+@pytest.fixture
+def docs():
+    return Documentation(
+        pages=[
+            page("install", CodeSnippet(code=INSTALL, language="text", context="Install it:")),
+            page("quickstart", CodeSnippet(code="    " + INSTALL.replace("\n", "  \n    ") + "\n", language="bash")),
+            page("faq", CodeSnippet(code=INSTALL + "\r\n", language="text"), CodeSnippet(code="ls", language="bash")),
+            page("usage", CodeSnippet(code="ls", language="bash")),
+        ],
+        base_url="https://example.com/",
+    )
+
+def test_copies_across_pages_are_merged(docs):
+    index = SnippetIndex.from_pages(docs.pages)
+    assert len(index.entries) == 2
+    assert index.total == 5
+
+    entry = index.entry_for(docs.pages[1].code_snippets[0])
+    assert entry is index.entry_for(docs.pages[0].code_snippets[0])
+    assert entry.hash == snippet_hash(INSTALL)
+    assert entry.code == INSTALL
+    # The first copy had no language; a later copy supplied one
+    assert entry.language == "bash"
+    assert entry.occurrences == 3
+    assert entry.pages == [f"https://example.com/{name}" for name in ("install", "quickstart", "faq")]
+    assert entry.shared
+    # Too short to be worth a reference
+    assert not index.entry_for(docs.pages[3].code_snippets[0]).shared
+
+def test_repeats_on_one_page_list_the_page_once():
+    snippets = [CodeSnippet(code=INSTALL, language="bash"), CodeSnippet(code=INSTALL, language="bash")]
+    index = SnippetIndex.from_pages([page("install", *snippets)])
+    (entry,) = index.entries.values()
+    assert (entry.occurrences, entry.pages) == (2, ["https://example.com/install"])
+
+def test_index_json_lists_most_repeated_first(docs):
+    data = SnippetIndex.from_pages(docs.pages).to_json(docs.base_url)
+    assert (data["total_snippets"], data["unique_snippets"], data["shared_snippets"]) == (5, 2, 2)
+    assert data["languages"] == ["bash"]
+    assert [snippet["occurrences"] for snippet in data["snippets"]] == [3, 2]
+
+def test_sites_are_stored_separately(tmp_path, docs):
+    index = SnippetIndex.from_pages(docs.pages)
+    other = SnippetIndex.from_pages([page("setup", CodeSnippet(code=INSTALL, language="bash"))])
+    with SnippetStore(tmp_path / "snippets.db") as store:
+        store.replace_site("a", index)
+        store.replace_site("b", other)
+        # Replacing a site does not duplicate its snippets
+        store.replace_site("a", index)
+
+        found = store.find(contains="--upgrade")
+        assert sorted((hit["site"], hit["occurrences"]) for hit in found) == [("a", 3), ("b", 1)]
+        assert {hit["hash"] for hit in found} == {snippet_hash(INSTALL)}
+        assert [hit["pages"][0]["title"] for hit in store.find(contains="--upgrade", site="a")] == ["Install"]
+        assert [hit["code"] for hit in store.find(language="bash", site="a")] == [INSTALL, "ls"]
+
+        store.remove_site("a")
+        assert [hit["site"] for hit in store.find(language="bash")] == ["b"]
+
+def test_shared_snippets_are_rendered_once(docs):
+    markdown = MarkdownConverter(docs).convert()
+    anchor = f"snippet-{snippet_hash(INSTALL)}"
+    assert markdown.count("pip install site-doc-gen") == 1
+    assert markdown.count(f'<a id="{anchor}"></a>') == 1
+    assert "```bash\npip install" in markdown
+    assert "*Also used on: Quickstart, Faq.*" in markdown
+    assert markdown.count(f"[Install](#{anchor}), used 3 times.*") == 2
+    # Short snippets are repeated in full
+    assert markdown.count("```bash\nls\n```") == 2
+
+def test_converters_can_be_reused(docs):
+    converter = MarkdownConverter(docs)
+    first = converter.convert()
+    # A second run starts over rather than referring back into the first output
+    assert converter.convert() == first
+    assert first.count(f'<a id="snippet-{snippet_hash(INSTALL)}"></a>') == 1
+
+def test_deduplication_can_be_disabled(docs):
+    markdown = MarkdownConverter(docs, dedupe_snippets=False).convert()
+    assert markdown.count("pip install site-doc-gen") == 3
+    assert "<a id=" not in markdown
+
+def test_saved_sites_write_the_snippet_index(tmp_path, docs):
+    generator = DocGen(Config(output_dir=tmp_path, quiet=True, search_index=False))
+    generator._save_documentation(docs)
+    data = json.loads((tmp_path / "example_com" / "snippets.json").read_text())
+    assert data["unique_snippets"] == 2
+    with SnippetStore(tmp_path / "snippets.db") as store:
+        assert [hit["site"] for hit in store.find(contains="--upgrade")] == ["example_com"]
@@ -0,0 +1,30 @@
+"""
+Startup regression tests: importing the package and running the CLI's --help
+must not load the dependencies only a crawl needs
+"""
+
+import pytest
+
+from benchmarks.startup import HEAVY, TARGETS, Target, run_target
+
+# What the site-doc-gen console script runs
+ENTRY_POINT = Target(
+    ["-c", "import sys; from site_doc_gen.cli import run; sys.argv = ['site-doc-gen', '--help']; run()"],
+    HEAVY
+)
+
+CHECKED = {name: target for name, target in TARGETS.items() if target.forbidden}
+CHECKED["cli.entry_point"] = ENTRY_POINT
+
+@pytest.mark.parametrize("name", sorted(CHECKED))
+def test_no_heavy_imports(name):
+    target = CHECKED[name]
+    loaded = run_target(target)["packages"]
+    assert not loaded.intersection(target.forbidden), (
+        f"{name} imports {', '.join(sorted(loaded.intersection(target.forbidden)))}"
+    )
+
+def test_heavy_imports_are_detected():
+    # Guards the check itself: importtime output is parsed into top-level packages
+    loaded = run_target(Target(["-c", "import site_doc_gen.core"]))["packages"]
+    assert {"aiohttp", "bs4"} <= loaded
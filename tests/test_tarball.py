@@ -0,0 +1,143 @@
+"""
+Tests for streaming GitHub repository tarballs
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from multidict import CIMultiDict
+
+from site_doc_gen.github import stream_tarball
+from site_doc_gen.warc import ArchivedResponse
+
+def make_tarball(files):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for path, data in files.items():
+            info = tarfile.TarInfo(f"owner-repo-0123abc/{path}")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+class FakeClient:
+    """Serves one tarball for every request, like GitHubClient.stream()"""
+    api_url = "https://api.github.test"
+
+    def __init__(self, body: bytes, status: int = 200):
+        self.body = body
+        self.status = status
+
+    @contextlib.asynccontextmanager
+    async def stream(self, url):
+        yield ArchivedResponse(url, self.status, "OK", CIMultiDict(), self.body)
+
+@pytest.fixture(scope="module")
+def files():
+    # Incompressible, so the download is many chunks and fills the pipe
+    return {
+        "README.md": b"# Repo\n",
+        "docs/guide.md": b"Guide\n" * 100,
+        "data/blob.bin": os.urandom(3 * 1024 * 1024),
+        "src/main.py": b"print('hi')\n",
+    }
+
+@pytest.fixture(scope="module")
+def tarball(files):
+    return make_tarball(files)
+
+def test_selected_files_are_handled(tarball):
+    handled = {}
+
+    async def main():
+        return await stream_tarball(
+            FakeClient(tarball), "owner", "repo",
+            select=lambda path, size: path.endswith(".md"),
+            handle=lambda path, data: handled.__setitem__(path, data),
+        )
+
+    assert asyncio.run(main()) == 2
+    assert handled == {"README.md": b"# Repo\n", "docs/guide.md": b"Guide\n" * 100}
+
+def test_max_bytes_and_content_filter(tarball):
+    handled = {}
+
+    async def main():
+        return await stream_tarball(
+            FakeClient(tarball), "owner", "repo",
+            select=lambda path, size: True,
+            handle=lambda path, data: handled.__setitem__(path, data),
+            max_bytes=4,
+            accept_content=lambda head: b"\0" not in head and not head.startswith(b"print"),
+        )
+
+    asyncio.run(main())
+    assert handled["README.md"] == b"# Re"
+    assert "src/main.py" not in handled
+
+def test_concurrent_streams_do_not_exhaust_the_default_executor(tarball, files):
+    """Many archives streaming at once with a one-thread executor must all finish"""
+    streams = 6
+    counts = []
+
+    def slow_handle(path, data):
+        time.sleep(0.01)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=1))
+        results = await asyncio.wait_for(asyncio.gather(*(
+            stream_tarball(FakeClient(tarball), "owner", f"repo{i}", lambda path, size: True, slow_handle)
+            for i in range(streams)
+        )), timeout=60)
+        counts.extend(results)
+
+    asyncio.run(main())
+    assert counts == [len(files)] * streams
+
+def test_files_are_handled_on_the_event_loop(tarball):
+    threads = set()
+
+    def handle(path, data):
+        asyncio.get_running_loop()  # Raises off the loop thread
+        threads.add(threading.current_thread())
+
+    async def main():
+        return await stream_tarball(FakeClient(tarball), "owner", "repo", lambda path, size: True, handle)
+
+    assert asyncio.run(main()) == 4
+    assert threads == {threading.current_thread()}
+
+def test_handler_errors_are_raised(tarball):
+    def handle(path, data):
+        raise ValueError(f"bad file {path}")
+
+    async def main():
+        return await stream_tarball(FakeClient(tarball), "owner", "repo", lambda path, size: True, handle)
+
+    with pytest.raises(ValueError, match="bad file"):
+        asyncio.run(main())
+
+def test_failed_download_returns_nothing(tarball):
+    async def main():
+        return await stream_tarball(FakeClient(tarball, status=404), "owner", "repo", lambda path, size: True, print)
+
+    assert asyncio.run(main()) == 0
+
+def test_reader_threads_finish(tarball):
+    before = threading.active_count()
+
+    async def main():
+        await stream_tarball(FakeClient(tarball), "owner", "repo", lambda path, size: False, print)
+
+    asyncio.run(main())
+    deadline = time.monotonic() + 5
+    while threading.active_count() > before and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert threading.active_count() <= before
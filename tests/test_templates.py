@@ -0,0 +1,35 @@
+"""
+Smoke checks for the web interface templates
+"""
+
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from conftest import ROOT
+
+TEMPLATES = sorted((ROOT / "web_interface" / "templates").glob("*.html"))
+
+# Inline scripts only; <script src=...> bodies are empty
+_SCRIPT_RE = re.compile(r"<script(?![^>]*\bsrc=)[^>]*>(.*?)</script>", re.S)
+
+# Jinja expressions are replaced with a JavaScript literal, statements dropped
+_JINJA_EXPRESSION_RE = re.compile(r"\{\{.*?\}\}", re.S)
+_JINJA_STATEMENT_RE = re.compile(r"\{%.*?%\}", re.S)
+
+def inline_scripts(template):
+    text = template.read_text(encoding="utf-8")
+    for match in _SCRIPT_RE.finditer(text):
+        script = _JINJA_EXPRESSION_RE.sub("null", match.group(1))
+        yield text.count("\n", 0, match.start(1)) + 1, _JINJA_STATEMENT_RE.sub("", script)
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+@pytest.mark.parametrize("template", TEMPLATES, ids=lambda path: path.name)
+def test_inline_scripts_parse(template, tmp_path):
+    for line, script in inline_scripts(template):
+        path = tmp_path / f"{template.stem}-{line}.js"
+        path.write_text(script, encoding="utf-8")
+        result = subprocess.run(["node", "--check", str(path)], capture_output=True, text=True)
+        assert result.returncode == 0, f"{template.name}:{line}: {result.stderr}"
@@ -0,0 +1,165 @@
+"""
+Tests for recording fetches to WARC archives and replaying them
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import os
+import tracemalloc
+import types
+
+import pytest
+from multidict import CIMultiDict
+
+from site_doc_gen import warc
+from site_doc_gen.warc import RecordingSession, ReplaySession, WarcArchive, WarcWriter
+
+class FakeStream:
+    def __init__(self, body: bytes):
+        self.body = body
+        self.reads = 0
+
+    async def iter_chunked(self, size: int):
+        for i in range(0, len(self.body), size):
+            self.reads += 1
+            yield self.body[i:i + size]
+
+class FakeResponse:
+    """The parts of aiohttp.ClientResponse RecordingSession uses; no read()"""
+
+    def __init__(self, body: bytes):
+        self.status = 200
+        self.reason = "OK"
+        self.headers = CIMultiDict({"Content-Type": "application/gzip", "Content-Encoding": "gzip"})
+        self.request_info = types.SimpleNamespace(headers={"Authorization": "token secret", "Accept": "*/*"})
+        self.content = FakeStream(body)
+
+class FakeSession:
+    def __init__(self, body: bytes):
+        self.body = body
+        self.responses = []
+
+    @contextlib.asynccontextmanager
+    async def get(self, url, params=None, **kwargs):
+        response = FakeResponse(self.body)
+        self.responses.append(response)
+        yield response
+
+def record(path, body, params=None):
+    session = FakeSession(body)
+    recorder = RecordingSession(session, WarcWriter(path))
+
+    async def main():
+        async with recorder.get("https://example.test/archive", params=params) as response:
+            assert response.content.at_eof() is (not body)
+            chunks = [chunk async for chunk in response.content.iter_chunked(1000)]
+            assert response.content.at_eof()
+            return b"".join(chunks), await response.read()
+
+    try:
+        return session, asyncio.run(main())
+    finally:
+        recorder.writer.close()
+
+@pytest.fixture
+def small_spool(monkeypatch):
+    monkeypatch.setattr(warc, "SPOOL_MAX_BYTES", 4096)
+
+@pytest.mark.parametrize("size", [0, 100, 300_000])
+def test_recorded_bodies_replay(tmp_path, small_spool, size):
+    body = os.urandom(size)
+    path = tmp_path / "crawl.warc.gz"
+    session, (streamed, read) = record(path, body, params={"ref": "main"})
+    assert streamed == read == body
+    assert session.responses[0].content.reads == -(-size // warc.COPY_CHUNK_SIZE)
+
+    archive = WarcArchive(path)
+    replay = ReplaySession(archive)
+
+    async def main():
+        async with replay.get("https://example.test/archive", params={"ref": "main"}) as response:
+            return response.status, response.headers, await response.read()
+
+    try:
+        status, headers, replayed = asyncio.run(main())
+    finally:
+        archive.close()
+    assert status == 200
+    assert replayed == body
+    assert headers["Content-Length"] == str(size)
+    assert "Content-Encoding" not in headers
+
+def test_large_bodies_are_spooled_to_disk(tmp_path, small_spool, monkeypatch):
+    spools = []
+    spooled_file = warc.tempfile.SpooledTemporaryFile
+
+    def spy(*args, **kwargs):
+        spool = spooled_file(*args, **kwargs)
+        spools.append(spool)
+        return spool
+
+    monkeypatch.setattr(warc.tempfile, "SpooledTemporaryFile", spy)
+    record(tmp_path / "crawl.warc.gz", os.urandom(100_000))
+    assert spools and spools[0]._rolled
+    assert spools[0].closed
+
+def test_credentials_are_not_recorded(tmp_path):
+    path = tmp_path / "crawl.warc.gz"
+    record(path, b"body")
+    data = warc.gzip.decompress(path.read_bytes())
+    assert b"secret" not in data
+    assert b"Accept: */*" in data
+
+def test_replayed_bodies_are_decompressed_as_they_are_read(tmp_path, monkeypatch):
+    body = os.urandom(4 * 1024 * 1024)
+    path = tmp_path / "crawl.warc.gz"
+    record(path, body)
+
+    def refuse(data):
+        raise AssertionError("whole record decompressed")
+
+    monkeypatch.setattr(warc.gzip, "decompress", refuse)
+    archive = WarcArchive(path)
+
+    async def main():
+        response = archive.get("https://example.test/archive")
+        assert response.headers["Content-Type"] == "application/gzip"
+        digest = hashlib.sha256()
+        tracemalloc.start()
+        try:
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                digest.update(chunk)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        assert response.content.at_eof()
+        # Reading it all at once still works after streaming
+        return digest.hexdigest(), peak, await response.read()
+
+    try:
+        streamed, peak, read = asyncio.run(main())
+    finally:
+        archive.close()
+    assert streamed == hashlib.sha256(body).hexdigest()
+    assert peak < len(body) // 4
+    assert read == body
+
+def test_partial_reads_of_replayed_bodies(tmp_path):
+    body = bytes(range(256)) * 1000
+    path = tmp_path / "crawl.warc.gz"
+    record(path, body)
+    archive = WarcArchive(path)
+
+    async def main():
+        response = archive.get("https://example.test/archive")
+        head = await response.content.read(1000)
+        rest = await response.content.read()
+        return head, rest, await response.text(encoding="latin-1")
+
+    try:
+        head, rest, text = asyncio.run(main())
+    finally:
+        archive.close()
+    assert head + rest == body
+    assert text.encode("latin-1") == body
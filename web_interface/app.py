@@ -1,19 +1,34 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, send_from_directory, jsonify
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify
 import asyncio
 from pathlib import Path
 import sys
 import json
+import queue
+import threading
 import time
 import shutil
 from datetime import datetime
 from urllib.parse import urlparse
-from site_doc_gen import DocGen, Config
+from site_doc_gen import Config
+from site_doc_gen.metrics import Metrics
+from site_doc_gen.search import SearchIndex
+from site_doc_gen.snippets import SnippetStore
 from site_doc_gen.utils import discover_url_patterns
+from catalog import SiteCatalog, site_entry_path
+from jobs import ACTIVE_STATES, JobManager
+from serving import (
+    REVALIDATE_CACHE_CONTROL, ManifestCache, RendererCache, SectionIndexCache, content_version,
+    send_output_file, send_rendered_markdown, wants_html, wants_rendered_markdown
+)
 import os
 
 # Get the absolute path to the site-doc-gen directory
 ROOT_DIR = Path(__file__).parent.parent.absolute()
 OUTPUT_DIR = ROOT_DIR / 'output'
+GITHUB_CACHE_DIR = ROOT_DIR / '.cache' / 'github'  # ETag cache shared by all jobs
+MAX_CONCURRENT_CRAWLS = int(os.environ.get('SITE_DOC_GEN_MAX_CRAWLS', 2))
+DISCOVERY_CONCURRENCY = 8
+DISCOVERY_TIMEOUT = 20  # Seconds before pattern discovery returns partial results
 
 app = Flask(__name__, static_folder=None)  # Disable default static folder
 app.secret_key = os.urandom(24)
@@ -22,6 +37,29 @@ app.config['PROPAGATE_EXCEPTIONS'] = True  # For better async error handling
 # Ensure the output directory exists
 OUTPUT_DIR.mkdir(exist_ok=True)
 
+# Full-text index maintained by DocGen as it saves documentation
+search_index = SearchIndex(OUTPUT_DIR / 'search.db')
+
+# Deduplicated code snippets of every site, also maintained by DocGen
+snippet_store = SnippetStore(OUTPUT_DIR / 'snippets.db')
+
+# Per-site manifests written by DocGen, used for ETags and precompressed variants
+manifests = ManifestCache(OUTPUT_DIR)
+
+# Markdown pages are rendered to HTML on first view and cached on disk
+renderers = RendererCache(OUTPUT_DIR)
+
+# Byte offsets of the pages and headings in single-file outputs, for serving one section at a time
+section_indexes = SectionIndexCache(OUTPUT_DIR)
+
+# Stage timings and request latencies accumulated over every job, served at /metrics
+metrics = Metrics()
+
+# Listing of generated sites, updated whenever a site is generated or deleted and
+# reconciled with the output directory for sites written by the CLI or batch runner
+catalog = SiteCatalog(OUTPUT_DIR / 'catalog.db')
+catalog.sync(OUTPUT_DIR, force=True)
+
 def validate_url(url):
     """Validate URL format and accessibility"""
     if not url:
@@ -39,22 +77,93 @@ def validate_url(url):
     except Exception as e:
         return False, f"Invalid URL: {str(e)}"
 
-def count_pages(site_dir):
-    """Count total number of generated pages"""
-    count = 0
-    docs_dir = site_dir / 'docs'
-    if docs_dir.exists():
-        count = sum(1 for f in docs_dir.glob('**/*') if f.is_file())
-    return count
-
-def get_directory_size(site_dir):
-    """Get total size of generated documentation"""
-    total = 0
-    for dirpath, dirnames, filenames in os.walk(site_dir):
-        for f in filenames:
-            fp = os.path.join(dirpath, f)
-            total += os.path.getsize(fp)
-    return total
+async def run_generation(job):
+    """Generate documentation for a queued job"""
+    from site_doc_gen import DocGen  # Loads the crawl dependencies on first use
+
+    url, config = job.url, job.payload
+    start_time = job.started_at or time.time()
+    
+    print("\nInitializing DocGen with config:")
+    print(f"- Concurrency: {config.concurrency}")
+    print(f"- Max pages: {config.max_pages}")
+    print(f"- Match patterns: {config.match}")
+    print(f"- Content selector: {config.content_selector}")
+    print(f"- Split pages: {config.split_pages}")
+    
+    async with DocGen(
+        config,
+        progress=lambda snapshot: job.update(progress=snapshot),
+        metrics=metrics
+    ) as doc_gen:
+        print("\nProcessing site...")
+        docs = await doc_gen.process_site(url)
+    
+    # Page counts and sizes are tracked by DocGen as it writes the output
+    output = docs.metadata['output']
+    site_name = output['site_name']
+    site_dir = Path(output['site_dir'])
+    
+    # Enhanced metadata
+    metadata = {
+        'source_url': url,
+        'version': '1.0.0',
+        'generation_info': {
+            'started_at': datetime.fromtimestamp(start_time).isoformat(),
+            'completed_at': datetime.fromtimestamp(time.time()).isoformat(),
+            'duration_seconds': round(time.time() - start_time, 2)
+        },
+        'stats': {
+            'total_pages': output['total_pages'],
+            'total_size_bytes': output['total_size_bytes']
+        },
+        'metrics': docs.metadata.get('metrics', {}),
+        'config_used': {
+            'concurrency': config.concurrency,
+            'max_pages': config.max_pages,
+            'match': config.match,
+            'content_selector': config.content_selector,
+            'split_pages': config.split_pages,
+            'create_index': config.create_index,
+            'preserve_code_blocks': config.preserve_code_blocks,
+            'output_format': config.output_format
+        }
+    }
+    
+    # Write metadata atomically so readers never see a partial file
+    metadata_file = site_dir / 'metadata.json'
+    tmp_file = metadata_file.with_suffix('.json.tmp')
+    with open(tmp_file, 'w') as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(tmp_file, metadata_file)
+    
+    catalog.upsert(site_name, site_entry_path(site_dir), metadata)
+
+# Generation runs in the background; at most this many crawls run at once
+jobs = JobManager(run_generation, max_concurrent=MAX_CONCURRENT_CRAWLS)
+
+def wants_json():
+    """Check whether the client asked for a JSON response"""
+    return request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html
+
+def format_patterns(patterns):
+    """Format discovered patterns for display, most frequent first"""
+    formatted_patterns = []
+    for pattern, urls in patterns.items():
+        formatted_patterns.append({
+            'pattern': pattern,
+            'example_urls': list(urls)[:3],  # Show up to 3 examples
+            'total_urls': len(urls)
+        })
+    
+    # Sort by number of URLs, most frequent first
+    formatted_patterns.sort(key=lambda x: x['total_urls'], reverse=True)
+    
+    return {
+        'patterns': formatted_patterns,
+        'total_patterns': len(formatted_patterns),
+        'total_urls': sum(p['total_urls'] for p in formatted_patterns)
+    }
 
 @app.route('/discover-patterns', methods=['POST'])
 async def discover_patterns():
@@ -66,29 +175,63 @@ async def discover_patterns():
         return jsonify({'error': error_msg}), 400
     
     try:
-        patterns = await discover_url_patterns(url, max_depth=3, max_urls=200)
-        
-        # Format patterns for display
-        formatted_patterns = []
-        for pattern, urls in patterns.items():
-            formatted_patterns.append({
-                'pattern': pattern,
-                'example_urls': list(urls)[:3],  # Show up to 3 examples
-                'total_urls': len(urls)
-            })
-        
-        # Sort by number of URLs, most frequent first
-        formatted_patterns.sort(key=lambda x: x['total_urls'], reverse=True)
-        
-        return jsonify({
-            'patterns': formatted_patterns,
-            'total_patterns': len(formatted_patterns),
-            'total_urls': sum(p['total_urls'] for p in formatted_patterns)
-        })
+        patterns = await discover_url_patterns(
+            url,
+            max_depth=3,
+            max_urls=200,
+            concurrency=DISCOVERY_CONCURRENCY,
+            timeout=DISCOVERY_TIMEOUT
+        )
+        return jsonify(format_patterns(patterns))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/discover-patterns/stream')
+def discover_patterns_stream():
+    """Stream URL patterns as Server-Sent Events while they are discovered"""
+    url = request.args.get('url')
+    is_valid, error_msg = validate_url(url)
+    
+    if not is_valid:
+        return jsonify({'error': error_msg}), 400
+    
+    events = queue.Queue()
+    
+    def discover():
+        try:
+            patterns = asyncio.run(discover_url_patterns(
+                url,
+                max_depth=3,
+                max_urls=200,
+                concurrency=DISCOVERY_CONCURRENCY,
+                timeout=DISCOVERY_TIMEOUT,
+                on_pattern=lambda pattern, path: events.put(
+                    ('pattern', {'pattern': pattern, 'example_url': path})
+                )
+            ))
+            events.put(('done', format_patterns(patterns)))
+        except Exception as e:
+            events.put(('error', {'error': str(e)}))
+    
+    threading.Thread(target=discover, daemon=True).start()
+    
+    def stream():
+        while True:
+            try:
+                event, data = events.get(timeout=15)
+            except queue.Empty:
+                yield ': keep-alive\n\n'
+                continue
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+            if event != 'pattern':
+                break
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/', methods=['GET', 'POST'])
 def home():
     if request.method == 'POST':
@@ -96,6 +239,8 @@ def home():
         is_valid, error_msg = validate_url(url)
         
         if not is_valid:
+            if wants_json():
+                return jsonify({'error': error_msg}), 400
             flash(error_msg, 'error')
             return redirect(url_for('home'))
         
@@ -107,6 +252,8 @@ def home():
                 patterns_data = json.loads(patterns_json)
                 patterns = [p['pattern'] for p in patterns_data if p.get('selected', False)]
             except json.JSONDecodeError:
+                if wants_json():
+                    return jsonify({'error': 'Error parsing selected patterns'}), 400
                 flash('Error parsing selected patterns', 'error')
                 return redirect(url_for('home'))
         
@@ -118,78 +265,80 @@ def home():
             split_pages=bool(request.form.get('split_pages')),
             create_index=bool(request.form.get('create_index')),
             preserve_code_blocks=bool(request.form.get('preserve_code_blocks')),
-            output_format=request.form.get('output_format', 'markdown')
+            output_format=request.form.get('output_format', 'markdown'),
+            output_dir=OUTPUT_DIR,
+            render_html=True,
+            github_cache_dir=GITHUB_CACHE_DIR
         )
         
-        start_time = time.time()
-        
-        try:
-            print("\nStarting documentation generation...")
-            print(f"URL: {url}")
+        job, created = jobs.submit(url, config)
+        if created:
+            print(f"\nQueued documentation generation job {job.id} for {url}")
             print(f"Selected patterns: {patterns if patterns else 'None'}")
-            
-            async def process():
-                print("\nInitializing DocGen with config:")
-                print(f"- Concurrency: {config.concurrency}")
-                print(f"- Max pages: {config.max_pages}")
-                print(f"- Match patterns: {config.match}")
-                print(f"- Content selector: {config.content_selector}")
-                print(f"- Split pages: {config.split_pages}")
-                
-                async with DocGen(config) as doc_gen:
-                    print("\nProcessing site...")
-                    await doc_gen.process_site(url)
-                    
-                    # Save metadata
-                    site_name = url.replace('https://', '').replace('http://', '')
-                    if 'github.com' in site_name:
-                        parts = site_name.split('/')
-                        if len(parts) >= 3:
-                            site_name = f"github_{parts[1]}_{parts[2]}"
-                    else:
-                        site_name = site_name.split('/')[0].replace('.', '_')
-                    
-                    site_dir = OUTPUT_DIR / site_name
-                    metadata_file = site_dir / 'metadata.json'
-                    
-                    # Enhanced metadata
-                    metadata = {
-                        'source_url': url,
-                        'version': '1.0.0',
-                        'generation_info': {
-                            'started_at': datetime.fromtimestamp(start_time).isoformat(),
-                            'completed_at': datetime.fromtimestamp(time.time()).isoformat(),
-                            'duration_seconds': round(time.time() - start_time, 2)
-                        },
-                        'stats': {
-                            'total_pages': count_pages(site_dir),
-                            'total_size_bytes': get_directory_size(site_dir)
-                        },
-                        'config_used': {
-                            'concurrency': config.concurrency,
-                            'max_pages': config.max_pages,
-                            'match': config.match,
-                            'content_selector': config.content_selector,
-                            'split_pages': config.split_pages,
-                            'create_index': config.create_index,
-                            'preserve_code_blocks': config.preserve_code_blocks,
-                            'output_format': config.output_format
-                        }
-                    }
-                    
-                    with open(metadata_file, 'w') as f:
-                        json.dump(metadata, f, indent=2)
         
-            asyncio.run(process())
-            flash('Documentation generated successfully!', 'success')
-            return redirect(url_for('docs'))
-            
-        except Exception as e:
-            flash(f'Error generating documentation: {str(e)}', 'error')
-            return redirect(url_for('home'))
+        if wants_json():
+            return jsonify({
+                'job_id': job.id,
+                'coalesced': not created,
+                'status_url': url_for('job_status', job_id=job.id),
+                'events_url': url_for('job_events', job_id=job.id),
+                'cancel_url': url_for('cancel_job', job_id=job.id)
+            }), 202
+        
+        if created:
+            flash(f'Documentation generation started (job {job.id})', 'success')
+        else:
+            flash(f'Documentation for this URL is already being generated (job {job.id})', 'info')
+        return redirect(url_for('docs'))
     
     return render_template('home.html')
 
+@app.route('/jobs')
+def list_jobs():
+    """List recent generation jobs"""
+    return jsonify({'jobs': [job.to_dict() for job in jobs.list()]})
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Get the current state of a generation job"""
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued or running generation job"""
+    job = jobs.cancel(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Stream job progress as Server-Sent Events until the job finishes"""
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def stream():
+        version = -1
+        while True:
+            current = job.wait_for_change(version, timeout=15)
+            if current == version:
+                # Keep proxies from closing an idle connection
+                yield ': keep-alive\n\n'
+                continue
+            version = current
+            yield f"data: {json.dumps(job.to_dict())}\n\n"
+            if job.finished:
+                break
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/delete/<path:site_name>', methods=['POST'])
 def delete_docs(site_name):
     """Delete generated documentation"""
@@ -197,64 +346,72 @@ def delete_docs(site_name):
         site_dir = OUTPUT_DIR / site_name
         if site_dir.exists():
             shutil.rmtree(site_dir)
+            search_index.remove_site(site_name)
+            snippet_store.remove_site(site_name)
+            catalog.delete(site_name)
+            renderers.forget(site_name)
+            section_indexes.forget(site_name)
             return jsonify({'success': True, 'message': 'Documentation deleted successfully'})
         return jsonify({'success': False, 'message': 'Documentation not found'}), 404
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@app.route('/search')
+def search_docs():
+    """Search inside generated documentation across all sites"""
+    query = request.args.get('q', '').strip()
+    site = request.args.get('site') or None
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    
+    if not query:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+    
+    start_time = time.perf_counter()
+    hits = search_index.search(query, limit=limit, offset=offset, site=site)
+    for hit in hits:
+        link = url_for('serve_output', filename=hit['path'])
+        hit['link'] = f"{link}#{hit['anchor']}" if hit['anchor'] else link
+    
+    return jsonify({
+        'query': query,
+        'hits': hits,
+        'took_ms': round((time.perf_counter() - start_time) * 1000, 2)
+    })
+
+@app.route('/snippets')
+def find_snippets():
+    """Find code examples across all sites by language and/or the text they contain"""
+    language = request.args.get('language', '').strip() or None
+    contains = request.args.get('q', '').strip() or None
+    site = request.args.get('site') or None
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    
+    if not language and not contains:
+        return jsonify({'error': 'Query parameter language or q is required'}), 400
+    
+    start_time = time.perf_counter()
+    snippets = snippet_store.find(language=language, contains=contains, site=site, limit=limit, offset=offset)
+    
+    return jsonify({
+        'language': language,
+        'query': contains,
+        'snippets': snippets,
+        'took_ms': round((time.perf_counter() - start_time) * 1000, 2)
+    })
+
 @app.route('/docs')
 def docs():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
     search = request.args.get('search', '').lower()
     sort_by = request.args.get('sort', 'newest')  # newest, oldest, name
-    output_dir = OUTPUT_DIR
-    sites = []
-    
-    if output_dir.exists():
-        # Collect all sites with metadata
-        all_sites = []
-        for site_dir in output_dir.iterdir():
-            if site_dir.is_dir():
-                index_path = site_dir / 'index.html'
-                if index_path.exists():
-                    metadata_file = site_dir / 'metadata.json'
-                    metadata = {}
-                    if metadata_file.exists():
-                        with open(metadata_file) as f:
-                            metadata = json.load(f)
-                    
-                    site_info = {
-                        'name': site_dir.name,
-                        'path': f'{site_dir.name}/index.html',
-                        'source_url': metadata.get('source_url'),
-                        'version': metadata.get('version', '1.0.0'),
-                        'generated_at': metadata.get('generation_info', {}).get('completed_at'),
-                        'total_pages': metadata.get('stats', {}).get('total_pages', 0),
-                        'total_size': metadata.get('stats', {}).get('total_size_bytes', 0)
-                    }
-                    
-                    # Apply search filter
-                    if search:
-                        if search not in site_info['name'].lower() and \
-                           search not in (site_info['source_url'] or '').lower():
-                            continue
-                    
-                    all_sites.append(site_info)
-        
-        # Sort sites
-        if sort_by == 'newest':
-            all_sites.sort(key=lambda x: x['generated_at'] or '', reverse=True)
-        elif sort_by == 'oldest':
-            all_sites.sort(key=lambda x: x['generated_at'] or '')
-        elif sort_by == 'name':
-            all_sites.sort(key=lambda x: x['name'].lower())
-        
-        # Paginate
-        start_idx = (page - 1) * per_page
-        end_idx = start_idx + per_page
-        sites = all_sites[start_idx:end_idx]
-        total_pages = (len(all_sites) + per_page - 1) // per_page
+    content_hits = search_index.search(search, limit=10) if search else []
+    
+    catalog.sync(OUTPUT_DIR)
+    sites, total_sites = catalog.query(search=search, sort_by=sort_by, page=page, per_page=per_page)
+    total_pages = (total_sites + per_page - 1) // per_page
     
     return render_template('docs.html', 
                          sites=sites,
@@ -262,19 +419,112 @@ def docs():
                          total_pages=total_pages,
                          per_page=per_page,
                          search=search,
-                         sort_by=sort_by)
+                         sort_by=sort_by,
+                         content_hits=content_hits)
 
 @app.route('/output/<path:filename>')
 def serve_output(filename):
     """Serve files from the output directory"""
-    # Handle both the index.html and its referenced files in docs/
-    if filename.endswith('index.html'):
-        return send_from_directory(str(OUTPUT_DIR), filename)
+    if wants_rendered_markdown(filename):
+        response = send_rendered_markdown(OUTPUT_DIR, filename, renderers)
+        if response is not None:
+            return response
+        site, _, relpath = filename.partition('/')
+        if relpath == 'documentation.md' and section_indexes.lookup(site):
+            # Too large to render whole; browse it a section at a time instead
+            return redirect(url_for('list_sections', site_name=site))
+    return send_output_file(OUTPUT_DIR, filename, manifests)
+
+@app.route('/sections/<site_name>')
+def list_sections(site_name):
+    """Page through the table of contents of a single-file site without reading documentation.md"""
+    index = section_indexes.lookup(site_name)
+    if index is None:
+        return jsonify({'error': 'No section index for this site'}), 404
+    
+    anchor = request.args.get('anchor')
+    if anchor:
+        section_id = index.find(anchor)
+        if section_id is None:
+            return jsonify({'error': f'No section with anchor {anchor}'}), 404
+        return redirect(url_for('read_section', site_name=site_name, section_id=section_id, **({'raw': 1} if 'raw' in request.args else {})))
+    
+    pages_only = request.args.get('kind') == 'page'
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    total = index.total(pages_only)
+    entries = index.window(offset, limit, pages_only)
+    for entry in entries:
+        entry['link'] = url_for('read_section', site_name=site_name, section_id=entry['id'])
+    
+    if wants_html():
+        lines = [f'# {site_name}', '', f'Sections {offset + 1}-{offset + len(entries)} of {total}', '']
+        for entry in entries:
+            indent = '    ' if entry['kind'] == 'heading' else ''
+            lines.append(f"{indent}- [{entry['title']}]({entry['link']})")
+        window_args = {'kind': 'page'} if pages_only else {}
+        nav = []
+        if offset > 0:
+            nav.append(f"[Previous]({url_for('list_sections', site_name=site_name, offset=max(offset - limit, 0), limit=limit, **window_args)})")
+        if offset + limit < total:
+            nav.append(f"[Next]({url_for('list_sections', site_name=site_name, offset=offset + limit, limit=limit, **window_args)})")
+        lines.extend(['', ' · '.join(nav)])
+        return Response(renderers.get(site_name).to_html('\n'.join(lines), site_name), content_type='text/html; charset=utf-8')
+    
+    return jsonify({
+        'site': site_name,
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'sections': entries
+    })
+
+@app.route('/sections/<site_name>/<int:section_id>')
+def read_section(site_name, section_id):
+    """Serve one page or heading section of a single-file site, read from its byte offsets"""
+    index = section_indexes.lookup(site_name)
+    if index is None or section_id >= len(index.sections):
+        return jsonify({'error': 'Section not found'}), 404
+    
+    data = index.read(section_id)
+    if wants_html():
+        section = index.sections[section_id]
+        nav = [f"[Contents]({url_for('list_sections', site_name=site_name, offset=section_id // 100 * 100)})"]
+        if section_id > 0:
+            nav.insert(0, f"[Previous]({url_for('read_section', site_name=site_name, section_id=section_id - 1)})")
+        if section_id + 1 < len(index.sections):
+            nav.append(f"[Next]({url_for('read_section', site_name=site_name, section_id=section_id + 1)})")
+        text = ' · '.join(nav) + '\n\n' + data.decode('utf-8', 'replace')
+        response = Response(renderers.get(site_name).to_html(text, section['title']), content_type='text/html; charset=utf-8')
     else:
-        # For other files (like those in docs/), get the parent directory
-        parent_dir = os.path.dirname(filename)
-        file_name = os.path.basename(filename)
-        return send_from_directory(str(OUTPUT_DIR / parent_dir), file_name)
+        response = Response(data, content_type='text/markdown; charset=utf-8')
+    response.vary.add('Accept')
+    response.set_etag(f'{index.sha256}-{section_id}-{"html" if wants_html() else "md"}')
+    response.headers['Cache-Control'] = REVALIDATE_CACHE_CONTROL
+    return response.make_conditional(request)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Expose generation metrics in the Prometheus text format"""
+    active = [job for job in jobs.list() if job.status in ACTIVE_STATES]
+    lines = [
+        '# HELP site_doc_gen_jobs Generation jobs by state',
+        '# TYPE site_doc_gen_jobs gauge',
+    ]
+    for state in ACTIVE_STATES:
+        count = sum(1 for job in active if job.status == state)
+        lines.append(f'site_doc_gen_jobs{{state="{state}"}} {count}')
+    body = metrics.prometheus() + '\n'.join(lines) + '\n'
+    return Response(
+        body,
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+        headers={'Cache-Control': 'no-store'}
+    )
+
+@app.template_global()
+def output_url(filename):
+    """URL for a generated file, content-addressed when its hash is known"""
+    return url_for('serve_output', filename=filename, v=content_version(filename, manifests))
 
 if __name__ == '__main__':
     app.run(debug=True, port=5005)
@@ -0,0 +1,197 @@
+"""
+Catalog of generated documentation sites backing the /docs listing
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sites (
+    name TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    source_url TEXT,
+    version TEXT NOT NULL DEFAULT '1.0.0',
+    generated_at TEXT,
+    total_pages INTEGER NOT NULL DEFAULT 0,
+    total_size INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sites_generated_at ON sites(generated_at);
+CREATE INDEX IF NOT EXISTS sites_name_nocase ON sites(name COLLATE NOCASE);
+"""
+
+# Minimum seconds between scans of the output directory for sites written elsewhere
+SYNC_INTERVAL = 2.0
+
+SORT_ORDERS = {
+    'newest': "COALESCE(generated_at, '') DESC",
+    'oldest': "COALESCE(generated_at, '') ASC",
+    'name': "name COLLATE NOCASE ASC",
+}
+
+def site_entry_path(site_dir: Path) -> Optional[str]:
+    """Get the file a site listing links to, relative to the output directory"""
+    for entry in ('index.html', 'documentation.md'):
+        if (site_dir / entry).exists():
+            return f'{site_dir.name}/{entry}'
+    return None
+
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+def load_site_metadata(site_dir: Path) -> Dict[str, Any]:
+    """Read a site's metadata.json, or fall back to its manifest.json.
+
+    Sites generated by the web app have metadata.json; sites written by
+    the CLI or batch runner only have the manifest DocGen writes.
+    """
+    for name in ('metadata.json', 'manifest.json'):
+        try:
+            data = json.loads((site_dir / name).read_text())
+        except (OSError, ValueError):
+            continue
+        if name == 'metadata.json':
+            return data
+        return {
+            'source_url': data.get('base_url'),
+            'generation_info': {'completed_at': data.get('generated_at')},
+            'stats': {
+                'total_pages': data.get('total_pages', 0),
+                'total_size_bytes': sum(entry.get('size', 0) for entry in data.get('files', {}).values()),
+            },
+        }
+    return {}
+
+class SiteCatalog:
+    """SQLite index of generated sites, kept in step with the output directory.
+
+    Rows are refreshed when a site's metadata.json or manifest.json changes
+    and dropped when its directory goes away, so sites written by the CLI
+    or batch runner are listed too. A scan only stats a few files per site.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._signatures: Dict[str, Tuple] = {}  # Site name to what its row was built from
+        self._synced_at: Optional[float] = None
+
+    def sync(self, output_dir: Path, force: bool = False) -> int:
+        """Reconcile the catalog with the site directories under output_dir.
+
+        Scans at most once per SYNC_INTERVAL unless forced.
+
+        Returns:
+            Number of sites added, updated or removed
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._synced_at is not None and now - self._synced_at < SYNC_INTERVAL:
+                return 0
+            self._synced_at = now
+            known = dict(self._signatures)
+
+        found: Dict[str, Tuple] = {}
+        with os.scandir(output_dir) as entries:
+            for entry in entries:
+                if not entry.is_dir() or entry.name.startswith('.'):
+                    continue
+                site_dir = Path(entry.path)
+                path = site_entry_path(site_dir)
+                if path:
+                    found[entry.name] = (
+                        path, _mtime(site_dir / 'metadata.json'), _mtime(site_dir / 'manifest.json')
+                    )
+
+        rows = [
+            self._row(name, signature[0], load_site_metadata(Path(output_dir) / name))
+            for name, signature in found.items()
+            if known.get(name) != signature
+        ]
+        with self._lock, self._conn:
+            stale = [
+                (name,) for (name,) in self._conn.execute("SELECT name FROM sites")
+                if name not in found
+            ]
+            self._conn.executemany("DELETE FROM sites WHERE name = ?", stale)
+            self._conn.executemany("INSERT OR REPLACE INTO sites VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._signatures = found
+        return len(rows) + len(stale)
+
+    def _row(self, name: str, path: str, metadata: Dict[str, Any]) -> Tuple:
+        stats = metadata.get('stats', {})
+        return (
+            name,
+            path,
+            metadata.get('source_url'),
+            metadata.get('version', '1.0.0'),
+            metadata.get('generation_info', {}).get('completed_at'),
+            stats.get('total_pages', 0),
+            stats.get('total_size_bytes', 0),
+        )
+
+    def upsert(self, name: str, path: str, metadata: Dict[str, Any]) -> None:
+        """Add or replace a site from its metadata.json contents"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sites VALUES (?, ?, ?, ?, ?, ?, ?)",
+                self._row(name, path, metadata)
+            )
+
+    def delete(self, name: str) -> None:
+        """Remove a site from the catalog"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sites WHERE name = ?", (name,))
+            self._signatures.pop(name, None)
+
+    def query(
+        self,
+        search: str = '',
+        sort_by: str = 'newest',
+        page: int = 1,
+        per_page: int = 10
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Filter, sort and paginate sites in SQL.
+
+        Returns:
+            Tuple of (sites on the requested page, total matching sites)
+        """
+        where, params = "", []
+        if search:
+            pattern = '%' + search.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            where = "WHERE lower(name) LIKE ? ESCAPE '\\' OR lower(COALESCE(source_url, '')) LIKE ? ESCAPE '\\'"
+            params = [pattern, pattern]
+        order = SORT_ORDERS.get(sort_by, SORT_ORDERS['newest'])
+        offset = max(page - 1, 0) * per_page
+
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM sites {where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT name, path, source_url, version, generated_at, total_pages, total_size "
+                f"FROM sites {where} ORDER BY {order} LIMIT ? OFFSET ?",
+                [*params, per_page, offset]
+            ).fetchall()
+
+        sites = [
+            {
+                'name': row[0],
+                'path': row[1],
+                'source_url': row[2],
+                'version': row[3],
+                'generated_at': row[4],
+                'total_pages': row[5],
+                'total_size': row[6],
+            }
+            for row in rows
+        ]
+        return sites, total
@@ -0,0 +1,203 @@
+"""
+Background job queue for documentation generation
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+class Job:
+    """A single generation request and its progress"""
+
+    def __init__(self, url: str, payload: Any = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.url = url
+        self.payload = payload
+        self.status = QUEUED
+        self.progress: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.result: Any = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_requested = False
+
+        # Bumped on every change so event streams can wait for updates
+        self.version = 0
+        self._changed = threading.Condition()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status not in ACTIVE_STATES
+
+    def update(self, **fields) -> None:
+        """Update job fields and wake up anyone waiting for changes"""
+        with self._changed:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.version += 1
+            self._changed.notify_all()
+
+    def start(self) -> bool:
+        """Move a queued job to running, unless it was cancelled first.
+
+        Returns:
+            Whether the job should run
+        """
+        with self._changed:
+            if self.status != QUEUED or self.cancel_requested:
+                return False
+            self.update(status=RUNNING, started_at=time.time())
+            return True
+
+    def request_cancel(self) -> bool:
+        """Flag the job for cancellation.
+
+        Returns:
+            Whether the job was still queued, so it will never start
+        """
+        with self._changed:
+            self.cancel_requested = True
+            return self.status == QUEUED
+
+    def wait_for_change(self, version: int, timeout: float) -> int:
+        """Block until the job version moves past `version` or the timeout expires"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout=timeout)
+            return self.version
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize job state for JSON responses and events"""
+        return {
+            'id': self.id,
+            'url': self.url,
+            'status': self.status,
+            'progress': self.progress,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+class JobManager:
+    """Run generation jobs on a bounded pool of worker threads.
+
+    Each job gets its own event loop inside a worker thread, so a crawl never
+    holds a request thread. Submitting a URL that already has a queued or
+    running job returns that job instead of starting a second crawl.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[Job], Awaitable[Any]],
+        max_concurrent: int = 2,
+        keep_finished: int = 100
+    ):
+        """
+        Args:
+            runner: Coroutine function performing the work for a job
+            max_concurrent: Maximum number of crawls running at once
+            keep_finished: Number of finished jobs kept for status lookups
+        """
+        self.runner = runner
+        self.max_concurrent = max_concurrent
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent,
+            thread_name_prefix='docgen-job'
+        )
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._active_by_url: Dict[str, Job] = {}
+
+    def submit(self, url: str, payload: Any = None) -> Tuple[Job, bool]:
+        """Queue a job for a URL.
+
+        Returns:
+            Tuple of (job, created) where created is False when the request
+            was coalesced into an existing job for the same URL
+        """
+        with self._lock:
+            existing = self._active_by_url.get(url)
+            if existing and not existing.finished:
+                return existing, False
+
+            job = Job(url, payload)
+            self._jobs[job.id] = job
+            self._active_by_url[url] = job
+            self._prune()
+
+        self._executor.submit(self._run, job)
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job"""
+        job = self.get(job_id)
+        if not job or job.finished:
+            return job
+
+        if job.request_cancel():
+            self._finish(job, CANCELLED)
+        elif job._loop and job._task:
+            job._loop.call_soon_threadsafe(job._task.cancel)
+        return job
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs beyond the retention limit"""
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished),
+            key=lambda job: job.finished_at or 0
+        )
+        for job in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job.id]
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None) -> None:
+        job.update(status=status, error=error, finished_at=time.time())
+        with self._lock:
+            if self._active_by_url.get(job.url) is job:
+                del self._active_by_url[job.url]
+
+    def _run(self, job: Job) -> None:
+        """Worker thread entry point"""
+        # Checked under the job's lock, so a job cancelled while queued never shows as running
+        if not job.start():
+            return
+
+        async def main():
+            job._loop = asyncio.get_running_loop()
+            job._task = asyncio.current_task()
+            if job.cancel_requested:
+                # Cancelled between leaving the queue and getting a task
+                raise asyncio.CancelledError()
+            return await self.runner(job)
+
+        try:
+            job.result = asyncio.run(main())
+        except asyncio.CancelledError:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            self._finish(job, FAILED, str(e))
+        else:
+            self._finish(job, COMPLETED)
+        finally:
+            job._loop = job._task = None
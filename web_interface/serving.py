@@ -0,0 +1,206 @@
+"""
+Static serving of generated output with precompressed variants, ETags and ranges
+"""
+
+import json
+import mimetypes
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from flask import abort, request, send_file
+from werkzeug.security import safe_join
+
+from site_doc_gen.render import HTMLRenderer
+from site_doc_gen.sections import SECTIONS_FILE, SectionIndex
+
+# Cache-Control for URLs that carry the content hash (?v=<sha256>)
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Everything else is revalidated against its ETag on each use
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# Preference order when the client accepts several encodings
+ENCODING_PREFERENCE = ('br', 'gzip')
+SIDECAR_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+class ManifestCache:
+    """Per-site manifest.json contents, reloaded when the file changes"""
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = Path(output_dir)
+        self._lock = threading.Lock()
+        self._manifests: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+    def lookup(self, filename: str) -> Optional[Dict[str, Any]]:
+        """Get the manifest entry for a path relative to the output directory"""
+        site, _, relpath = filename.partition('/')
+        if not relpath:
+            return None
+        manifest_path = safe_join(str(self.output_dir), site, 'manifest.json')
+        if manifest_path is None:
+            return None
+        manifest_file = Path(manifest_path)
+        try:
+            mtime = manifest_file.stat().st_mtime
+        except OSError:
+            return None
+
+        with self._lock:
+            cached = self._manifests.get(site)
+        if not cached or cached[0] != mtime:
+            try:
+                files = json.loads(manifest_file.read_text()).get('files', {})
+            except (OSError, ValueError):
+                return None
+            cached = (mtime, files)
+            with self._lock:
+                self._manifests[site] = cached
+        return cached[1].get(relpath)
+
+class RendererCache:
+    """One HTMLRenderer per site, so their in-memory lookups persist across requests"""
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = Path(output_dir)
+        self._lock = threading.Lock()
+        self._renderers: Dict[str, HTMLRenderer] = {}
+
+    def get(self, site: str) -> HTMLRenderer:
+        with self._lock:
+            if site not in self._renderers:
+                self._renderers[site] = HTMLRenderer(self.output_dir / site)
+            return self._renderers[site]
+
+    def forget(self, site: str) -> None:
+        with self._lock:
+            self._renderers.pop(site, None)
+
+class SectionIndexCache:
+    """Per-site documentation.md section indexes, reloaded when the sidecar changes"""
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = Path(output_dir)
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, Tuple[float, SectionIndex]] = {}
+
+    def lookup(self, site: str) -> Optional[SectionIndex]:
+        """Get a site's section index, or None if it has none matching its documentation.md"""
+        path = safe_join(str(self.output_dir), site, SECTIONS_FILE)
+        if path is None:
+            return None
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+
+        with self._lock:
+            cached = self._indexes.get(site)
+        if not cached or cached[0] != mtime:
+            try:
+                cached = (mtime, SectionIndex(Path(path)))
+            except (OSError, ValueError, KeyError):
+                return None
+            with self._lock:
+                self._indexes[site] = cached
+        index = cached[1]
+        return index if index.current else None
+
+    def forget(self, site: str) -> None:
+        with self._lock:
+            self._indexes.pop(site, None)
+
+def wants_html() -> bool:
+    """Check whether the client is a browser navigating to a page rather than an API client.
+
+    Browsers list text/html explicitly; API clients and ?raw=1 get the source.
+    """
+    return 'raw' not in request.args and any(value == 'text/html' for value, _ in request.accept_mimetypes)
+
+def wants_rendered_markdown(filename: str) -> bool:
+    """Check whether a markdown file should be sent as rendered HTML"""
+    return filename.endswith('.md') and wants_html()
+
+def send_rendered_markdown(output_dir: Path, filename: str, renderers: RendererCache):
+    """Send the cached HTML rendering of a markdown file, or None if it can't be rendered"""
+    path = safe_join(str(output_dir), filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    site = filename.partition('/')[0]
+    rendered = renderers.get(site).render(Path(path))
+    if rendered is None:
+        return None
+    response = send_file(
+        rendered,
+        mimetype='text/html',
+        conditional=True,
+        etag=rendered.stem
+    )
+    response.vary.add('Accept')
+    response.headers['Cache-Control'] = REVALIDATE_CACHE_CONTROL
+    return response
+
+def accepted_encoding(available, path: Optional[str] = None) -> Optional[str]:
+    """Pick the best precompressed encoding the client accepts.
+
+    With a path, encodings whose sidecar file is missing are skipped.
+    """
+    accept = request.accept_encodings
+    for encoding in ENCODING_PREFERENCE:
+        if encoding in available and accept[encoding]:
+            if path is None or os.path.isfile(path + SIDECAR_SUFFIXES[encoding]):
+                return encoding
+    return None
+
+def matches_manifest(entry: Optional[Dict[str, Any]], path: str) -> bool:
+    """Check whether a file is still the one its manifest entry describes"""
+    if entry is None or 'mtime_ns' not in entry:
+        return False
+    stat = os.stat(path)
+    return entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns
+
+def send_output_file(output_dir: Path, filename: str, manifests: ManifestCache):
+    """Send a generated file, honouring conditional, ranged and compressed requests"""
+    path = safe_join(str(output_dir), filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    entry = manifests.lookup(filename)
+    if not matches_manifest(entry, path):
+        # Not produced by the current run (or changed since); fall back to mtime-based ETags
+        response = send_file(path, conditional=True)
+        response.headers['Cache-Control'] = REVALIDATE_CACHE_CONTROL
+        return response
+
+    digest = entry['sha256']
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    # Byte ranges are only served from the identity representation
+    encoding = None if request.range else accepted_encoding(entry.get('encodings', []), path)
+    if encoding:
+        response = send_file(
+            path + SIDECAR_SUFFIXES[encoding],
+            mimetype=mimetype,
+            conditional=True,
+            etag=f'{digest}-{encoding}'
+        )
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = send_file(path, mimetype=mimetype, conditional=True, etag=digest)
+
+    if entry.get('encodings'):
+        response.vary.add('Accept-Encoding')
+    if request.args.get('v') == digest:
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response.headers['Cache-Control'] = REVALIDATE_CACHE_CONTROL
+    return response
+
+def content_version(filename: str, manifests: ManifestCache) -> Optional[str]:
+    """Get the content hash used to build a cache-forever URL for an output file"""
+    entry = manifests.lookup(filename)
+    path = safe_join(str(manifests.output_dir), filename)
+    if path is None or not os.path.isfile(path) or not matches_manifest(entry, path):
+        return None
+    return entry['sha256']